@@ -5,10 +5,35 @@ Main entry point for the LangGraph agent that coordinates the generation of:
 - Meta descriptions
 - OpenAPI specifications
 """
+import asyncio
 import os
 from dotenv import load_dotenv
 from .workflow import create_agent_workflow
 from .src.graph_state import GraphState
+from .src.git_handler import GitHandler
+from .src.streaming import astream_artifacts
+from src.utils.tracing import tracer
+from src.utils.memory import memory
+from src.utils.deadline import run_time_budget
+from src.analyzer.anytime import deadline_from_budget
+from src.utils.artifact_writer import ArtifactWriter
+from src.diagrams.renderer import DiagramRenderer
+
+
+ARTIFACT_TITLES = {
+    "analysis_summary": "ANALYSIS SUMMARY",
+    "meta_description": "META DESCRIPTION",
+    "component_diagram": "COMPONENT DIAGRAM",
+    "behavior_diagram": "BEHAVIOR DIAGRAM",
+    "openapi_spec": "OPENAPI SPECIFICATION",
+}
+
+
+async def run_streaming(workflow, initial_state: GraphState, writer, final_state: dict):
+    """Print (and write to OUTPUT_DIR) every artifact as soon as it is ready, tracking the state in final_state"""
+    async for name, value in astream_artifacts(workflow, initial_state, writer, final_state):
+        print(f"\n=== {ARTIFACT_TITLES.get(name, name.upper())} ===")
+        print(value)
 
 
 def main():
@@ -30,12 +55,18 @@ def main():
         "behavior_diagram": "",
         "openapi_spec": "",
         "error": "",
-        "completed_tasks": []
+        "completed_tasks": [],
+        # Every node works within its share of RUN_TIME_BUDGET and falls back to static output when it runs out
+        "deadline": deadline_from_budget(run_time_budget()),
+        "degradations": []
     }
     
+    final_state = None
+    writer = ArtifactWriter.from_env()
     try:
-        # Run the workflow
-        final_state = workflow.invoke(initial_state)
+        # Run the workflow, artifacts are emitted while later nodes are still running
+        final_state = dict(initial_state)
+        asyncio.run(run_streaming(workflow, initial_state, writer, final_state))
         
         # Output results
         print("\n=== FINAL STATE ===")
@@ -43,21 +74,39 @@ def main():
         print(f"Local Repository Path: {final_state['local_repo_path']}")
         print(f"Code Analysis Summary: Found {len(final_state['code_analysis'].get('classes', {}))} classes, {len(final_state['code_analysis'].get('interfaces', {}))} interfaces, and {len(final_state['code_analysis'].get('packages', {}))} packages.")
         print(f"Completed Tasks: {final_state['completed_tasks']}")
+        for degradation in final_state.get('degradations', []):
+            print(f"Degraded: {degradation['node']} -> {degradation['fallback']} ({degradation['reason']} in {degradation['stage']})")
+        if writer and final_state.get('degradations'):
+            writer.write("degradations", final_state['degradations'])
+        if writer:
+            print(f"Artifacts written to {writer.output_dir}")
         
         if final_state.get('error'):
             print(f"Error occurred: {final_state['error']}")
         else:
-            print("\n=== META DESCRIPTION ===")
-            print(final_state['meta_description'])
-            print("\n=== COMPONENT DIAGRAM ===")
-            print(final_state['component_diagram'])
-            print("\n=== BEHAVIOR DIAGRAM ===")
-            print(final_state['behavior_diagram'])
-            print("\n=== OPENAPI SPECIFICATION ===")
-            print(final_state['openapi_spec'])
+            # Render diagrams locally if RENDER_DIR is configured
+            renderer = DiagramRenderer.from_env()
+            if renderer:
+                rendered = renderer.render_all({
+                    "component": final_state['component_diagram'],
+                    "behavior": final_state['behavior_diagram']
+                })
+                print("\n=== RENDERED DIAGRAMS ===")
+                for name, paths in rendered.items():
+                    print(f"{name}: {', '.join(paths)}")
         
     except Exception as e:
         print(f"Error during workflow execution: {str(e)}")
+    finally:
+        # Release the checkout so that temporary clones do not pile up on disk
+        if final_state and final_state.get('local_repo_path'):
+            GitHandler().cleanup(final_state['local_repo_path'])
+        trace_path = tracer.export()
+        if trace_path:
+            print(f"Trace written to {trace_path}")
+        if memory.enabled:
+            report = memory.report()
+            print(f"Peak memory: {report['peak_rss_mb']} MB, degradations: {len(report['degradations'])}")
 
 
 if __name__ == "__main__":
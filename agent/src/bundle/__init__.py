@@ -0,0 +1,3 @@
+"""
+Single-call generation of all documentation artifacts
+"""
\ No newline at end of file
@@ -0,0 +1,36 @@
+"""
+Documentation bundle generator
+"""
+from typing import Dict, Any, Optional
+from ...src.llm_client import ARTIFACT_TASKS, LLMClient
+from ..meta.generator import MetaDescriptionGenerator
+
+
+class ArtifactBundleGenerator:
+    """Generates all documentation artifacts with one structured LLM call"""
+    
+    def __init__(self):
+        self.llm_client = LLMClient()
+    
+    def generate(self, code_analysis: Dict[str, Any], repo_path: Optional[str] = None,
+                 project_name: Optional[str] = None) -> Dict[str, str]:
+        """
+        Generate meta description, diagrams and OpenAPI specification from code analysis
+        
+        With a checkout the meta description is not part of the LLM call: like the
+        per-task workflow it comes from build files and README (see MetaDescriptionGenerator).
+        
+        Args:
+            code_analysis: Result from JavaAnalyzer
+            repo_path: Local clone (working tree or bare) to read build files and README from
+            project_name: Name used when the build files declare none
+            
+        Returns:
+            Dictionary with meta_description, component_diagram, sequence_diagram and openapi_spec
+        """
+        if repo_path is None:
+            return self.llm_client.generate_all_artifacts(code_analysis)
+        artifacts = self.llm_client.generate_all_artifacts(
+            code_analysis, [task for task in ARTIFACT_TASKS if task != "meta_description"])
+        artifacts["meta_description"] = MetaDescriptionGenerator().generate(code_analysis, repo_path, project_name)
+        return artifacts
\ No newline at end of file
@@ -0,0 +1,251 @@
+"""
+Inverted indexes and a query API over JavaAnalyzer results
+
+Usage:
+    python -m agent.src.code_index /path/to/project implementers UserService
+    python -m agent.src.code_index analysis.json importers com.example.repo
+"""
+import argparse
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict, defaultdict, deque
+from typing import Any, Callable, Dict, List, Optional, Set
+
+
+class CodeIndex:
+    """Lookup tables built once from a code analysis instead of scanning it per question"""
+
+    def __init__(self, code_analysis: Dict[str, Any]):
+        """
+        Build all indexes
+
+        Args:
+            code_analysis: Result from JavaAnalyzer
+        """
+        self.types: Dict[str, Dict[str, Any]] = {}
+        self.kinds: Dict[str, str] = {}
+        self.by_name: Dict[str, List[str]] = defaultdict(list)
+        self.by_file: Dict[str, List[str]] = defaultdict(list)
+        self.by_annotation: Dict[str, Set[str]] = defaultdict(set)
+        self.members: Dict[str, List[Dict[str, str]]] = defaultdict(list)
+        self.subclasses: Dict[str, Set[str]] = defaultdict(set)
+        self.subinterfaces: Dict[str, Set[str]] = defaultdict(set)
+        self.implementers_of: Dict[str, Set[str]] = defaultdict(set)
+        self.package_importers: Dict[str, Set[str]] = defaultdict(set)
+        self.type_importers: Dict[str, Set[str]] = defaultdict(set)
+        self.package_imports: Dict[str, Set[str]] = defaultdict(set)
+
+        for kind, key in (("class", "classes"), ("interface", "interfaces")):
+            for fqn, info in code_analysis.get(key, {}).items():
+                self.types[fqn] = info
+                self.kinds[fqn] = info.get("kind", kind)
+                self.by_name[fqn.rsplit(".", 1)[-1]].append(fqn)
+                if info.get("file_path"):
+                    self.by_file[info["file_path"]].append(fqn)
+                for annotation in info.get("annotations", []):
+                    self.by_annotation[annotation].add(fqn)
+                for method in info.get("methods", []):
+                    self.members[method["name"]].append({"type": fqn, "kind": "method"})
+                    for annotation in method.get("annotations", []):
+                        self.by_annotation[annotation].add(fqn)
+                for field in info.get("fields", []):
+                    self.members[field["name"]].append({"type": fqn, "kind": "field"})
+
+        for dep in code_analysis.get("dependencies", []):
+            source = dep.get("from_package", "")
+            self.package_importers[dep.get("to_package", "")].add(source)
+            self.type_importers[dep.get("target", "")].add(source)
+            self.package_imports[source].add(dep.get("target", ""))
+
+        # Supertypes are resolved after all types are known
+        for fqn, info in self.types.items():
+            if self.kinds[fqn] == "interface":
+                for parent in info.get("extends") or []:
+                    self.subinterfaces[self.resolve(parent, fqn)].add(fqn)
+            else:
+                if info.get("extends"):
+                    self.subclasses[self.resolve(info["extends"], fqn)].add(fqn)
+                for parent in info.get("implements", []):
+                    self.implementers_of[self.resolve(parent, fqn)].add(fqn)
+
+    def resolve(self, name: str, context: Optional[str] = None) -> str:
+        """
+        Resolve a simple or qualified type name to a fully qualified name
+
+        Args:
+            name: Type name as written in the source (generic arguments are ignored)
+            context: Fully qualified name of the type the reference appears in
+
+        Returns:
+            Fully qualified name of a project type, or the name itself for external types
+        """
+        name = name.split("<", 1)[0]
+        if name in self.types:
+            return name
+        candidates = self.by_name.get(name.rsplit(".", 1)[-1], [])
+        if len(candidates) == 1:
+            return candidates[0]
+        if context and candidates:
+            package = context.rsplit(".", 1)[0] if "." in context else ""
+            for candidate in candidates:
+                # Same package first, then types explicitly imported by the referring package
+                if candidate.rsplit(".", 1)[0] == package or candidate in self.package_imports.get(package, ()):
+                    return candidate
+        return candidates[0] if candidates else name
+
+    def find(self, name: str) -> List[str]:
+        """Fully qualified names of all project types with a given simple name"""
+        return list(self.by_name.get(name, []))
+
+    def subtypes(self, name: str, transitive: bool = False) -> List[str]:
+        """Classes extending a class, or interfaces extending an interface"""
+        return self._walk(self.resolve(name), [self.subclasses, self.subinterfaces], transitive)
+
+    def implementers(self, name: str, transitive: bool = False) -> List[str]:
+        """
+        Classes implementing an interface
+
+        With transitive=True also classes implementing a sub-interface and
+        subclasses of implementing classes.
+        """
+        root = self.resolve(name)
+        if not transitive:
+            return sorted(self.implementers_of.get(root, ()))
+        interfaces = [root] + self._walk(root, [self.subinterfaces], True)
+        direct = {cls for interface in interfaces for cls in self.implementers_of.get(interface, ())}
+        result = set(direct)
+        for cls in direct:
+            result.update(self._walk(cls, [self.subclasses], True))
+        return sorted(result)
+
+    def importers(self, target: str) -> List[str]:
+        """Packages importing a package (or a fully qualified type)"""
+        return sorted(self.package_importers.get(target, set()) | self.type_importers.get(target, set()))
+
+    def declaring_types(self, member: str, kind: Optional[str] = None) -> List[str]:
+        """Types declaring a method or field with the given name"""
+        return sorted({entry["type"] for entry in self.members.get(member, []) if kind in (None, entry["kind"])})
+
+    def annotated(self, annotation: str) -> List[str]:
+        """Types carrying an annotation on the type itself or on one of their methods"""
+        return sorted(self.by_annotation.get(annotation, ()))
+
+    def types_in_file(self, file_path: str) -> List[str]:
+        """Types declared in a source file"""
+        return list(self.by_file.get(file_path, []))
+
+    def _walk(self, root: str, relations: List[Dict[str, Set[str]]], transitive: bool) -> List[str]:
+        seen: Set[str] = set()
+        queue = deque([root])
+        while queue:
+            current = queue.popleft()
+            for relation in relations:
+                for child in relation.get(current, ()):
+                    if child not in seen:
+                        seen.add(child)
+                        if transitive:
+                            queue.append(child)
+        return sorted(seen)
+
+
+# Analyses whose index (and selector) are kept; concurrent runs each keep their own
+ANALYSIS_CACHE_SIZE = int(os.getenv("ANALYSIS_CACHE_SIZE", "4"))
+
+
+def analysis_fingerprint(code_analysis: Dict[str, Any]) -> str:
+    """Cheap digest of an analysis: its types with their location and member counts, and the relation counts"""
+    digest = hashlib.sha1()
+    for key in ("classes", "interfaces"):
+        for fqn, info in sorted(code_analysis.get(key, {}).items()):
+            digest.update(f"{fqn}:{info.get('file_path')}:{info.get('line')}:"
+                          f"{len(info.get('methods', []))}:{len(info.get('fields', []))}\n".encode("utf-8"))
+    digest.update(f"{len(code_analysis.get('dependencies', []))}:{len(code_analysis.get('entry_points', []))}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class AnalysisCache:
+    """
+    Small thread-safe LRU of objects derived from an analysis result
+
+    Entries are keyed by the result's identity together with its fingerprint
+    and hold only the derived object, so a cached entry does not keep the
+    analysis alive, and a new analysis that happens to get the id of a
+    collected one still needs the same types to hit its entry.
+    """
+
+    def __init__(self, build: Callable[[Dict[str, Any]], Any], size: int = ANALYSIS_CACHE_SIZE):
+        self.build = build
+        self.size = size
+        self._entries: "OrderedDict[tuple, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, code_analysis: Dict[str, Any]) -> Any:
+        key = (id(code_analysis), analysis_fingerprint(code_analysis))
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        value = self.build(code_analysis)
+        with self._lock:
+            if key in self._entries:
+                # Built concurrently by another thread: keep a single instance
+                return self._entries[key]
+            self._entries[key] = value
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+        return value
+
+
+_index_cache = AnalysisCache(CodeIndex)
+
+
+def get_index(code_analysis: Dict[str, Any]) -> CodeIndex:
+    """
+    Index of an analysis result, built once and reused by every consumer
+
+    Args:
+        code_analysis: Result from JavaAnalyzer
+
+    Returns:
+        CodeIndex for exactly this analysis object
+    """
+    return _index_cache.get(code_analysis)
+
+
+QUERIES = {
+    "find": lambda index, arg, transitive: index.find(arg),
+    "resolve": lambda index, arg, transitive: [index.resolve(arg)],
+    "subtypes": lambda index, arg, transitive: index.subtypes(arg, transitive),
+    "implementers": lambda index, arg, transitive: index.implementers(arg, transitive),
+    "importers": lambda index, arg, transitive: index.importers(arg),
+    "declaring": lambda index, arg, transitive: index.declaring_types(arg),
+    "annotated": lambda index, arg, transitive: index.annotated(arg),
+    "file": lambda index, arg, transitive: index.types_in_file(arg),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the structure of a Java project")
+    parser.add_argument("source", help="Project directory, bare repository or a JSON file with a saved analysis")
+    parser.add_argument("query", choices=sorted(QUERIES))
+    parser.add_argument("argument", help="Type, package, member or annotation name")
+    parser.add_argument("--transitive", action="store_true", help="Follow subtypes transitively")
+    args = parser.parse_args()
+
+    if os.path.isfile(args.source):
+        with open(args.source, "r", encoding="utf-8") as f:
+            code_analysis = json.load(f)
+    else:
+        from src.loader.sources import open_source
+        from .java_analyzer import JavaAnalyzer
+        with open_source(args.source) as source:
+            code_analysis = JavaAnalyzer().analyze_source(source)
+
+    for item in QUERIES[args.query](CodeIndex(code_analysis), args.argument, args.transitive):
+        print(item)
+
+
+if __name__ == "__main__":
+    main()
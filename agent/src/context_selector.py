@@ -0,0 +1,299 @@
+"""
+Task-specific prompt context: BM25 over the project types plus dependency-neighborhood expansion
+"""
+import math
+import os
+import re
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional, Set, Tuple
+from src.analyzer.importance import ImportanceRanking, rank_packages
+from .code_index import AnalysisCache, get_index
+from .model_router import WEB_ANNOTATIONS, estimate_tokens
+
+
+# Query terms per task, matched against type names, members, packages, annotations and Javadoc
+TASK_QUERIES = {
+    "meta_description": "application main boot config configuration service controller repository client module",
+    "component_diagram": "service repository controller component configuration facade manager client adapter gateway module",
+    "sequence_diagram": "main application controller service handler listener process execute run request response client",
+    "openapi_spec": "controller rest request mapping get post put delete patch endpoint resource api dto request response body path param",
+}
+TASK_QUERIES["bundle"] = " ".join(TASK_QUERIES.values())
+
+# Annotations and entry points that make a type relevant regardless of its lexical score
+TASK_SEEDS = {
+    "sequence_diagram": {"entry_points"},
+    "openapi_spec": {"web"},
+    "bundle": {"entry_points", "web"},
+    "meta_description": {"entry_points"},
+}
+
+DEFAULT_CONTEXT_TOKENS = int(os.getenv("LLM_CONTEXT_TOKENS", "6000"))
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+NEIGHBOR_DECAY = 0.5
+NEIGHBOR_HOPS = 2
+
+# Share of the best lexical score given to the most important type of the dependency graph
+IMPORTANCE_PRIOR = 0.25
+
+# Share of the context budget the project overview may take, the rest is left for the types
+HEADER_SHARE = float(os.getenv("LLM_CONTEXT_HEADER_SHARE", "0.25"))
+
+# Split of the overview budget between its listings
+HEADER_LISTING_SHARES = {"packages": 0.3, "package_dependencies": 0.3, "entry_points": 0.2, "modules": 0.1, "module_dependencies": 0.1}
+
+# Parts of the analysis behind the project overview and the entry point seeds
+OVERVIEW_KEYS = ("packages", "dependencies", "entry_points", "module_graph", "coverage", "memory_degradations", "admission")
+
+
+def tokenize(text: str) -> List[str]:
+    """Split identifiers (camelCase, snake_case, dotted names) into lowercase terms"""
+    words = re.findall(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+", text)
+    return [word.lower() for word in words if len(word) > 1]
+
+
+class ContextSelector:
+    """Picks the most relevant types of a code analysis for a generation task within a token budget"""
+
+    def __init__(self, code_analysis: Dict[str, Any]):
+        """
+        Build the lexical index and the type reference graph
+
+        Args:
+            code_analysis: Result from JavaAnalyzer
+        """
+        # Only the parts the overview needs: a cached selector must not keep the whole analysis alive
+        self.overview = {key: code_analysis[key] for key in OVERVIEW_KEYS if key in code_analysis}
+        self.index = get_index(code_analysis)
+        self.postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self.lengths: Dict[str, int] = {}
+        self.neighbors: Dict[str, Set[str]] = defaultdict(set)
+        edges: List[Tuple[str, str]] = []
+        sizes: Dict[str, float] = {}
+
+        for fqn, info in self.index.types.items():
+            terms = Counter(tokenize(self._document(fqn, info)))
+            self.lengths[fqn] = sum(terms.values())
+            for term, count in terms.items():
+                self.postings[term][fqn] = count
+            for reference in self._references(info):
+                target = self.index.resolve(reference, fqn)
+                if target != fqn and target in self.index.types:
+                    self.neighbors[fqn].add(target)
+                    self.neighbors[target].add(fqn)
+                    edges.append((fqn, target))
+            sizes[fqn] = len(info.get("methods", [])) + len(info.get("fields", []))
+        self.average_length = (sum(self.lengths.values()) / len(self.lengths)) if self.lengths else 0.0
+        # PageRank, fan-in/fan-out and size over the reference graph
+        self.importance = ImportanceRanking.from_edges(self.index.types, edges, sizes)
+
+    def _document(self, fqn: str, info: Dict[str, Any]) -> str:
+        parts = [fqn, info.get("kind", ""), info.get("documentation") or ""]
+        parts += info.get("annotations", [])
+        parts += [info["extends"]] if isinstance(info.get("extends"), str) else info.get("extends") or []
+        parts += info.get("implements", [])
+        for method in info.get("methods", []):
+            parts.append(method["name"])
+            parts += method.get("annotations", [])
+            parts += [p["name"] for p in method.get("parameters", [])]
+        parts += [field["name"] for field in info.get("fields", [])]
+        return " ".join(parts)
+
+    def _references(self, info: Dict[str, Any]) -> List[str]:
+        """Type names a type depends on: supertypes, field types, parameter and return types"""
+        if "references" in info:
+            # Collected by the single-pass visitor, including types used inside method bodies
+            return info["references"]
+        references = [info["extends"]] if isinstance(info.get("extends"), str) else list(info.get("extends") or [])
+        references += info.get("implements", [])
+        references += [field.get("type", "") for field in info.get("fields", [])]
+        for method in info.get("methods", []):
+            references.append(method.get("return_type", ""))
+            references += [p.get("type", "") for p in method.get("parameters", [])]
+        # Generic arguments count as references too: List<User> -> List, User
+        return [name for reference in references for name in re.findall(r"[A-Za-z_][\w.]*", reference or "")]
+
+    def score(self, query: str) -> Dict[str, float]:
+        """BM25 score of every type matching at least one query term"""
+        scores: Dict[str, float] = defaultdict(float)
+        total = len(self.lengths)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for fqn, count in postings.items():
+                norm = 1 - BM25_B + BM25_B * self.lengths[fqn] / (self.average_length or 1)
+                scores[fqn] += idf * count * (BM25_K1 + 1) / (count + BM25_K1 * norm)
+        return scores
+
+    def seeds(self, task: str) -> Set[str]:
+        """Types relevant to a task by construction (entry points, web endpoints)"""
+        kinds = TASK_SEEDS.get(task, set())
+        seeds: Set[str] = set()
+        if "web" in kinds:
+            for annotation in WEB_ANNOTATIONS:
+                seeds.update(self.index.annotated(annotation))
+        if "entry_points" in kinds:
+            for entry in self.overview.get("entry_points", []):
+                if entry.get("class"):
+                    seeds.update(fqn for fqn in self.index.find(entry["class"])
+                                 if self.index.types[fqn].get("file_path") == entry.get("file_path"))
+        return seeds
+
+    def rank(self, task: str) -> List[Tuple[str, float]]:
+        """
+        Rank all types for a task
+
+        Lexical scores and seeds are propagated to the dependency neighborhood
+        with a decay per hop, so collaborators of a controller rank right after it.
+        The importance of a type in the dependency graph is added as a prior,
+        which also orders the types no query term matches.
+        """
+        scores = self.score(TASK_QUERIES.get(task, TASK_QUERIES["bundle"]))
+        top = max(scores.values(), default=1.0)
+        for seed in self.seeds(task):
+            scores[seed] = scores.get(seed, 0.0) + top
+
+        propagated = dict(scores)
+        frontier = scores
+        for _ in range(NEIGHBOR_HOPS):
+            next_frontier: Dict[str, float] = defaultdict(float)
+            for fqn, value in frontier.items():
+                for neighbor in self.neighbors.get(fqn, ()):
+                    next_frontier[neighbor] = max(next_frontier[neighbor], value * NEIGHBOR_DECAY)
+            for fqn, value in next_frontier.items():
+                propagated[fqn] = max(propagated.get(fqn, 0.0), value)
+            frontier = next_frontier
+
+        importance = self.importance.normalized_scores()
+        return sorted(((fqn, propagated.get(fqn, 0.0) + IMPORTANCE_PRIOR * top * importance[fqn]) for fqn in self.index.types),
+                      key=lambda item: (-item[1], item[0]))
+
+    def important_types(self, k: int) -> List[str]:
+        """The k most important types of the dependency graph, regardless of the task"""
+        return self.importance.top(k)
+
+    def render(self, task: str, token_budget: Optional[int] = None) -> str:
+        """
+        Render the project overview and the most relevant types that fit into the budget
+
+        Args:
+            task: Generation task name
+            token_budget: Approximate prompt tokens available for the context
+
+        Returns:
+            Compact text description of the project for the prompt
+        """
+        token_budget = token_budget or DEFAULT_CONTEXT_TOKENS
+        header = self.render_header(int(token_budget * HEADER_SHARE))
+        used = estimate_tokens(header)
+
+        blocks = []
+        ranked = self.rank(task)
+        for fqn, _ in ranked:
+            block = self.render_type(fqn, self.index.types[fqn])
+            if used + estimate_tokens(block) > token_budget:
+                # Keep the rank order: a type with too many members is shown by its declaration only
+                block = block.split("\n", 1)[0]
+                if used + estimate_tokens(block) > token_budget:
+                    break
+            blocks.append(block)
+            used += estimate_tokens(block)
+
+        shown = f"Types ({len(blocks)} of {len(ranked)}, most relevant first):"
+        return "\n".join([header, shown] + blocks)
+
+    @staticmethod
+    def _listing(label: str, items: List[str], token_budget: int) -> str:
+        """One header line with as many items as fit into the budget and the number of the omitted ones"""
+        shown: List[str] = []
+        used = estimate_tokens(label) + 8
+        for item in items:
+            cost = estimate_tokens(item) + 1
+            if used + cost > token_budget:
+                break
+            shown.append(item)
+            used += cost
+        line = f"{label} ({len(items)}): {', '.join(shown) or 'none'}" if items else f"{label}: none"
+        if len(shown) < len(items):
+            line += f", ... {len(items) - len(shown)} more omitted"
+        return line
+
+    def render_header(self, token_budget: Optional[int] = None) -> str:
+        """
+        Project overview: packages, dependencies, entry points, modules and analysis gaps
+
+        The listings are cut to their share of the budget (HEADER_LISTING_SHARES),
+        packages and package dependencies most important first, so that the
+        overview of a large project leaves room for the types.
+
+        Args:
+            token_budget: Approximate tokens the overview may take (HEADER_SHARE of the context budget by default)
+        """
+        token_budget = token_budget or int(DEFAULT_CONTEXT_TOKENS * HEADER_SHARE)
+        package_info = self.overview.get("packages", {})
+        dependencies = self.overview.get("dependencies", [])
+        ranking = rank_packages(dependencies, {package: len(info.get("classes", [])) + len(info.get("interfaces", []))
+                                               for package, info in package_info.items()} or None)
+        importance = {package: ranking.score(package) for package in package_info}
+        packages = sorted(package_info, key=lambda package: (-importance[package], package))
+        edges = sorted({(dep.get("from_package", ""), dep.get("to_package", ""))
+                        for dep in dependencies
+                        if dep.get("to_package") in package_info and dep.get("from_package") != dep.get("to_package")},
+                       key=lambda edge: (-importance.get(edge[0], 0.0) - importance[edge[1]], edge))
+        entry_points = [f"{entry.get('class')} ({entry.get('type')})" for entry in self.overview.get("entry_points", [])]
+        lines = [
+            self._listing("Packages", packages, int(token_budget * HEADER_LISTING_SHARES["packages"])),
+            self._listing("Package dependencies", [f"{a} -> {b}" for a, b in edges],
+                          int(token_budget * HEADER_LISTING_SHARES["package_dependencies"])),
+            self._listing("Entry points", entry_points, int(token_budget * HEADER_LISTING_SHARES["entry_points"])),
+        ]
+        module_graph = self.overview.get("module_graph", {})
+        if len(module_graph.get("modules", {})) > 1:
+            lines.append(self._listing("Build modules", sorted(module_graph["modules"]),
+                                       int(token_budget * HEADER_LISTING_SHARES["modules"])))
+            lines.append(self._listing("Module dependencies", [f"{a} -> {b}" for a, b in module_graph.get("edges", [])],
+                                       int(token_budget * HEADER_LISTING_SHARES["module_dependencies"])))
+        coverage = self.overview.get("coverage")
+        if coverage and not coverage["complete"]:
+            lines.append(f"Partial analysis (time budget): {coverage['files_analyzed']} of {coverage['files_total']} files, "
+                         f"{coverage['packages_covered']} of {coverage['packages_total']} packages")
+        degradations = self.overview.get("memory_degradations", [])
+        if degradations:
+            lines.append(f"Reduced analysis (memory budget): {', '.join(sorted({event['action'] for event in degradations}))}")
+        skipped = self.overview.get("admission", {}).get("skipped", 0)
+        if skipped:
+            lines.append(f"Files not analyzed: {skipped}")
+        return "\n".join(lines)
+
+    def render_type(self, fqn: str, info: Dict[str, Any]) -> str:
+        """One type with its supertypes, annotations, fields and method signatures"""
+        annotations = " ".join(f"@{a}" for a in info.get("annotations", []))
+        line = f"- {self.index.kinds[fqn]} {fqn}" + (f" {annotations}" if annotations else "")
+        extends = info.get("extends")
+        if extends:
+            line += f" extends {extends if isinstance(extends, str) else ', '.join(extends)}"
+        if info.get("implements"):
+            line += f" implements {', '.join(info['implements'])}"
+        lines = [line]
+        if info.get("fields"):
+            lines.append("  fields: " + "; ".join(f"{f['name']}: {f.get('type', '')}" for f in info["fields"]))
+        if info.get("methods"):
+            methods = []
+            for method in info["methods"]:
+                prefix = "".join(f"@{a} " for a in method.get("annotations", []))
+                params = ", ".join(f"{p['type']} {p['name']}" for p in method.get("parameters", []))
+                methods.append(f"{prefix}{method['name']}({params}): {method.get('return_type', 'void')}")
+            lines.append("  methods: " + "; ".join(methods))
+        return "\n".join(lines)
+
+
+_selector_cache = AnalysisCache(ContextSelector)
+
+
+def get_selector(code_analysis: Dict[str, Any]) -> ContextSelector:
+    """Selector of an analysis result, built once and shared by all prompts of the run"""
+    return _selector_cache.get(code_analysis)
@@ -1,9 +1,15 @@
 """
 Edges for the LangGraph agent workflow
 """
+import os
 from .graph_state import GraphState
 
 
+def single_call_enabled() -> bool:
+    """Whether all artifacts should be generated with one structured LLM call"""
+    return os.getenv("LLM_SINGLE_CALL", "").lower() in ("1", "true", "yes")
+
+
 def route_after_clone(state: GraphState) -> str:
     """
     Route to next step after cloning repository
@@ -32,6 +38,8 @@ def route_after_analysis(state: GraphState) -> str:
     """
     if state.get("error"):
         return "error"
+    elif single_call_enabled():
+        return "generate_all_artifacts"
     else:
         return "generate_meta_description"
 
@@ -6,6 +6,7 @@ import tempfile
 import shutil
 from typing import Optional
 import git
+from src.loader.workspace import get_workspace, _with_credentials
 
 
 class GitHandler:
@@ -26,6 +27,11 @@ class GitHandler:
         Returns:
             Path to the cloned repository
         """
+        # Reuse the managed workspace (mirror + fetch + worktree) when WORKSPACE_DIR is set
+        workspace = get_workspace()
+        if local_path is None and workspace is not None:
+            return workspace.acquire(repo_url, None, self.username, self.password).path
+        
         if local_path is None:
             temp_dir = tempfile.mkdtemp()
             local_path = temp_dir
@@ -52,7 +58,34 @@ class GitHandler:
         except git.exc.GitCommandError as e:
             raise Exception(f"Failed to clone repository: {str(e)}")
     
+    def clone_bare(self, repo_url: str) -> str:
+        """
+        Fetch a repository without checking out a working tree
+        
+        Args:
+            repo_url: URL of the Git repository to clone
+            
+        Returns:
+            Path to the bare repository (the workspace mirror when WORKSPACE_DIR is set)
+        """
+        workspace = get_workspace()
+        if workspace is not None:
+            return workspace.mirror_path(repo_url, None, self.username, self.password)[0]
+        
+        local_path = tempfile.mkdtemp()
+        try:
+            git.Repo.clone_from(_with_credentials(repo_url, self.username, self.password), local_path, bare=True)
+            return local_path
+        except git.exc.GitCommandError as e:
+            shutil.rmtree(local_path, ignore_errors=True)
+            raise Exception(f"Failed to clone repository: {str(e)}")
+    
     def cleanup(self, repo_path: str):
-        """Clean up the cloned repository directory"""
-        if os.path.exists(repo_path) and tempfile.tempdir in repo_path:
+        """Clean up the cloned repository directory (or release its workspace worktree)"""
+        workspace = get_workspace()
+        if workspace is not None and workspace.owns(repo_path):
+            workspace.release(repo_path)
+        elif workspace is not None and workspace.manages(repo_path):
+            return
+        elif os.path.exists(repo_path) and tempfile.gettempdir() in repo_path:
             shutil.rmtree(repo_path)
\ No newline at end of file
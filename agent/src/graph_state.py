@@ -1,7 +1,7 @@
 """
 Graph state definition for the LangGraph agent
 """
-from typing import Dict, Any, TypedDict
+from typing import Dict, Any, Optional, TypedDict
 
 
 class GraphState(TypedDict):
@@ -16,4 +16,8 @@ class GraphState(TypedDict):
     behavior_diagram: str
     openapi_spec: str
     error: str
-    completed_tasks: list[str]
\ No newline at end of file
+    completed_tasks: list[str]
+    # Absolute deadline of the run (epoch seconds), None without RUN_TIME_BUDGET
+    deadline: Optional[float]
+    # Nodes that fell back to static output because their share of the deadline ran out
+    degradations: list[Dict[str, Any]]
\ No newline at end of file
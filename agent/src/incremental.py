@@ -0,0 +1,368 @@
+"""
+Incremental LLM generation: artifacts are split into per-package, per-controller
+and per-module pieces, each cached under a hash of its structural summary
+"""
+import hashlib
+import json
+import os
+import tempfile
+import textwrap
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from src.diagrams.mermaid_validator import validate_mermaid
+from src.diagrams.mermaid_writer import node_id
+from .code_index import get_index
+from .context_selector import HEADER_SHARE, get_selector
+from .static_artifacts import controller_types, package_edges, package_id, static_subgraph, types_by_package
+
+
+# Part of every cache key, bump it when the piece prompts change
+PROMPT_VERSION = "1"
+
+# Package segments grouping a single-module project for the per-module descriptions
+META_GROUP_DEPTH = int(os.getenv("LLM_META_GROUP_DEPTH", "3"))
+
+def structural_summary(info: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    What the generated documentation depends on for one type
+
+    Positions, file paths and Javadoc are left out, so reformatting or
+    moving code does not invalidate cached pieces.
+
+    Args:
+        info: Type entry of a JavaAnalyzer result
+
+    Returns:
+        JSON-serializable summary
+    """
+    return {
+        "kind": info.get("kind"),
+        "name": info.get("name"),
+        "modifiers": sorted(info.get("modifiers", [])),
+        "annotations": sorted(info.get("annotations", [])),
+        "extends": info.get("extends"),
+        "implements": sorted(info.get("implements", [])),
+        "fields": [(f["name"], f.get("type"), sorted(f.get("annotations", []))) for f in info.get("fields", [])],
+        "methods": [
+            (m["name"], m.get("return_type"), [p.get("type") for p in m.get("parameters", [])],
+             sorted(m.get("annotations", [])), sorted(m.get("modifiers", [])))
+            for m in info.get("methods", [])
+        ],
+        "constructors": [[p.get("type") for p in c.get("parameters", [])] for c in info.get("constructors", [])],
+        "constants": info.get("constants", []),
+        "references": sorted(info.get("references", [])),
+    }
+
+
+def structural_hash(*parts: Any) -> str:
+    """Stable hash of JSON-serializable parts"""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def _strip_json(text: str) -> str:
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1] if "\n" in text else ""
+        text = text.rsplit("```", 1)[0]
+    return text
+
+
+class PieceCache:
+    """Generated pieces stored as one JSON file per structural hash"""
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def get(self, key: str) -> Optional[Any]:
+        path = os.path.join(self.cache_dir, f"{key}.json")
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)["value"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def put(self, key: str, task: str, piece: str, value: Any):
+        # Atomic replace, parallel nodes may write the same piece
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix=f".{key}.")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"task": task, "piece": piece, "created": time.time(), "value": value}, f, ensure_ascii=False)
+        os.replace(tmp_path, os.path.join(self.cache_dir, f"{key}.json"))
+
+
+class IncrementalGenerator:
+    """
+    Regenerates only the pieces of an artifact whose structure changed
+
+    Component diagrams are built from one subgraph per package plus locally
+    computed package dependencies, OpenAPI specifications from one paths
+    fragment per controller, and meta descriptions from one description per
+    build module (or top-level package group) tied together by a short
+    overview. Sequence diagrams span the whole project and are cached as a
+    whole under the hash of their prompt context.
+    """
+
+    def __init__(self, llm_client, cache: PieceCache):
+        """
+        Args:
+            llm_client: LLMClient used for pieces missing from the cache
+            cache: Piece cache
+        """
+        self.client = llm_client
+        self.cache = cache
+        self.stats: Dict[str, Dict[str, int]] = defaultdict(lambda: {"pieces": 0, "regenerated": 0})
+
+    @classmethod
+    def from_env(cls, llm_client) -> Optional["IncrementalGenerator"]:
+        """Generator caching in LLM_CACHE_DIR, or None when it is not set (read on each call, after .env is loaded)"""
+        cache_dir = os.getenv("LLM_CACHE_DIR")
+        return cls(llm_client, PieceCache(cache_dir)) if cache_dir else None
+
+    def _piece(self, task: str, piece: str, summary: Any, generate: Callable[[], Any],
+               valid: Callable[[Any], bool] = lambda value: True) -> Any:
+        """
+        Cached value of one piece, generated on a cache miss
+
+        Args:
+            task: Artifact (and route) the piece belongs to
+            piece: Piece name (package, controller, module)
+            summary: Structural summary the piece is derived from
+            generate: Produces the piece with the LLM
+            valid: Only valid pieces are cached
+
+        Returns:
+            Piece value
+        """
+        route = {**self.client.router.routes["default"], **self.client.router.routes.get(task, {})}
+        key = structural_hash(task, piece, PROMPT_VERSION, route.get("model"), summary)
+        self.stats[task]["pieces"] += 1
+        value = self.cache.get(key)
+        if value is not None:
+            return value
+        self.stats[task]["regenerated"] += 1
+        value = generate()
+        if valid(value):
+            self.cache.put(key, task, piece, value)
+        return value
+
+    def _report(self, task: str):
+        stats = self.stats[task]
+        print(f"{task}: {stats['regenerated']} of {stats['pieces']} pieces regenerated")
+
+    def component_diagram(self, code_analysis: Dict[str, Any]) -> str:
+        """
+        Component diagram stitched from cached per-package subgraphs
+
+        Args:
+            code_analysis: Result from JavaAnalyzer
+
+        Returns:
+            Mermaid flowchart without fences
+        """
+        index = get_index(code_analysis)
+        selector = get_selector(code_analysis)
+        packages = types_by_package(code_analysis)
+        lines = ["flowchart LR"]
+        for package, fqns in packages.items():
+            summary = [(fqn, structural_summary(index.types[fqn])) for fqn in fqns]
+            subgraph = self._piece(
+                "component_diagram", package, summary,
+                lambda: self._package_subgraph(package, fqns, index, selector),
+                valid=lambda value: not validate_mermaid("flowchart LR\n" + value)
+            )
+            if validate_mermaid("flowchart LR\n" + subgraph):
+                subgraph = static_subgraph(package, fqns)
+            lines += ["    " + line.rstrip() for line in textwrap.dedent(subgraph).split("\n") if line.strip()]
+
+        # Package dependencies are known exactly, they are not left to the model
+        lines += ["    " + edge for edge in package_edges(code_analysis, packages)]
+        self._report("component_diagram")
+        return "\n".join(lines)
+
+    def _package_subgraph(self, package: str, fqns: List[str], index, selector) -> str:
+        types = "\n".join(selector.render_type(fqn, index.types[fqn]) for fqn in fqns)
+        node_ids = ", ".join(f"{fqn} -> {node_id(fqn)}" for fqn in fqns)
+        prompt = f"""
+        Create the part of a Mermaid flowchart describing the Java package {package or "(default)"}.
+        Write one block `subgraph {package_id(package)}["{package or "(default)"}"]` ... `end`
+        with a node per class/interface and arrows for inheritance, implementation and usage between them.
+        Use exactly these node ids: {node_ids}
+        Do not draw anything outside the package and do not write the flowchart header.
+
+        Types:
+        {types}
+
+        Format the response as a Mermaid code block like:
+        ```mermaid
+        subgraph ...
+        end
+        ```
+        """
+        response = self.client.generate_response(prompt, task="component_diagram")
+        subgraph = self.client._extract_mermaid(response)
+        if subgraph.startswith(("flowchart", "graph")):
+            subgraph = subgraph.split("\n", 1)[1] if "\n" in subgraph else ""
+        if validate_mermaid("flowchart LR\n" + subgraph):
+            repaired = self.client._validated_diagram("component_diagram", "flowchart LR\n" + subgraph)
+            subgraph = repaired.split("\n", 1)[1] if "\n" in repaired else ""
+        return subgraph
+
+    def openapi_spec(self, code_analysis: Dict[str, Any]) -> str:
+        """
+        OpenAPI specification merged from cached per-controller fragments
+
+        Args:
+            code_analysis: Result from JavaAnalyzer
+
+        Returns:
+            OpenAPI specification in JSON format
+        """
+        index = get_index(code_analysis)
+        selector = get_selector(code_analysis)
+        paths: Dict[str, Any] = {}
+        schemas: Dict[str, Any] = {}
+        for fqn in controller_types(code_analysis):
+            # Request and response types shape the fragment as much as the controller itself
+            related = sorted({index.resolve(name, fqn) for name in index.types[fqn].get("references", [])}
+                             & set(index.types) - {fqn})
+            summary = [structural_summary(index.types[fqn])] + [(name, structural_summary(index.types[name])) for name in related]
+            fragment = self._piece(
+                "openapi_spec", fqn, summary,
+                lambda: self._controller_fragment(fqn, related, index, selector),
+                valid=lambda value: bool(value)
+            )
+            for path, operations in (fragment.get("paths") or {}).items():
+                paths.setdefault(path, {}).update(operations)
+            schemas.update(fragment.get("schemas") or {})
+        self._report("openapi_spec")
+
+        spec = {
+            "openapi": "3.0.0",
+            "info": {"title": "API", "version": "1.0.0"},
+            "paths": {path: paths[path] for path in sorted(paths)},
+        }
+        if schemas:
+            spec["components"] = {"schemas": {name: schemas[name] for name in sorted(schemas)}}
+        return json.dumps(spec, indent=2)
+
+    def _controller_fragment(self, fqn: str, related: List[str], index, selector) -> Dict[str, Any]:
+        types = "\n".join(selector.render_type(name, index.types[name]) for name in [fqn] + related)
+        prompt = f"""
+        Generate the OpenAPI 3.0 operations of the web controller {fqn}.
+        Use the request mapping annotations (@RequestMapping, @GetMapping, @PostMapping, @Path, ...)
+        and describe request and response bodies with schemas.
+
+        Controller and the types it uses:
+        {types}
+
+        Respond with a JSON object only: {{"paths": {{...}}, "schemas": {{...}}}}
+        where "schemas" holds the component schemas referenced from "paths".
+        """
+        response = self.client.generate_response(prompt, task="openapi_spec")
+        try:
+            fragment = json.loads(_strip_json(response))
+        except ValueError:
+            print(f"Unparsable OpenAPI fragment for {fqn}")
+            return {}
+        if not isinstance(fragment, dict):
+            return {}
+        if "paths" not in fragment and any(key.startswith("/") for key in fragment):
+            fragment = {"paths": fragment}
+        return {"paths": fragment.get("paths") or {},
+                "schemas": fragment.get("schemas") or (fragment.get("components") or {}).get("schemas") or {}}
+
+    def _meta_groups(self, code_analysis: Dict[str, Any]) -> Dict[str, List[str]]:
+        index = get_index(code_analysis)
+        modules = code_analysis.get("module_graph", {}).get("modules", {})
+        groups: Dict[str, List[str]] = defaultdict(list)
+        for package, fqns in types_by_package(code_analysis).items():
+            for fqn in fqns:
+                if len(modules) > 1 and index.types[fqn].get("module"):
+                    group = index.types[fqn]["module"]
+                else:
+                    group = ".".join(package.split(".")[:META_GROUP_DEPTH]) or "(default)"
+                groups[group].append(fqn)
+        return dict(sorted(groups.items()))
+
+    def meta_description(self, code_analysis: Dict[str, Any]) -> str:
+        """
+        Meta description from cached per-module descriptions and an overview of them
+
+        Args:
+            code_analysis: Result from JavaAnalyzer
+
+        Returns:
+            Meta description text
+        """
+        index = get_index(code_analysis)
+        selector = get_selector(code_analysis)
+        module_graph = code_analysis.get("module_graph", {})
+        descriptions: List[Tuple[str, str]] = []
+        for group, fqns in self._meta_groups(code_analysis).items():
+            dependencies = module_graph.get("modules", {}).get(group, {}).get("dependencies", [])
+            summary = [dependencies] + [(fqn, structural_summary(index.types[fqn])) for fqn in fqns]
+            description = self._piece(
+                "meta_description", group, summary,
+                lambda: self._group_description(group, fqns, dependencies, index, selector),
+                valid=lambda value: bool(value.strip())
+            )
+            descriptions.append((group, description.strip()))
+
+        # The overview only depends on the header facts and the module descriptions
+        route = {**self.client.router.routes["default"], **self.client.router.routes.get("meta_description", {})}
+        header = selector.render_header(int(route["context_tokens"] * HEADER_SHARE))
+        overview = self._piece(
+            "meta_description", "(overview)", [header, descriptions],
+            lambda: self._overview(header, descriptions),
+            valid=lambda value: bool(value.strip())
+        )
+        self._report("meta_description")
+        return "\n\n".join([overview.strip()] + [f"## {group}\n{description}" for group, description in descriptions])
+
+    def _group_description(self, group: str, fqns: List[str], dependencies: List[str], index, selector) -> str:
+        types = "\n".join(selector.render_type(fqn, index.types[fqn]) for fqn in fqns)
+        prompt = f"""
+        Describe the part "{group}" of a Java project in a short paragraph:
+        its purpose, main types and the technologies visible from annotations and types.
+        {f"It depends on: {', '.join(dependencies)}" if dependencies else ""}
+
+        Types:
+        {types}
+        """
+        return self.client.generate_response(prompt, task="meta_description")
+
+    def _overview(self, header: str, descriptions: List[Tuple[str, str]]) -> str:
+        parts = "\n\n".join(f"{group}: {description}" for group, description in descriptions)
+        prompt = f"""
+        Write a concise meta description of a Java project: technology stack, purpose,
+        main functionalities and architecture overview. Base it on the facts and the
+        descriptions of its parts below, do not repeat the part descriptions.
+
+        Project facts:
+        {header}
+
+        Parts:
+        {parts}
+        """
+        return self.client.generate_response(prompt, task="meta_description")
+
+    def sequence_diagram(self, code_analysis: Dict[str, Any]) -> str:
+        """
+        Sequence diagram cached as a whole under the hash of its prompt context
+
+        Args:
+            code_analysis: Result from JavaAnalyzer
+
+        Returns:
+            Mermaid sequence diagram without fences
+        """
+        route = {**self.client.router.routes["default"], **self.client.router.routes.get("sequence_diagram", {})}
+        context = get_selector(code_analysis).render("sequence_diagram", route.get("context_tokens"))
+        diagram = self._piece(
+            "sequence_diagram", "(project)", context,
+            lambda: self.client.generate_sequence_diagram(code_analysis, incremental=False),
+            valid=lambda value: not validate_mermaid(value, {"sequenceDiagram"})
+        )
+        self._report("sequence_diagram")
+        return diagram
@@ -1,11 +1,20 @@
 """
 Java source code analyzer using AST parsing
 """
-import os
 import ast
+import time
 import javalang
 from typing import List, Dict, Any, Optional
 from pathlib import Path
+from functools import partial
+from src.utils.tracing import tracer
+from src.utils.memory import memory
+from src.utils.file_admission import FileAdmission, merge_summaries
+from src.utils.java_visitor import visit_java
+from src.loader.sources import FileSystemSource
+from src.loader.build_modules import analyze_modules, discover_modules, module_graph
+from src.analyzer.distributed import analyze_distributed, dist_listen, dist_local_workers, distributed_enabled
+from src.analyzer.anytime import AnytimePlan, analysis_time_budget, deadline_from_budget, merge_coverage
 
 
 class JavaAnalyzer:
@@ -14,82 +23,282 @@ class JavaAnalyzer:
     def __init__(self):
         pass
     
-    def analyze_project(self, project_path: str) -> Dict[str, Any]:
+    def analyze_project(self, project_path: str, time_budget: Optional[float] = None) -> Dict[str, Any]:
         """
         Analyze an entire Java project
         
         Args:
             project_path: Path to the Java project directory
+            time_budget: Wall-clock budget in seconds, 0 for a full analysis;
+                defaults to ANALYSIS_TIME_BUDGET
             
         Returns:
             Dictionary containing project analysis results
         """
-        analysis_result = {
+        with FileSystemSource(project_path) as source:
+            return self.analyze_source(source, time_budget=time_budget)
+    
+    def analyze_source(self, source, by_module: bool = True, time_budget: Optional[float] = None,
+                       deadline: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Analyze the Java files served by a source provider
+        
+        Args:
+            source: FileSystemSource or GitBlobSource (src.loader.sources)
+            by_module: Split the project into its Maven/Gradle modules (main
+                sources only) and analyze them in parallel, or on distributed
+                workers when DIST_LISTEN / DIST_LOCAL_WORKERS is set
+            time_budget: Wall-clock budget in seconds; files are then analyzed
+                in priority order and the result gets 'coverage' statistics.
+                Defaults to ANALYSIS_TIME_BUDGET, 0 for a full analysis
+            deadline: Absolute deadline (epoch seconds), overrides time_budget
+            
+        Returns:
+            Dictionary containing project analysis results
+        """
+        if deadline is None:
+            deadline = deadline_from_budget(analysis_time_budget() if time_budget is None else time_budget)
+        if by_module and distributed_enabled():
+            return self.analyze_distributed(source, deadline=deadline)
+        if by_module:
+            modules, results, outside = analyze_modules(source, partial(self._analyze_module_source, deadline=deadline))
+            return self._merge_modules(modules, results, outside)
+        
+        analysis_result = self._empty_result()
+        
+        admission = FileAdmission()
+        with memory.phase("list_files"):
+            files = source.list_files()
+            plan = AnytimePlan(source, files, deadline) if deadline else None
+            if plan:
+                files = plan.order()
+        
+        summary_only = False
+        degradations = []
+        with memory.phase("parse_files"):
+            for index, source_file in enumerate(files):
+                # Out of time: keep what has been analyzed so far
+                if plan:
+                    if plan.expired():
+                        break
+                # Over the memory budget: keep type summaries only, and stop parsing well above it
+                if memory.budget_bytes and index and index % memory.check_interval == 0:
+                    if memory.over_budget(memory.stop_factor):
+                        for skipped_file in files[index:]:
+                            admission.record_skip(skipped_file.path, "memory_budget")
+                        degradations.append(memory.degrade("analyze_code", "stopped parsing", files_analyzed=index,
+                                                           files_left=len(files) - index))
+                        break
+                    if not summary_only and memory.over_budget():
+                        summary_only = True
+                        self._summarize_types(analysis_result)
+                        degradations.append(memory.degrade("analyze_code", "summary mode", files_analyzed=index))
+                file_path = source_file.path
+                content = admission.read_source(source, source_file)
+                if content is None:
+                    if plan:
+                        plan.record(source_file, skipped=True)
+                    continue
+                try:
+                    with tracer.timed_file(file_path):
+                        self._analyze_file(file_path, content, analysis_result, summary_only)
+                except Exception as e:
+                    admission.record_skip(file_path, "parse_error", reason=str(e))
+                    print(f"Error analyzing file {file_path}: {str(e)}")
+                    if plan:
+                        plan.record(source_file, skipped=True)
+                    continue
+                if plan:
+                    plan.record(source_file)
+        
+        # Keep track of files left out so that generated documentation stays honest
+        analysis_result['admission'] = admission.summary()
+        if plan:
+            analysis_result['coverage'] = plan.coverage()
+        if degradations:
+            analysis_result['memory_degradations'] = degradations
+        
+        return analysis_result
+    
+    def analyze_distributed(self, source, listen: Optional[str] = None, local_workers: Optional[int] = None,
+                            deadline: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Analyze the main sources of all build modules on coordinator-managed workers
+        
+        Workers (local processes and/or `python -m src.analyzer.distributed HOST:PORT`
+        on other machines) analyze shards of files and stream one summary per
+        file back. Summaries are merged in path order, so the result does not
+        depend on how files were distributed.
+        
+        Args:
+            source: FileSystemSource or GitBlobSource (src.loader.sources)
+            listen: 'host:port' for remote workers (DIST_LISTEN by default; localhost
+                and a free port without it)
+            local_workers: Worker processes started on this machine (DIST_LOCAL_WORKERS by default)
+            deadline: Absolute deadline (epoch seconds); files not reported by then are left out
+            
+        Returns:
+            Dictionary containing project analysis results
+        """
+        if listen is None:
+            listen = dist_listen()
+        if local_workers is None:
+            local_workers = dist_local_workers()
+        all_files = source.list_files()
+        modules = discover_modules(source, all_files)
+        module_of = {}
+        for module in modules:
+            prefixes = module.prefixes()
+            for source_file in all_files:
+                if any(source.relative_path(source_file.path).startswith(prefix) for prefix in prefixes):
+                    module_of.setdefault(source_file.path, module.name)
+        files = [source_file for source_file in all_files if source_file.path in module_of]
+        
+        timeout = max(0.0, deadline - time.time()) if deadline else None
+        summaries, stats = analyze_distributed(source, self._analyze_file_summary, files, listen, local_workers, timeout)
+        
+        results = {}
+        admissions = {}
+        for file_path, summary in summaries.items():
+            module_name = module_of[file_path]
+            self._merge_into(results.setdefault(module_name, self._empty_result()), summary['analysis'])
+            admissions.setdefault(module_name, []).append(summary['admission'])
+        for module_name, result in results.items():
+            result['admission'] = merge_summaries(admissions[module_name])
+        
+        analysis_result = self._merge_modules(modules, results, len(all_files) - len(files))
+        analysis_result['distribution'] = {**stats, 'files_total': len(files), 'files_analyzed': len(summaries)}
+        return analysis_result
+    
+    def _analyze_file_summary(self, source, source_file) -> Dict[str, Any]:
+        """Analysis and admission outcome of a single file (picklable entry point for distributed workers)"""
+        admission = FileAdmission()
+        analysis_result = self._empty_result()
+        content = admission.read_source(source, source_file)
+        if content is not None:
+            try:
+                with tracer.timed_file(source_file.path):
+                    self._analyze_file(source_file.path, content, analysis_result)
+            except Exception as e:
+                admission.record_skip(source_file.path, "parse_error", reason=str(e))
+                print(f"Error analyzing file {source_file.path}: {str(e)}")
+        return {'analysis': analysis_result, 'admission': admission.summary()}
+    
+    def _analyze_module_source(self, source, deadline: Optional[float] = None) -> Dict[str, Any]:
+        """Analyze a single build module (picklable entry point for the module workers)"""
+        return self.analyze_source(source, by_module=False, time_budget=0, deadline=deadline)
+    
+    def _merge_modules(self, modules, results: Dict[str, Dict[str, Any]], outside: int) -> Dict[str, Any]:
+        """
+        Merge per-module analyses into one project analysis with a module dependency graph
+        
+        Args:
+            modules: Build modules in discovery order
+            results: Analysis result per module name
+            outside: Number of Java files outside all module source roots
+            
+        Returns:
+            Dictionary containing project analysis results
+        """
+        analysis_result = self._empty_result()
+        graph = module_graph(modules)
+        with memory.phase("merge_modules"):
+            for module in modules:
+                result = results.get(module.name, {})
+                self._merge_into(analysis_result, result, module.name)
+                graph['modules'][module.name]['java_files'] = result.get('admission', {}).get('admitted', 0)
+        
+        graph['files_outside_modules'] = outside
+        analysis_result['admission'] = merge_summaries([result['admission'] for result in results.values()])
+        analysis_result['module_graph'] = graph
+        coverage = merge_coverage([result.get('coverage') for result in results.values()])
+        if coverage:
+            analysis_result['coverage'] = coverage
+        # Module workers run in their own processes: bring their budget decisions into this run's report
+        degradations = [event for result in results.values() for event in result.get('memory_degradations', [])]
+        if degradations:
+            analysis_result['memory_degradations'] = degradations
+            memory.add_degradations(degradations)
+        return analysis_result
+    
+    @staticmethod
+    def _empty_result() -> Dict[str, Any]:
+        return {
             'packages': {},
             'classes': {},
             'interfaces': {},
             'dependencies': [],
             'entry_points': []
         }
+    
+    @staticmethod
+    def _merge_into(analysis_result: Dict[str, Any], result: Dict[str, Any], module: Optional[str] = None):
+        """Add a partial analysis (one module or one file) to an accumulated one, tagging types with their module"""
+        for pkg_name, pkg_info in result.get('packages', {}).items():
+            merged = analysis_result['packages'].setdefault(pkg_name, {'files': [], 'classes': [], 'interfaces': []})
+            for key in ('files', 'classes', 'interfaces'):
+                merged[key].extend(pkg_info[key])
+        for key in ('classes', 'interfaces'):
+            for type_name, type_info in result.get(key, {}).items():
+                analysis_result[key][type_name] = {**type_info, 'module': module} if module else type_info
+        analysis_result['dependencies'].extend(result.get('dependencies', []))
+        analysis_result['entry_points'].extend(result.get('entry_points', []))
+    
+    def _analyze_file(self, file_path: str, content: str, analysis_result: Dict[str, Any], summary_only: bool = False):
+        """
+        Analyze a single Java file and merge its results into the project analysis
         
-        java_files = self._find_java_files(project_path)
+        Args:
+            file_path: Path to the Java file
+            content: Source code of the file
+            analysis_result: Project analysis being accumulated
+            summary_only: Keep type summaries only (see _summarize_type)
+        """
+        tree = javalang.parse.parse(content)
         
-        for file_path in java_files:
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                
-                tree = javalang.parse.parse(content)
-                
-                # Extract package information
-                package_info = self._extract_package_info(tree)
-                if package_info:
-                    pkg_name = package_info['name']
-                    if pkg_name not in analysis_result['packages']:
-                        analysis_result['packages'][pkg_name] = {
-                            'files': [],
-                            'classes': [],
-                            'interfaces': []
-                        }
-                    analysis_result['packages'][pkg_name]['files'].append(file_path)
-                
-                # Extract class and interface information
-                classes, interfaces = self._extract_types(tree, file_path)
-                
-                for cls in classes:
-                    class_key = f"{package_info['name']}.{cls['name']}" if package_info else cls['name']
-                    analysis_result['classes'][class_key] = cls
-                    if package_info:
-                        analysis_result['packages'][package_info['name']]['classes'].append(cls['name'])
-                
-                for iface in interfaces:
-                    iface_key = f"{package_info['name']}.{iface['name']}" if package_info else iface['name']
-                    analysis_result['interfaces'][iface_key] = iface
-                    if package_info:
-                        analysis_result['packages'][package_info['name']]['interfaces'].append(iface['name'])
-                
-                # Extract dependencies
-                file_deps = self._extract_dependencies(tree, package_info['name'] if package_info else '')
-                analysis_result['dependencies'].extend(file_deps)
-                
-                # Find potential entry points
-                entry_points = self._find_entry_points(tree, file_path)
-                analysis_result['entry_points'].extend(entry_points)
-                
-            except Exception as e:
-                print(f"Error analyzing file {file_path}: {str(e)}")
-                continue
+        # Extract package information
+        package_info = self._extract_package_info(tree)
+        if package_info:
+            pkg_name = package_info['name']
+            if pkg_name not in analysis_result['packages']:
+                analysis_result['packages'][pkg_name] = {
+                    'files': [],
+                    'classes': [],
+                    'interfaces': []
+                }
+            analysis_result['packages'][pkg_name]['files'].append(file_path)
         
-        return analysis_result
+        # Types, members, entry points and references come from a single walk over the tree
+        visitor = visit_java(tree, file_path)
+        
+        for type_info in visitor.types:
+            # Enums and records are classes, annotation types are interfaces
+            bucket = 'interfaces' if type_info['kind'] in ('interface', 'annotation') else 'classes'
+            analysis_result[bucket][type_info['qualified_name']] = self._summarize_type(type_info) if summary_only else type_info
+            if package_info:
+                analysis_result['packages'][package_info['name']][bucket].append(type_info['name'])
+        
+        # Extract dependencies
+        file_deps = self._extract_dependencies(tree, package_info['name'] if package_info else '')
+        analysis_result['dependencies'].extend(file_deps)
+        
+        analysis_result['entry_points'].extend(visitor.entry_points)
+    
+    @staticmethod
+    def _summarize_type(type_info: Dict[str, Any]) -> Dict[str, Any]:
+        """Type entry without Javadoc, constructors and member details, used once the memory budget is exceeded"""
+        summary = {key: value for key, value in type_info.items() if key not in ('documentation', 'constructors')}
+        summary['methods'] = [{'name': method['name'], 'modifiers': method['modifiers'], 'annotations': method['annotations']}
+                              for method in type_info.get('methods', [])]
+        summary['fields'] = [{'name': field['name'], 'type': field['type']} for field in type_info.get('fields', [])]
+        summary['summary'] = True
+        return summary
     
-    def _find_java_files(self, directory: str) -> List[str]:
-        """Find all Java files in a directory recursively"""
-        java_files = []
-        for root, dirs, files in os.walk(directory):
-            for file in files:
-                if file.endswith('.java'):
-                    java_files.append(os.path.join(root, file))
-        return java_files
+    def _summarize_types(self, analysis_result: Dict[str, Any]):
+        """Replace the types collected so far by their summaries"""
+        for key in ('classes', 'interfaces'):
+            for type_name, type_info in analysis_result[key].items():
+                analysis_result[key][type_name] = self._summarize_type(type_info)
     
     def _extract_package_info(self, tree: javalang.ast.Node) -> Optional[Dict[str, str]]:
         """Extract package information from Java AST"""
@@ -100,66 +309,6 @@ class JavaAnalyzer:
             }
         return None
     
-    def _extract_types(self, tree: javalang.ast.Node, file_path: str) -> tuple[List[Dict], List[Dict]]:
-        """Extract classes and interfaces from Java AST"""
-        classes = []
-        interfaces = []
-        
-        for path, node in tree.filter(javalang.tree.ClassDeclaration):
-            class_info = {
-                'name': node.name,
-                'file_path': file_path,
-                'modifiers': [m.value for m in node.modifiers] if hasattr(node, 'modifiers') else [],
-                'extends': node.extends.name if node.extends else None,
-                'implements': [imp.name for imp in node.implements] if node.implements else [],
-                'methods': [],
-                'fields': []
-            }
-            
-            # Extract methods
-            for item in node.body:
-                if isinstance(item, javalang.tree.MethodDeclaration):
-                    method_info = {
-                        'name': item.name,
-                        'return_type': str(item.return_type) if item.return_type else 'void',
-                        'modifiers': [m.value for m in item.modifiers] if hasattr(item, 'modifiers') else [],
-                        'parameters': [{'name': p.name, 'type': str(p.type)} for p in item.parameters]
-                    }
-                    class_info['methods'].append(method_info)
-                
-                elif isinstance(item, javalang.tree.FieldDeclaration):
-                    field_info = {
-                        'name': item.declarators[0].name if item.declarators else '',
-                        'type': str(item.type),
-                        'modifiers': [m.value for m in item.modifiers] if hasattr(item, 'modifiers') else []
-                    }
-                    class_info['fields'].append(field_info)
-            
-            classes.append(class_info)
-        
-        for path, node in tree.filter(javalang.tree.InterfaceDeclaration):
-            interface_info = {
-                'name': node.name,
-                'file_path': file_path,
-                'modifiers': [m.value for m in node.modifiers] if hasattr(node, 'modifiers') else [],
-                'extends': [ext.name for ext in node.extends] if node.extends else [],
-                'methods': []
-            }
-            
-            # Extract methods from interface
-            for item in node.body:
-                if isinstance(item, javalang.tree.MethodDeclaration):
-                    method_info = {
-                        'name': item.name,
-                        'return_type': str(item.return_type) if item.return_type else 'void',
-                        'modifiers': [m.value for m in item.modifiers] if hasattr(item, 'modifiers') else []
-                    }
-                    interface_info['methods'].append(method_info)
-            
-            interfaces.append(interface_info)
-        
-        return classes, interfaces
-    
     def _extract_dependencies(self, tree: javalang.ast.Node, current_package: str) -> List[Dict[str, str]]:
         """Extract dependencies from imports and type references"""
         dependencies = []
@@ -175,35 +324,6 @@ class JavaAnalyzer:
                     'target': import_path
                 })
         
-        # TODO: Extract type reference dependencies
-        # This would involve traversing the AST to find type references that might indicate dependencies
+        # Type references are collected per type by the visitor (see 'references' of each type)
         
         return dependencies
-    
-    def _find_entry_points(self, tree: javalang.ast.Node, file_path: str) -> List[Dict[str, Any]]:
-        """Find potential entry points like main methods"""
-        entry_points = []
-        
-        for path, node in tree.filter(javalang.tree.MethodDeclaration):
-            if node.name == 'main' and 'public' in [m.value for m in node.modifiers] and 'static' in [m.value for m in node.modifiers]:
-                # Check if it's a valid main method signature
-                if len(node.parameters) == 1:
-                    param = node.parameters[0]
-                    if hasattr(param.type, 'name') and param.type.name == 'String' and param.type.dimensions:
-                        class_path = file_path  # Simplified - in reality would need to extract class name
-                        entry_points.append({
-                            'type': 'main_method',
-                            'class': self._get_class_containing_main(tree, node),
-                            'file_path': file_path
-                        })
-        
-        return entry_points
-    
-    def _get_class_containing_main(self, tree: javalang.ast.Node, main_node: javalang.tree.MethodDeclaration) -> Optional[str]:
-        """Get the class name containing the main method"""
-        # Find the parent class of the main method
-        for path, node in tree.filter(javalang.tree.ClassDeclaration):
-            for item in node.body:
-                if item == main_node:
-                    return node.name
-        return None
\ No newline at end of file
@@ -2,60 +2,176 @@
 LLM client for interacting with OpenRouter API
 """
 import os
+import json
+import time
 import openai
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from dotenv import load_dotenv
+from src.utils.tracing import tracer
+from src.utils.deadline import DeadlineExceeded, call_with_deadline, remaining
+from src.diagrams.mermaid_validator import validate_mermaid, MermaidError
+from .model_router import ModelRouter, estimate_tokens, ledger
+from .context_selector import get_selector
+from .incremental import IncrementalGenerator
 
 load_dotenv()
 
 
+ARTIFACT_TASKS = ["meta_description", "component_diagram", "sequence_diagram", "openapi_spec"]
+
+# JSON schema of the single-call response, one property per artifact
+ARTIFACT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "meta_description": {"type": "string"},
+        "component_diagram": {"type": "string"},
+        "sequence_diagram": {"type": "string"},
+        # A JSON text: strict structured output rejects a free-form object without declared properties
+        "openapi_spec": {"type": "string"}
+    }
+}
+
+ARTIFACT_INSTRUCTIONS = {
+    "meta_description": "concise meta description: technology stack, purpose, main functionalities, architecture overview",
+    "component_diagram": "Mermaid component diagram code (no code fences) with packages as containers, classes/interfaces inside them and dependency arrows",
+    "sequence_diagram": "Mermaid sequenceDiagram code (no code fences) showing the main entry points and how major components interact",
+    "openapi_spec": "OpenAPI specification for the REST endpoints (@RestController, @RequestMapping, @GetMapping, ...) as a JSON-encoded string"
+}
+
+# Diagram types accepted for each Mermaid artifact
+MERMAID_KEYWORDS = {
+    "component_diagram": {"graph", "flowchart", "classDiagram", "componentDiagram", "C4Component", "C4Container"},
+    "sequence_diagram": {"sequenceDiagram"}
+}
+
+# Repair prompts sent for a diagram failing local validation before it is returned as is
+MERMAID_REPAIR_ATTEMPTS = int(os.getenv("MERMAID_REPAIR_ATTEMPTS", "2"))
+
+# Lines of context sent around the broken statement
+MERMAID_REPAIR_CONTEXT = int(os.getenv("MERMAID_REPAIR_CONTEXT", "3"))
+
+
 class LLMClient:
     """Client for interacting with LLM via OpenRouter API"""
     
-    def __init__(self):
-        # Use OpenRouter API
+    def __init__(self, base_url: Optional[str] = None):
+        # Use OpenRouter API unless base_url or LLM_BASE_URL points elsewhere (e.g. the offline stub server)
+        custom_url = base_url or os.getenv("LLM_BASE_URL")
+        base_url = custom_url or "https://openrouter.ai/api/v1"
         self.client = openai.OpenAI(
-            api_key=os.getenv("OPENROUTER_API_KEY"),
-            base_url="https://openrouter.ai/api/v1"
+            api_key=os.getenv("OPENROUTER_API_KEY") or ("offline" if custom_url else None),
+            base_url=base_url,
+            max_retries=int(os.getenv("LLM_MAX_RETRIES", "2"))
         )
+        # Per-task model, token and timeout settings
+        self.router = ModelRouter()
         # Model identifier for Qwen Coder
-        self.model = "qwen/qwen-2.5-coder-32b-instruct"
+        self.model = self.router.routes["default"]["model"]
+        # Per-piece generation with cached results when LLM_CACHE_DIR is set
+        self.incremental = IncrementalGenerator.from_env(self)
     
-    def generate_response(self, prompt: str, max_tokens: int = 2048, temperature: float = 0.7) -> str:
+    def generate_response(self, prompt: str, max_tokens: Optional[int] = None,
+                          temperature: Optional[float] = None, task: Optional[str] = None,
+                          response_format: Optional[Dict[str, Any]] = None) -> str:
         """
         Generate response from LLM
         
         Args:
             prompt: Input prompt for the model
-            max_tokens: Maximum tokens in response
-            temperature: Sampling temperature
+            max_tokens: Maximum tokens in response (defaults to the task route)
+            temperature: Sampling temperature (defaults to the task route)
+            task: Generation task used to pick the route
+            response_format: Structured output format passed through to the API
             
         Returns:
             Generated response text
+
+        Raises:
+            DeadlineExceeded: The call could not finish before the deadline of the running node
         """
+        route = self.router.route(task, prompt)
+        model = route["model"]
+        extra = {"response_format": response_format} if response_format else {}
+        # Under a deadline a request may not outlive it: no retries and a timeout capped at the time left
+        left = remaining()
+        client = self.client if left is None else self.client.with_options(max_retries=0)
+        timeout = route["timeout"] if left is None else max(0.0, min(route["timeout"], left))
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=max_tokens,
-                temperature=temperature
-            )
+            with tracer.span("llm_call", category="llm", model=model, task=task, route=route["reason"]) as span:
+                start = time.perf_counter()
+                response = call_with_deadline(
+                    f"llm_call:{task or 'default'}",
+                    client.chat.completions.create,
+                    model=model,
+                    messages=[
+                        {"role": "user", "content": prompt}
+                    ],
+                    max_tokens=max_tokens if max_tokens is not None else route["max_tokens"],
+                    temperature=temperature if temperature is not None else route["temperature"],
+                    timeout=timeout,
+                    **extra
+                )
+                elapsed = time.perf_counter() - start
+                usage = getattr(response, "usage", None)
+                prompt_tokens = getattr(usage, "prompt_tokens", None)
+                completion_tokens = getattr(usage, "completion_tokens", None)
+                ledger.add(
+                    prompt_tokens if prompt_tokens is not None else estimate_tokens(prompt),
+                    completion_tokens or 0,
+                    elapsed
+                )
+                span.set(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+                tracer.record_llm_call(
+                    model, elapsed, prompt_tokens, completion_tokens,
+                    prompt_chars=len(prompt), task=task
+                )
             return response.choices[0].message.content
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             raise Exception(f"Error calling LLM API: {str(e)}")
     
-    def analyze_code_structure(self, code_analysis: Dict[str, Any]) -> Dict[str, str]:
+    def _render_analysis(self, code_analysis: Dict[str, Any], task: str) -> str:
+        """
+        Render the code analysis for inclusion into a prompt
+        
+        Only the types most relevant to the task are included, up to the
+        context_tokens budget of the task route. LLM_CONTEXT_SELECTION=0 sends
+        the whole analysis instead.
+        
+        Args:
+            code_analysis: Result from JavaAnalyzer
+            task: Name of the generation task the prompt is built for
+            
+        Returns:
+            Text representation of the analysis
+        """
+        with tracer.span("build_prompt", category="llm", task=task) as span:
+            if os.getenv("LLM_CONTEXT_SELECTION", "1").lower() in ("0", "false", "no"):
+                rendered = str(code_analysis)
+            else:
+                route = {**self.router.routes["default"], **self.router.routes.get(task, {})}
+                rendered = get_selector(code_analysis).render(task, route.get("context_tokens"))
+            span.set(chars=len(rendered))
+        return rendered
+    
+    def analyze_code_structure(self, code_analysis: Dict[str, Any], single_call: Optional[bool] = None) -> Dict[str, str]:
         """
         Analyze code structure and generate documentation
         
         Args:
             code_analysis: Result from JavaAnalyzer
+            single_call: Request all artifacts in one structured call
+                (defaults to the LLM_SINGLE_CALL environment variable)
             
         Returns:
             Dictionary containing various documentation elements
         """
+        if single_call is None:
+            single_call = os.getenv("LLM_SINGLE_CALL", "").lower() in ("1", "true", "yes")
+        if single_call:
+            return self.generate_all_artifacts(code_analysis)
+        
         # Generate meta description
         meta_description = self.generate_meta_description(code_analysis)
         
@@ -75,8 +191,186 @@ class LLMClient:
             'openapi_spec': openapi_spec
         }
     
-    def generate_meta_description(self, code_analysis: Dict[str, Any]) -> str:
-        """Generate meta description of the project"""
+    def generate_all_artifacts(self, code_analysis: Dict[str, Any],
+                               requested: Optional[List[str]] = None) -> Dict[str, str]:
+        """
+        Generate every documentation artifact with a single structured LLM call
+        
+        The project structure is sent once and the model answers with a JSON
+        object matching ARTIFACT_SCHEMA. Parts that are missing or fail
+        validation are regenerated with the dedicated per-task prompts.
+        With LLM_CACHE_DIR set, the per-task generators are used right away
+        so that only changed pieces are regenerated.
+        
+        Args:
+            code_analysis: Result from JavaAnalyzer
+            requested: Artifacts to generate, all of ARTIFACT_TASKS by default
+            
+        Returns:
+            Dictionary with the requested artifacts (meta_description, component_diagram,
+            sequence_diagram and openapi_spec by default)
+        """
+        requested = requested or ARTIFACT_TASKS
+        tasks = [task for task in requested if not self.router.is_moot(task, code_analysis)]
+        artifacts: Dict[str, str] = {}
+        
+        # Cached pieces beat one big call: only the changed pieces are regenerated
+        if tasks and not self.incremental:
+            schema = {
+                "type": "object",
+                "properties": {task: ARTIFACT_SCHEMA["properties"][task] for task in tasks},
+                "required": tasks,
+                "additionalProperties": False
+            }
+            prompt = f"""
+        Analyze the following Java project structure and produce its documentation as one JSON object.
+        Fields:
+        {chr(10).join(f"        - {task}: {ARTIFACT_INSTRUCTIONS[task]}" for task in tasks)}
+        
+        Project structure:
+        {self._render_analysis(code_analysis, "bundle")}
+        
+        Respond with the JSON object only.
+        """
+            try:
+                response = self.generate_response(
+                    prompt,
+                    task="bundle",
+                    response_format={
+                        "type": "json_schema",
+                        "json_schema": {"name": "project_documentation", "strict": True, "schema": schema}
+                    }
+                )
+                artifacts = self._split_artifacts(response, tasks)
+            except DeadlineExceeded:
+                raise
+            except Exception as e:
+                print(f"Single-call generation failed, falling back to per-task calls: {str(e)}")
+        
+        generators = {
+            "meta_description": self.generate_meta_description,
+            "component_diagram": self.generate_component_diagram,
+            "sequence_diagram": self.generate_sequence_diagram,
+            "openapi_spec": self.generate_openapi_spec
+        }
+        for task in requested:
+            if task not in artifacts:
+                artifacts[task] = generators[task](code_analysis)
+        return artifacts
+    
+    def _split_artifacts(self, response: str, tasks: List[str]) -> Dict[str, str]:
+        """
+        Validate a structured response and split it into per-task artifacts
+        
+        Args:
+            response: Raw JSON text returned by the model
+            tasks: Tasks that were requested
+            
+        Returns:
+            Artifacts that passed validation, keyed by task
+        """
+        text = response.strip()
+        if text.startswith("```"):
+            text = text.split("\n", 1)[1] if "\n" in text else ""
+            text = text.rsplit("```", 1)[0]
+        data = json.loads(text)
+        if not isinstance(data, dict):
+            return {}
+        
+        artifacts = {}
+        for task in tasks:
+            value = data.get(task)
+            if task == "openapi_spec":
+                # Declared as a string in the schema; an object from a lenient provider is taken as well
+                if isinstance(value, str):
+                    try:
+                        value = json.loads(value)
+                    except ValueError:
+                        continue
+                if isinstance(value, dict):
+                    artifacts[task] = json.dumps(value, indent=2)
+            elif task == "meta_description":
+                if isinstance(value, str) and value.strip():
+                    artifacts[task] = value.strip()
+            elif isinstance(value, str):
+                diagram = self._extract_mermaid(value)
+                keyword = diagram.split(maxsplit=1)[0] if diagram else ""
+                if keyword in MERMAID_KEYWORDS[task]:
+                    artifacts[task] = self._validated_diagram(task, diagram)
+        return artifacts
+    
+    def _extract_mermaid(self, response: str) -> str:
+        """Extract the mermaid code block from a response, if there is one"""
+        if "```mermaid" in response and "```" in response:
+            start_idx = response.find("```mermaid") + len("```mermaid")
+            end_idx = response.find("```", start_idx)
+            return response[start_idx:end_idx].strip()
+        return response.strip()
+    
+    def _validated_diagram(self, task: str, diagram: str) -> str:
+        """
+        Check a generated diagram locally and repair broken statements
+        
+        Instead of regenerating the diagram from the project structure, only
+        the lines around the first error and the error message are sent back
+        to the model, and its answer replaces those lines. A repair is kept
+        only if it leaves fewer errors than before.
+        
+        Args:
+            task: component_diagram or sequence_diagram
+            diagram: Mermaid code without fences
+            
+        Returns:
+            Repaired diagram, or the original one if it could not be fixed
+        """
+        errors = validate_mermaid(diagram, MERMAID_KEYWORDS[task])
+        attempts = 0
+        while errors and attempts < MERMAID_REPAIR_ATTEMPTS:
+            attempts += 1
+            try:
+                repaired = self._repair_diagram(task, diagram, errors[0])
+            except Exception as e:
+                print(f"Mermaid repair of {task} failed: {str(e)}")
+                break
+            repaired_errors = validate_mermaid(repaired, MERMAID_KEYWORDS[task])
+            if len(repaired_errors) >= len(errors):
+                break
+            diagram, errors = repaired, repaired_errors
+        if errors:
+            print(f"{task} still has {len(errors)} Mermaid syntax error(s), first: {errors[0]}")
+        return diagram
+    
+    def _repair_diagram(self, task: str, diagram: str, error: MermaidError) -> str:
+        """Ask the model to fix the lines around one syntax error and splice its answer back"""
+        lines = diagram.split("\n")
+        # The header line is only sent when it is the broken one
+        start = max(0 if error.line == 1 else 1, error.line - 1 - MERMAID_REPAIR_CONTEXT)
+        end = min(len(lines), error.line + MERMAID_REPAIR_CONTEXT)
+        snippet = "\n".join(lines[start:end])
+        diagram_type = lines[0].split()[0] if lines and lines[0].split() else "Mermaid"
+        prompt = f"""
+        Fix a Mermaid syntax error in lines {start + 1}-{end} of a {diagram_type} diagram.
+        
+        Parser error: {error}
+        
+        Broken lines:
+        ```mermaid
+        {snippet}
+        ```
+        
+        Return only the corrected replacement for exactly these lines as a mermaid code block,
+        keep node ids and labels unchanged where possible and do not add other parts of the diagram.
+        """
+        response = self.generate_response(prompt, task="mermaid_repair")
+        replacement = self._extract_mermaid(response).split("\n")
+        return "\n".join(lines[:start] + replacement + lines[end:])
+    
+    def generate_meta_description(self, code_analysis: Dict[str, Any], incremental: bool = True) -> str:
+        """Generate meta description of the project (per module with LLM_CACHE_DIR)"""
+        if self.router.is_moot("meta_description", code_analysis):
+            return "No Java types were found in the project."
+        if incremental and self.incremental:
+            return self.incremental.meta_description(code_analysis)
         prompt = f"""
         Analyze the following Java project structure and provide a meta description including:
         1. Technology stack
@@ -85,69 +379,87 @@ class LLMClient:
         4. Architecture overview
         
         Project structure:
-        {code_analysis}
+        {self._render_analysis(code_analysis, "meta_description")}
         
         Provide a concise but comprehensive description.
         """
-        return self.generate_response(prompt)
+        return self.generate_response(prompt, task="meta_description")
     
-    def generate_component_diagram(self, code_analysis: Dict[str, Any]) -> str:
-        """Generate Mermaid component diagram"""
+    def enrich_meta_description(self, code_analysis: Dict[str, Any], static_description: str) -> str:
+        """Refine a meta description derived from build files, README and code without changing its facts"""
+        prompt = f"""
+        The following meta description of a Java project was derived from its build files, README and code.
+        Rewrite it into a concise but comprehensive description with the technology stack, purpose,
+        main functionalities and an architecture overview. Keep names, versions and counts as they are.
+        
+        Description:
+        {static_description}
+        
+        Project structure:
+        {self._render_analysis(code_analysis, "meta_description")}
+        """
+        return self.generate_response(prompt, task="meta_description")
+    
+    def generate_component_diagram(self, code_analysis: Dict[str, Any], incremental: bool = True) -> str:
+        """Generate Mermaid component diagram (per package with LLM_CACHE_DIR)"""
+        if self.router.is_moot("component_diagram", code_analysis):
+            return ""
+        if incremental and self.incremental:
+            return self.incremental.component_diagram(code_analysis)
         prompt = f"""
         Create a Mermaid component diagram for the following Java project structure.
         Show packages as containers and classes/interfaces inside them.
         Show dependencies between components with arrows.
         
         Project structure:
-        {code_analysis}
+        {self._render_analysis(code_analysis, "component_diagram")}
         
         Format the response as a Mermaid diagram code block like:
         ```mermaid
         ...
         ```
         """
-        response = self.generate_response(prompt)
-        # Extract the mermaid code block
-        if "```mermaid" in response and "```" in response:
-            start_idx = response.find("```mermaid") + len("```mermaid")
-            end_idx = response.find("```", start_idx)
-            return response[start_idx:end_idx].strip()
-        return response
+        response = self.generate_response(prompt, task="component_diagram")
+        return self._validated_diagram("component_diagram", self._extract_mermaid(response))
     
-    def generate_sequence_diagram(self, code_analysis: Dict[str, Any]) -> str:
-        """Generate Mermaid sequence diagram"""
+    def generate_sequence_diagram(self, code_analysis: Dict[str, Any], incremental: bool = True) -> str:
+        """Generate Mermaid sequence diagram (cached as a whole with LLM_CACHE_DIR)"""
+        if self.router.is_moot("sequence_diagram", code_analysis):
+            return ""
+        if incremental and self.incremental:
+            return self.incremental.sequence_diagram(code_analysis)
         prompt = f"""
         Create a Mermaid sequence diagram showing the main interactions in this Java project.
         Focus on the main entry points and how major components interact.
         
         Project structure:
-        {code_analysis}
+        {self._render_analysis(code_analysis, "sequence_diagram")}
         
         Format the response as a Mermaid diagram code block like:
         ```mermaid
         ...
         ```
         """
-        response = self.generate_response(prompt)
-        # Extract the mermaid code block
-        if "```mermaid" in response and "```" in response:
-            start_idx = response.find("```mermaid") + len("```mermaid")
-            end_idx = response.find("```", start_idx)
-            return response[start_idx:end_idx].strip()
-        return response
+        response = self.generate_response(prompt, task="sequence_diagram")
+        return self._validated_diagram("sequence_diagram", self._extract_mermaid(response))
     
-    def generate_openapi_spec(self, code_analysis: Dict[str, Any]) -> str:
-        """Generate OpenAPI specification if the project contains APIs"""
+    def generate_openapi_spec(self, code_analysis: Dict[str, Any], incremental: bool = True) -> str:
+        """Generate OpenAPI specification if the project contains APIs (per controller with LLM_CACHE_DIR)"""
+        # No web annotations anywhere means there is no API to describe
+        if self.router.is_moot("openapi_spec", code_analysis):
+            return "{}"
+        if incremental and self.incremental:
+            return self.incremental.openapi_spec(code_analysis)
         prompt = f"""
         Analyze the following Java project structure and generate an OpenAPI specification
         if it contains REST APIs or web services. Look for annotations like @RestController,
         @RequestMapping, @GetMapping, @PostMapping, etc.
         
         Project structure:
-        {code_analysis}
+        {self._render_analysis(code_analysis, "openapi_spec")}
         
         If the project does not appear to contain APIs, return an empty object.
         
         Format as a valid OpenAPI JSON specification.
         """
-        return self.generate_response(prompt)
\ No newline at end of file
+        return self.generate_response(prompt, task="openapi_spec")
\ No newline at end of file
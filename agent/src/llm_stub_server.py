@@ -0,0 +1,433 @@
+"""
+Offline OpenAI-compatible stand-in server for benchmarking the LLM stages
+
+Serves /v1/chat/completions with configurable latency, token throughput,
+error and 429 injection and SSE streaming. Responses can be synthesized,
+replayed from cassettes, or recorded from a real upstream into cassettes.
+
+Usage:
+    python -m agent.src.llm_stub_server --port 8089 --latency lognormal:-0.5,0.6 --tokens-per-second 80
+    LLM_BASE_URL=http://127.0.0.1:8089/v1 python -m agent.main
+
+    python -m agent.src.llm_stub_server --record cassettes/ --upstream https://openrouter.ai/api/v1
+    python -m agent.src.llm_stub_server --replay cassettes/
+
+    python -m agent.src.llm_stub_server bench --base-url http://127.0.0.1:8089/v1 --requests 200 --concurrency 16
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import statistics
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, List, Optional, Tuple
+import requests
+
+
+def parse_distribution(spec: str):
+    """
+    Build a sampler from a latency distribution spec (seconds)
+
+    Supported forms: 'fixed:0.5', 'uniform:0.1,1.0', 'normal:mean,stddev',
+    'lognormal:mu,sigma' and 'exp:mean'.
+    """
+    kind, _, raw_args = spec.partition(":")
+    args = [float(arg) for arg in raw_args.split(",") if arg]
+    samplers = {
+        "fixed": lambda: args[0],
+        "uniform": lambda: random.uniform(args[0], args[1]),
+        "normal": lambda: random.gauss(args[0], args[1]),
+        "lognormal": lambda: random.lognormvariate(args[0], args[1]),
+        "exp": lambda: random.expovariate(1.0 / args[0]),
+    }
+    if kind not in samplers:
+        raise ValueError(f"Unknown latency distribution: {spec}")
+    sampler = samplers[kind]
+    return lambda: max(0.0, sampler())
+
+
+def cassette_key(body: Dict[str, Any]) -> str:
+    """Stable hash of the parts of a request that determine the response"""
+    relevant = {
+        "model": body.get("model"),
+        "messages": body.get("messages"),
+        "max_tokens": body.get("max_tokens"),
+        "temperature": body.get("temperature"),
+        "response_format": body.get("response_format"),
+    }
+    return hashlib.sha256(json.dumps(relevant, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def count_tokens(text: str) -> int:
+    """Rough token count, about four characters per token"""
+    return max(1, len(text) // 4)
+
+
+def synthesize_content(body: Dict[str, Any]) -> str:
+    """Produce a plausible deterministic answer for a prompt without any model"""
+    prompt = " ".join(str(m.get("content", "")) for m in body.get("messages", []))
+    response_format = body.get("response_format") or {}
+    if response_format.get("type") in ("json_schema", "json_object"):
+        schema = response_format.get("json_schema", {}).get("schema", {})
+        result = {}
+        for name, prop in schema.get("properties", {}).items():
+            if prop.get("type") == "object":
+                result[name] = {"openapi": "3.0.0", "info": {"title": "Stub API", "version": "1.0.0"}, "paths": {}}
+            elif "sequence" in name:
+                result[name] = "sequenceDiagram\n    Client->>Service: request\n    Service-->>Client: response"
+            elif "diagram" in name:
+                result[name] = "flowchart LR\n    app --> service\n    service --> repository"
+            else:
+                result[name] = "Stub description of the analyzed Java project."
+        return json.dumps(result)
+    if "fix a mermaid syntax error" in prompt.lower() and "```mermaid" in prompt:
+        # No model to fix anything: echo the broken lines, the client then keeps its diagram
+        snippet = prompt.split("```mermaid", 1)[1].split("```", 1)[0]
+        return "```mermaid\n" + snippet.strip() + "\n```"
+    if "part of a mermaid flowchart" in prompt.lower():
+        header = re.search(r"`(subgraph [^`]+)`", prompt)
+        ids = re.search(r"Use exactly these node ids: ([^\n]*)", prompt)
+        nodes = [pair.split(" -> ")[-1].strip() for pair in ids.group(1).split(", ")] if ids else []
+        body = "\n".join(f"    {node}" for node in nodes)
+        return f"```mermaid\n{header.group(1) if header else 'subgraph stub'}\n{body}\nend\n```"
+    if "openapi 3.0 operations" in prompt.lower():
+        return json.dumps({"paths": {"/stub": {"get": {"responses": {"200": {"description": "OK"}}}}}, "schemas": {}})
+    if "sequence diagram" in prompt.lower():
+        return "```mermaid\nsequenceDiagram\n    Client->>Service: request\n    Service-->>Client: response\n```"
+    if "component diagram" in prompt.lower():
+        return "```mermaid\nflowchart LR\n    app --> service\n    service --> repository\n```"
+    if "openapi" in prompt.lower():
+        return json.dumps({"openapi": "3.0.0", "info": {"title": "Stub API", "version": "1.0.0"}, "paths": {}})
+    return "Stub description of the analyzed Java project."
+
+
+class UpstreamError(Exception):
+    """The upstream API failed or answered with something that is not a completion"""
+
+
+class StubConfig:
+    """Behaviour knobs of the stub server"""
+
+    def __init__(self, latency: str = "fixed:0", tokens_per_second: float = 0.0,
+                 error_rate: float = 0.0, rate_limit_rate: float = 0.0, retry_after: float = 1.0,
+                 replay_dir: Optional[str] = None, record_dir: Optional[str] = None,
+                 upstream: Optional[str] = None, upstream_key: Optional[str] = None, strict: bool = False,
+                 seed: Optional[int] = None):
+        self.sample_latency = parse_distribution(latency)
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.replay_dir = replay_dir
+        self.record_dir = record_dir
+        self.upstream = upstream.rstrip("/") if upstream else None
+        self.upstream_key = upstream_key
+        self.strict = strict
+        self.stats = {"requests": 0, "errors": 0, "rate_limited": 0, "replayed": 0, "recorded": 0, "synthesized": 0,
+                      "upstream_errors": 0}
+        self.lock = threading.Lock()
+        if seed is not None:
+            random.seed(seed)
+
+    def count(self, key: str):
+        with self.lock:
+            self.stats[key] += 1
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Request handler implementing the subset of the OpenAI API used by LLMClient"""
+
+    config: StubConfig = None
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json(200, {"object": "list", "data": [{"id": "stub", "object": "model"}]})
+        elif self.path.rstrip("/").endswith("/stats"):
+            self._send_json(200, self.config.stats)
+        else:
+            self._send_json(404, {"error": {"message": "Not found"}})
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "Not found"}})
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        config = self.config
+        config.count("requests")
+
+        roll = random.random()
+        if roll < config.rate_limit_rate:
+            config.count("rate_limited")
+            self._send_json(429, {"error": {"message": "Rate limit exceeded", "type": "rate_limit"}},
+                            headers={"Retry-After": str(config.retry_after)})
+            return
+        if roll < config.rate_limit_rate + config.error_rate:
+            config.count("errors")
+            self._send_json(500, {"error": {"message": "Injected server error", "type": "server_error"}})
+            return
+
+        try:
+            content, usage = self._resolve(body)
+        except LookupError as e:
+            self._send_json(404, {"error": {"message": str(e), "type": "cassette_miss"}})
+            return
+        except UpstreamError as e:
+            config.count("upstream_errors")
+            self._send_json(502, {"error": {"message": f"Upstream request failed: {e}", "type": "upstream_error"}})
+            return
+
+        # Time to first token, then completion tokens at the configured throughput
+        time.sleep(config.sample_latency())
+        generation_time = usage["completion_tokens"] / config.tokens_per_second if config.tokens_per_second else 0.0
+
+        if body.get("stream"):
+            self._stream(body, content, usage, generation_time)
+        else:
+            time.sleep(generation_time)
+            self._send_json(200, self._completion(body, content, usage))
+
+    def _resolve(self, body: Dict[str, Any]) -> Tuple[str, Dict[str, int]]:
+        """Find the answer: cassette replay, upstream recording or synthesis"""
+        config = self.config
+        key = cassette_key(body)
+        if config.replay_dir:
+            path = os.path.join(config.replay_dir, f"{key}.json")
+            if os.path.exists(path):
+                with open(path, "r", encoding="utf-8") as f:
+                    cassette = json.load(f)
+                config.count("replayed")
+                return cassette["content"], cassette["usage"]
+            if config.strict:
+                raise LookupError(f"No cassette for request {key}")
+
+        if config.upstream:
+            upstream_body = {**body, "stream": False}
+            try:
+                response = requests.post(
+                    f"{config.upstream}/chat/completions",
+                    json=upstream_body,
+                    headers={"Authorization": f"Bearer {config.upstream_key}"},
+                    timeout=600
+                )
+                response.raise_for_status()
+                data = response.json()
+                content = data["choices"][0]["message"]["content"]
+            except (requests.RequestException, ValueError, KeyError, IndexError, TypeError) as e:
+                raise UpstreamError(str(e) or type(e).__name__) from e
+            usage = {
+                "prompt_tokens": data.get("usage", {}).get("prompt_tokens", 0),
+                "completion_tokens": data.get("usage", {}).get("completion_tokens", 0),
+            }
+            if config.record_dir:
+                os.makedirs(config.record_dir, exist_ok=True)
+                with open(os.path.join(config.record_dir, f"{key}.json"), "w", encoding="utf-8") as f:
+                    json.dump({"request": body, "content": content, "usage": usage}, f, indent=2)
+                config.count("recorded")
+            return content, usage
+
+        content = synthesize_content(body)
+        prompt = " ".join(str(m.get("content", "")) for m in body.get("messages", []))
+        config.count("synthesized")
+        return content, {"prompt_tokens": count_tokens(prompt), "completion_tokens": count_tokens(content)}
+
+    def _completion(self, body: Dict[str, Any], content: str, usage: Dict[str, int]) -> Dict[str, Any]:
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {**usage, "total_tokens": usage["prompt_tokens"] + usage["completion_tokens"]},
+        }
+
+    def _stream(self, body: Dict[str, Any], content: str, usage: Dict[str, int], generation_time: float):
+        """Send the answer as server-sent events, pacing chunks over the generation time"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        chunk_size = 16
+        chunks = [content[i:i + chunk_size] for i in range(0, len(content), chunk_size)] or [""]
+        delay = generation_time / len(chunks)
+        for index, piece in enumerate(chunks):
+            delta = {"content": piece}
+            if index == 0:
+                delta["role"] = "assistant"
+            self._event({
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body.get("model", "stub"),
+                "choices": [{"index": 0, "delta": delta, "finish_reason": None}],
+            })
+            time.sleep(delay)
+        self._event({
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            "usage": {**usage, "total_tokens": usage["prompt_tokens"] + usage["completion_tokens"]},
+        })
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+        self.close_connection = True
+
+    def _event(self, payload: Dict[str, Any]):
+        self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode("utf-8"))
+        self.wfile.flush()
+
+    def _send_json(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def create_server(config: StubConfig, host: str = "127.0.0.1", port: int = 8089) -> ThreadingHTTPServer:
+    """Create (but do not start) a stub server; port 0 picks a free port"""
+    handler = type("ConfiguredStubHandler", (StubHandler,), {"config": config})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def start_in_background(config: StubConfig, host: str = "127.0.0.1", port: int = 0) -> Tuple[ThreadingHTTPServer, str]:
+    """Start a stub server in a daemon thread and return it with its base URL"""
+    server = create_server(config, host, port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/v1"
+
+
+def run_benchmark(base_url: str, total_requests: int, concurrency: int, prompt_chars: int) -> Dict[str, Any]:
+    """
+    Drive LLMClient against a base URL and measure throughput, latency and failures
+
+    Args:
+        base_url: OpenAI-compatible endpoint (usually the stub server)
+        total_requests: Number of calls to make
+        concurrency: Number of calls in flight at once
+        prompt_chars: Size of the synthetic prompt
+
+    Returns:
+        Benchmark statistics
+    """
+    from .llm_client import LLMClient
+    client = LLMClient(base_url=base_url)
+    prompt = "Create a Mermaid component diagram. " + "x" * prompt_chars
+    latencies: List[float] = []
+    failures: List[str] = []
+    lock = threading.Lock()
+
+    def call(_):
+        start = time.perf_counter()
+        try:
+            client.generate_response(prompt, task="component_diagram")
+            with lock:
+                latencies.append(time.perf_counter() - start)
+        except Exception as e:
+            with lock:
+                failures.append(str(e))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(call, range(total_requests)))
+    wall = time.perf_counter() - start
+
+    # Retries show up as extra requests in the stub's own counters
+    try:
+        server_stats = requests.get(f"{base_url.rstrip('/')}/stats", timeout=5).json()
+    except Exception:
+        server_stats = None
+
+    latencies.sort()
+    percentile = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] if latencies else None
+    return {
+        "requests": total_requests,
+        "concurrency": concurrency,
+        "succeeded": len(latencies),
+        "failed": len(failures),
+        "wall_seconds": wall,
+        "throughput_rps": len(latencies) / wall if wall else 0.0,
+        "latency_mean": statistics.mean(latencies) if latencies else None,
+        "latency_p50": percentile(0.5),
+        "latency_p95": percentile(0.95),
+        "latency_p99": percentile(0.99),
+        "server_stats": server_stats,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline OpenAI-compatible stub server")
+    subparsers = parser.add_subparsers(dest="command")
+
+    bench = subparsers.add_parser("bench", help="Benchmark LLMClient against a running server")
+    bench.add_argument("--base-url", default="http://127.0.0.1:8089/v1")
+    bench.add_argument("--requests", type=int, default=100)
+    bench.add_argument("--concurrency", type=int, default=8)
+    bench.add_argument("--prompt-chars", type=int, default=8000)
+
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", default="fixed:0", help="fixed:S | uniform:A,B | normal:M,SD | lognormal:MU,SIGMA | exp:MEAN")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="Completion throughput, 0 for instant")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 429")
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--replay", help="Cassette directory to replay responses from")
+    parser.add_argument("--record", help="Cassette directory to record upstream responses into")
+    parser.add_argument("--upstream", help="Real OpenAI-compatible base URL used when recording")
+    parser.add_argument("--strict", action="store_true", help="Fail requests missing from the replay cassettes")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+    if args.record and not args.upstream:
+        parser.error("--record needs --upstream to record responses from")
+
+    if args.command == "bench":
+        print(json.dumps(run_benchmark(args.base_url, args.requests, args.concurrency, args.prompt_chars), indent=2))
+        return
+
+    config = StubConfig(
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after,
+        replay_dir=args.replay,
+        record_dir=args.record,
+        upstream=args.upstream,
+        upstream_key=os.getenv("OPENROUTER_API_KEY"),
+        strict=args.strict,
+        seed=args.seed
+    )
+    server = create_server(config, args.host, args.port)
+    print(f"Stub LLM server listening on http://{args.host}:{server.server_address[1]}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(json.dumps(config.stats))
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,44 @@
 """
 Meta description generator
 """
-from typing import Dict, Any
+import os
+from typing import Dict, Any, Optional
 from ...src.llm_client import LLMClient
+from src.analyzer.project_meta import ProjectMetaGenerator, format_meta_description
+from src.loader.sources import open_source
+
+
+# Let the LLM refine the description derived from build files, README and code (otherwise it is used as is)
+META_LLM_ENRICHMENT = os.getenv("META_LLM_ENRICHMENT", "false").lower() in ("1", "true", "yes")
 
 
 class MetaDescriptionGenerator:
-    """Generates meta descriptions from code analysis"""
+    """Generates meta descriptions from build files, README and code analysis, optionally refined by the LLM"""
     
-    def __init__(self):
-        self.llm_client = LLMClient()
+    def __init__(self, llm_enrichment: bool = META_LLM_ENRICHMENT):
+        self.llm_enrichment = llm_enrichment
+        self.llm_client = LLMClient() if llm_enrichment else None
     
-    def generate(self, code_analysis: Dict[str, Any]) -> str:
+    def generate(self, code_analysis: Dict[str, Any], repo_path: Optional[str] = None,
+                 project_name: Optional[str] = None) -> str:
         """
         Generate meta description from code analysis
         
         Args:
             code_analysis: Result from JavaAnalyzer
+            repo_path: Local clone (working tree or bare) to read build files and README from
+            project_name: Name used when the build files declare none
             
         Returns:
             Meta description text
         """
-        return self.llm_client.generate_meta_description(code_analysis)
\ No newline at end of file
+        if repo_path is None:
+            # Nothing to read the build from: the LLM is the only source
+            return (self.llm_client or LLMClient()).generate_meta_description(code_analysis)
+        
+        with open_source(repo_path) as source:
+            meta = ProjectMetaGenerator().generate(source, code_analysis, project_name)
+        description = format_meta_description(meta)
+        if self.llm_enrichment:
+            return self.llm_client.enrich_meta_description(code_analysis, description)
+        return description
@@ -0,0 +1,152 @@
+"""
+Per-task model routing with token and latency budgets
+"""
+import os
+import threading
+from typing import Dict, Any, Optional
+import yaml
+from .code_index import get_index
+
+
+DEFAULT_MODEL = "qwen/qwen-2.5-coder-32b-instruct"
+FALLBACK_MODEL = os.getenv("LLM_FALLBACK_MODEL", "qwen/qwen-2.5-7b-instruct")
+
+# Settings per generation task; 'default' applies to anything not listed.
+# context_tokens is the prompt budget for the project context selected for the task
+DEFAULT_ROUTES: Dict[str, Dict[str, Any]] = {
+    "default": {"model": DEFAULT_MODEL, "max_tokens": 2048, "temperature": 0.7, "timeout": 120, "context_tokens": 6000},
+    "meta_description": {"max_tokens": 768, "temperature": 0.5, "timeout": 60, "context_tokens": 3000},
+    "component_diagram": {"max_tokens": 2048, "temperature": 0.2, "timeout": 120, "context_tokens": 8000},
+    "sequence_diagram": {"max_tokens": 2048, "temperature": 0.2, "timeout": 120, "context_tokens": 4000},
+    "openapi_spec": {"max_tokens": 4096, "temperature": 0.1, "timeout": 180, "context_tokens": 6000},
+    "bundle": {"max_tokens": 8192, "temperature": 0.2, "timeout": 300, "context_tokens": 12000},
+    "mermaid_repair": {"max_tokens": 512, "temperature": 0.0, "timeout": 60, "context_tokens": 0},
+}
+
+# Prompts below this size are routed to the fallback model as they do not need the big one
+SMALL_PROMPT_TOKENS = int(os.getenv("LLM_SMALL_PROMPT_TOKENS", "1500"))
+
+# Annotations that mark a class as a web endpoint (Spring MVC, JAX-RS, Servlet API)
+WEB_ANNOTATIONS = {
+    "RestController", "Controller", "RequestMapping", "GetMapping", "PostMapping",
+    "PutMapping", "DeleteMapping", "PatchMapping", "Path", "WebServlet",
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token estimate for a prompt
+
+    The routed models use different tokenizers, roughly four characters per
+    token is close enough for budgeting decisions.
+    """
+    return len(text) // 4 + 1
+
+
+class UsageLedger:
+    """Tokens and LLM latency spent during the current run, shared by all clients"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.prompt_tokens = 0
+            self.completion_tokens = 0
+            self.seconds = 0.0
+            self.calls = 0
+
+    def add(self, prompt_tokens: int, completion_tokens: int, seconds: float):
+        with self._lock:
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            self.seconds += seconds
+            self.calls += 1
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+
+ledger = UsageLedger()
+
+
+class ModelRouter:
+    """Chooses model, max_tokens, temperature and timeout for each generation task"""
+
+    def __init__(self, routes: Optional[Dict[str, Dict[str, Any]]] = None,
+                 token_budget: Optional[int] = None, latency_budget: Optional[float] = None):
+        self.routes = {task: dict(route) for task, route in DEFAULT_ROUTES.items()}
+        for task, route in (routes or self._load_routes_file()).items():
+            self.routes.setdefault(task, {}).update(route)
+
+        if token_budget is None and os.getenv("LLM_TOKEN_BUDGET"):
+            token_budget = int(os.getenv("LLM_TOKEN_BUDGET"))
+        if latency_budget is None and os.getenv("LLM_LATENCY_BUDGET"):
+            latency_budget = float(os.getenv("LLM_LATENCY_BUDGET"))
+        self.token_budget = token_budget
+        self.latency_budget = latency_budget
+
+    def _load_routes_file(self) -> Dict[str, Dict[str, Any]]:
+        """Load routing overrides from the YAML/JSON file named by LLM_ROUTING_FILE"""
+        path = os.getenv("LLM_ROUTING_FILE")
+        if not path:
+            return {}
+        with open(path, "r", encoding="utf-8") as f:
+            return yaml.safe_load(f) or {}
+
+    def budget_exceeded(self) -> bool:
+        """Whether the run has used up its token or latency budget"""
+        if self.token_budget is not None and ledger.total_tokens >= self.token_budget:
+            return True
+        if self.latency_budget is not None and ledger.seconds >= self.latency_budget:
+            return True
+        return False
+
+    def route(self, task: Optional[str], prompt: str) -> Dict[str, Any]:
+        """
+        Resolve call settings for a task
+
+        Args:
+            task: Generation task name (None uses the default route)
+            prompt: Prompt about to be sent
+
+        Returns:
+            Dictionary with model, max_tokens, temperature, timeout and the routing reason
+        """
+        route = {**self.routes["default"], **self.routes.get(task or "default", {})}
+        route["reason"] = "table"
+        fallback = route.get("fallback_model", FALLBACK_MODEL)
+
+        if self.budget_exceeded():
+            route["model"] = fallback
+            route["max_tokens"] = min(route["max_tokens"], 1024)
+            route["reason"] = "budget_exceeded"
+        elif estimate_tokens(prompt) < route.get("small_prompt_tokens", SMALL_PROMPT_TOKENS):
+            route["model"] = fallback
+            route["reason"] = "small_prompt"
+        return route
+
+    def is_moot(self, task: str, code_analysis: Dict[str, Any]) -> bool:
+        """
+        Whether static analysis already shows that the task has nothing to produce
+
+        Args:
+            task: Generation task name
+            code_analysis: Result from JavaAnalyzer
+
+        Returns:
+            True if the LLM call can be skipped
+        """
+        if not get_index(code_analysis).types:
+            return True
+        if task == "openapi_spec":
+            return not has_web_endpoints(code_analysis)
+        return False
+
+
+def has_web_endpoints(code_analysis: Dict[str, Any]) -> bool:
+    """Check whether any class or interface carries a web endpoint annotation"""
+    index = get_index(code_analysis)
+    return any(index.annotated(annotation) for annotation in WEB_ANNOTATIONS)
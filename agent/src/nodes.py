@@ -2,7 +2,7 @@
 Nodes for the LangGraph agent workflow
 """
 import os
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from .graph_state import GraphState
 from .git_handler import GitHandler
 from .java_analyzer import JavaAnalyzer
@@ -10,6 +10,21 @@ from .components.generator import ComponentDiagramGenerator
 from .behavior.generator import BehaviorDiagramGenerator
 from .meta.generator import MetaDescriptionGenerator
 from .openapi.generator import OpenAPISpecGenerator
+from .bundle.generator import ArtifactBundleGenerator
+from .static_artifacts import StaticArtifactGenerator
+from src.loader.sources import checkout_free_enabled, open_source
+from src.utils.deadline import DeadlineExceeded, call_with_deadline, current_deadline
+
+
+def _project_name(state: GraphState) -> Optional[str]:
+    """Repository name from the URL, used when the build files declare none"""
+    return state.get("repo_url", "").rstrip("/").split("/")[-1].removesuffix(".git") or None
+
+
+def _degradation(state: GraphState, node: str, fallback: str, error: DeadlineExceeded) -> list:
+    """Degradations of the run with one more entry for a node that fell back to static output"""
+    print(f"{error} ({node}), using {fallback}")
+    return state.get("degradations", []) + [{"node": node, "stage": error.stage, "reason": "deadline", "fallback": fallback}]
 
 
 def clone_repository(state: GraphState) -> Dict[str, Any]:
@@ -30,7 +45,11 @@ def clone_repository(state: GraphState) -> Dict[str, Any]:
     )
     
     try:
-        local_path = git_handler.clone_repository(state["repo_url"])
+        # With CHECKOUT_FREE only the git objects are fetched, sources are read from blobs
+        if checkout_free_enabled():
+            local_path = call_with_deadline("clone", git_handler.clone_bare, state["repo_url"])
+        else:
+            local_path = call_with_deadline("clone", git_handler.clone_repository, state["repo_url"])
         return {
             **state,
             "local_repo_path": local_path,
@@ -58,10 +77,18 @@ def analyze_code(state: GraphState) -> Dict[str, Any]:
     java_analyzer = JavaAnalyzer()
     
     try:
-        code_analysis = java_analyzer.analyze_project(state["local_repo_path"])
+        # The node's share of the run deadline bounds the analysis (anytime mode, most valuable files first)
+        with open_source(state["local_repo_path"]) as source:
+            code_analysis = java_analyzer.analyze_source(source, deadline=current_deadline())
+        degradations = state.get("degradations", [])
+        coverage = code_analysis.get("coverage")
+        if current_deadline() is not None and coverage and not coverage["complete"]:
+            degradations = degradations + [{"node": "analyze_code", "stage": "analyze_code", "reason": "deadline",
+                                            "fallback": f"partial analysis ({coverage['files_analyzed']} of {coverage['files_total']} files)"}]
         return {
             **state,
             "code_analysis": code_analysis,
+            "degradations": degradations,
             "completed_tasks": state.get("completed_tasks", []) + ["analyze_code"]
         }
     except Exception as e:
@@ -83,13 +110,19 @@ def generate_meta_description(state: GraphState) -> Dict[str, Any]:
     """
     print("Generating meta description...")
     
-    meta_generator = MetaDescriptionGenerator()
-    
+    degradations = state.get("degradations", [])
     try:
-        meta_description = meta_generator.generate(state["code_analysis"])
+        meta_generator = MetaDescriptionGenerator()
+        try:
+            meta_description = meta_generator.generate(state["code_analysis"], state.get("local_repo_path"), _project_name(state))
+        except DeadlineExceeded as e:
+            degradations = _degradation(state, "generate_meta_description", "static meta description", e)
+            meta_description = StaticArtifactGenerator().meta_description(
+                state["code_analysis"], state.get("local_repo_path"), _project_name(state))
         return {
             **state,
             "meta_description": meta_description,
+            "degradations": degradations,
             "completed_tasks": state.get("completed_tasks", []) + ["generate_meta_description"]
         }
     except Exception as e:
@@ -113,11 +146,17 @@ def generate_component_diagram(state: GraphState) -> Dict[str, Any]:
     
     component_generator = ComponentDiagramGenerator()
     
+    degradations = state.get("degradations", [])
     try:
-        component_diagram = component_generator.generate(state["code_analysis"])
+        try:
+            component_diagram = component_generator.generate(state["code_analysis"])
+        except DeadlineExceeded as e:
+            degradations = _degradation(state, "generate_component_diagram", "static component diagram", e)
+            component_diagram = StaticArtifactGenerator().component_diagram(state["code_analysis"])
         return {
             **state,
             "component_diagram": component_diagram,
+            "degradations": degradations,
             "completed_tasks": state.get("completed_tasks", []) + ["generate_component_diagram"]
         }
     except Exception as e:
@@ -141,11 +180,17 @@ def generate_behavior_diagram(state: GraphState) -> Dict[str, Any]:
     
     behavior_generator = BehaviorDiagramGenerator()
     
+    degradations = state.get("degradations", [])
     try:
-        behavior_diagram = behavior_generator.generate(state["code_analysis"])
+        try:
+            behavior_diagram = behavior_generator.generate(state["code_analysis"])
+        except DeadlineExceeded as e:
+            degradations = _degradation(state, "generate_behavior_diagram", "static sequence diagram", e)
+            behavior_diagram = StaticArtifactGenerator().sequence_diagram(state["code_analysis"])
         return {
             **state,
             "behavior_diagram": behavior_diagram,
+            "degradations": degradations,
             "completed_tasks": state.get("completed_tasks", []) + ["generate_behavior_diagram"]
         }
     except Exception as e:
@@ -169,15 +214,71 @@ def generate_openapi_spec(state: GraphState) -> Dict[str, Any]:
     
     openapi_generator = OpenAPISpecGenerator()
     
+    degradations = state.get("degradations", [])
     try:
-        openapi_spec = openapi_generator.generate(state["code_analysis"])
+        try:
+            openapi_spec = openapi_generator.generate(state["code_analysis"])
+        except DeadlineExceeded as e:
+            degradations = _degradation(state, "generate_openapi_spec", "static OpenAPI skeleton", e)
+            openapi_spec = StaticArtifactGenerator().openapi_spec(state["code_analysis"])
         return {
             **state,
             "openapi_spec": openapi_spec,
+            "degradations": degradations,
             "completed_tasks": state.get("completed_tasks", []) + ["generate_openapi_spec"]
         }
     except Exception as e:
         return {
             **state,
             "error": f"Error generating OpenAPI spec: {str(e)}"
+        }
+
+
+def generate_all_artifacts(state: GraphState) -> Dict[str, Any]:
+    """
+    Node to generate all documentation artifacts with a single LLM call
+    
+    Args:
+        state: Current graph state
+        
+    Returns:
+        Updated state with meta description, diagrams and OpenAPI specification
+    """
+    print("Generating all artifacts in a single call...")
+    
+    bundle_generator = ArtifactBundleGenerator()
+    
+    degradations = state.get("degradations", [])
+    try:
+        try:
+            artifacts = bundle_generator.generate(
+                state["code_analysis"], state.get("local_repo_path"), _project_name(state))
+        except DeadlineExceeded as e:
+            degradations = _degradation(state, "generate_all_artifacts", "static artifacts", e)
+            static_generator = StaticArtifactGenerator()
+            artifacts = {
+                "meta_description": static_generator.meta_description(
+                    state["code_analysis"], state.get("local_repo_path"), _project_name(state)),
+                "component_diagram": static_generator.component_diagram(state["code_analysis"]),
+                "sequence_diagram": static_generator.sequence_diagram(state["code_analysis"]),
+                "openapi_spec": static_generator.openapi_spec(state["code_analysis"])
+            }
+        return {
+            **state,
+            "meta_description": artifacts["meta_description"],
+            "component_diagram": artifacts["component_diagram"],
+            "behavior_diagram": artifacts["sequence_diagram"],
+            "openapi_spec": artifacts["openapi_spec"],
+            "degradations": degradations,
+            "completed_tasks": state.get("completed_tasks", []) + [
+                "generate_meta_description",
+                "generate_component_diagram",
+                "generate_behavior_diagram",
+                "generate_openapi_spec"
+            ]
+        }
+    except Exception as e:
+        return {
+            **state,
+            "error": f"Error generating artifacts: {str(e)}"
         }
\ No newline at end of file
@@ -0,0 +1,189 @@
+"""
+Artifacts built from the code analysis alone, used when the LLM runs out of time
+"""
+import json
+from typing import Any, Dict, List, Optional, Tuple
+from src.analyzer.project_meta import ProjectMetaGenerator, format_meta_description
+from src.diagrams.mermaid_writer import node_id
+from src.loader.sources import open_source
+from .code_index import get_index
+from .context_selector import get_selector
+from .model_router import WEB_ANNOTATIONS
+
+
+# Class-level annotations marking a controller (method-level mappings are checked separately)
+CONTROLLER_ANNOTATIONS = {"RestController", "Controller", "Path", "WebServlet", "RequestMapping"}
+
+# HTTP method of a mapping annotation (Spring and JAX-RS)
+HTTP_METHODS = {
+    "GetMapping": "GET", "PostMapping": "POST", "PutMapping": "PUT", "DeleteMapping": "DELETE", "PatchMapping": "PATCH",
+    "GET": "GET", "POST": "POST", "PUT": "PUT", "DELETE": "DELETE", "PATCH": "PATCH",
+}
+
+# Participants of the sequence diagram
+MAX_SEQUENCE_PARTICIPANTS = 6
+
+
+def package_id(package: str) -> str:
+    """Mermaid id of a package subgraph"""
+    return node_id(f"pkg_{package}")
+
+
+def types_by_package(code_analysis: Dict[str, Any]) -> Dict[str, List[str]]:
+    """Qualified names of the analyzed types per package, packages without types left out"""
+    index = get_index(code_analysis)
+    groups: Dict[str, List[str]] = {}
+    for package, package_info in code_analysis.get("packages", {}).items():
+        names = package_info.get("classes", []) + package_info.get("interfaces", [])
+        fqns = [f"{package}.{name}" if package else name for name in names]
+        groups[package] = sorted(fqn for fqn in set(fqns) if fqn in index.types)
+    return {package: fqns for package, fqns in sorted(groups.items()) if fqns}
+
+
+def static_subgraph(package: str, fqns: List[str]) -> str:
+    """Flowchart subgraph of a package listing its types"""
+    lines = [f'subgraph {package_id(package)}["{package or "(default)"}"]']
+    lines += [f'    {node_id(fqn)}["{fqn.rsplit(".", 1)[-1] if package else fqn}"]' for fqn in fqns]
+    lines.append("end")
+    return "\n".join(lines)
+
+
+def package_edges(code_analysis: Dict[str, Any], packages: Dict[str, List[str]]) -> List[str]:
+    """Flowchart edges of the import dependencies between the given packages"""
+    edges = sorted({(dep.get("from_package", ""), dep.get("to_package", ""))
+                    for dep in code_analysis.get("dependencies", [])
+                    if dep.get("from_package") in packages and dep.get("to_package") in packages
+                    and dep.get("from_package") != dep.get("to_package")})
+    return [f"{package_id(a)} --> {package_id(b)}" for a, b in edges]
+
+
+def controller_types(code_analysis: Dict[str, Any]) -> List[str]:
+    """Qualified names of the types that are controllers or carry web mappings"""
+    index = get_index(code_analysis)
+    controllers = []
+    for fqn, info in sorted(index.types.items()):
+        annotated = CONTROLLER_ANNOTATIONS & set(info.get("annotations", []))
+        mapped = any(WEB_ANNOTATIONS & set(m.get("annotations", [])) for m in info.get("methods", []))
+        if annotated or mapped:
+            controllers.append(fqn)
+    return controllers
+
+
+class StaticArtifactGenerator:
+    """Generates every artifact without the LLM, as the fallback of a node whose time is up"""
+
+    def meta_description(self, code_analysis: Dict[str, Any], repo_path: Optional[str] = None,
+                         project_name: Optional[str] = None) -> str:
+        """
+        Meta description from build files, README and code analysis
+
+        Args:
+            code_analysis: Result from JavaAnalyzer
+            repo_path: Local clone (working tree or bare)
+            project_name: Name used when the build files declare none
+
+        Returns:
+            Meta description text
+        """
+        if repo_path is None:
+            index = get_index(code_analysis)
+            return (f"# {project_name or 'Java project'}\n\n"
+                    f"{len(index.types)} types in {len(code_analysis.get('packages', {}))} packages.")
+        with open_source(repo_path) as source:
+            meta = ProjectMetaGenerator().generate(source, code_analysis, project_name)
+        return format_meta_description(meta)
+
+    def component_diagram(self, code_analysis: Dict[str, Any]) -> str:
+        """
+        Flowchart with packages as subgraphs, their types inside and import dependencies between them
+
+        Args:
+            code_analysis: Result from JavaAnalyzer
+
+        Returns:
+            Mermaid flowchart without fences
+        """
+        packages = types_by_package(code_analysis)
+        if not packages:
+            return ""
+        lines = ["flowchart LR"]
+        for package, fqns in packages.items():
+            lines += ["    " + line for line in static_subgraph(package, fqns).split("\n")]
+        lines += ["    " + edge for edge in package_edges(code_analysis, packages)]
+        return "\n".join(lines)
+
+    def sequence_diagram(self, code_analysis: Dict[str, Any]) -> str:
+        """
+        Sequence diagram between the entry points and the most important types
+
+        Entry points (main classes, controllers) come first, the remaining
+        participants are the top types of the dependency graph. A message is
+        drawn wherever a participant references a later one, labelled with the
+        first method of the callee.
+
+        Args:
+            code_analysis: Result from JavaAnalyzer
+
+        Returns:
+            Mermaid sequence diagram without fences
+        """
+        index = get_index(code_analysis)
+        if not index.types:
+            return ""
+        entry_points = [entry.get("qualified_name") for entry in code_analysis.get("entry_points", [])]
+        candidates = entry_points + controller_types(code_analysis) + get_selector(code_analysis).important_types(MAX_SEQUENCE_PARTICIPANTS)
+        participants: List[str] = []
+        for fqn in candidates:
+            if fqn in index.types and fqn not in participants and len(participants) < MAX_SEQUENCE_PARTICIPANTS:
+                participants.append(fqn)
+
+        lines = ["sequenceDiagram"]
+        lines += [f"    participant {node_id(fqn)} as {index.types[fqn].get('name', fqn.rsplit('.', 1)[-1])}" for fqn in participants]
+        calls: List[Tuple[str, str]] = []
+        for position, caller in enumerate(participants):
+            for name in index.types[caller].get("references", []):
+                callee = index.resolve(name, caller)
+                if callee in participants[position + 1:] and (caller, callee) not in calls:
+                    calls.append((caller, callee))
+        for caller, callee in calls:
+            methods = index.types[callee].get("methods", [])
+            method = methods[0]["name"] if methods else "call"
+            lines.append(f"    {node_id(caller)}->>+{node_id(callee)}: {method}()")
+            lines.append(f"    {node_id(callee)}-->>-{node_id(caller)}: return")
+        if not calls:
+            lines.append(f"    Note over {node_id(participants[0])}: no calls between the main types found")
+        return "\n".join(lines)
+
+    def openapi_spec(self, code_analysis: Dict[str, Any]) -> str:
+        """
+        OpenAPI skeleton with one tag per controller listing its operations
+
+        The analysis keeps annotation names but not their values, so request
+        paths are unknown and the paths object stays empty.
+
+        Args:
+            code_analysis: Result from JavaAnalyzer
+
+        Returns:
+            OpenAPI specification in JSON format, "{}" without web endpoints
+        """
+        index = get_index(code_analysis)
+        tags = []
+        for fqn in controller_types(code_analysis):
+            operations = []
+            for method in index.types[fqn].get("methods", []):
+                verbs = [HTTP_METHODS[a] for a in method.get("annotations", []) if a in HTTP_METHODS]
+                if verbs or WEB_ANNOTATIONS & set(method.get("annotations", [])):
+                    operations.append(f"{'/'.join(verbs) or 'ANY'} {method['name']}")
+            if operations:
+                tags.append({"name": index.types[fqn].get("name", fqn), "description": ", ".join(operations)})
+        if not tags:
+            return "{}"
+        spec = {
+            "openapi": "3.0.0",
+            "info": {"title": "API", "version": "1.0.0",
+                     "description": "Operations per controller from static analysis; request paths were not generated"},
+            "paths": {},
+            "tags": tags,
+        }
+        return json.dumps(spec, indent=2)
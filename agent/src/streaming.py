@@ -0,0 +1,53 @@
+"""
+Progressive emission of workflow outputs as soon as their nodes finish
+"""
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+from src.utils.artifact_writer import ArtifactWriter, analysis_summary
+from src.utils.tracing import tracer
+from .model_router import ledger
+
+
+# State keys that become available after each node of the agent workflow
+NODE_ARTIFACTS = {
+    "analyze_code": ["code_analysis"],
+    "generate_meta_description": ["meta_description"],
+    "generate_component_diagram": ["component_diagram"],
+    "generate_behavior_diagram": ["behavior_diagram"],
+    "generate_openapi_spec": ["openapi_spec"],
+    "generate_all_artifacts": ["meta_description", "component_diagram", "behavior_diagram", "openapi_spec"],
+}
+
+
+async def astream_artifacts(workflow, initial_state: Dict[str, Any], writer: Optional[ArtifactWriter] = None,
+                            state: Optional[Dict[str, Any]] = None) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Run the workflow and yield each artifact the moment its node completes
+    
+    Args:
+        workflow: Compiled agent workflow
+        initial_state: Initial graph state
+        writer: Optional writer storing every artifact in the output directory
+        state: Optional dictionary kept up to date with the graph state, also
+            when the run fails half way (e.g. to clean up the clone)
+        
+    Returns:
+        Async iterator of (artifact name, value); the code analysis is emitted
+        as a short summary
+    """
+    if state is None:
+        state = dict(initial_state)
+    # Token/latency budgets and the trace cover one run, not everything since the process started
+    ledger.reset()
+    tracer.reset()
+    async for update in workflow.astream(initial_state, stream_mode="updates"):
+        for node, node_state in update.items():
+            state.update(node_state or {})
+            for name in NODE_ARTIFACTS.get(node, []):
+                value = node_state.get(name) if node_state else None
+                if not value:
+                    continue
+                if name == "code_analysis":
+                    name, value = "analysis_summary", analysis_summary(value)
+                if writer is not None:
+                    writer.write(name, value)
+                yield name, value
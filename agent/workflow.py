@@ -8,15 +8,27 @@ from .src.nodes import (
     generate_meta_description, 
     generate_component_diagram,
     generate_behavior_diagram,
-    generate_openapi_spec
+    generate_openapi_spec,
+    generate_all_artifacts
 )
 from .src.edges import (
+    single_call_enabled,
     route_after_clone,
     route_after_analysis,
     route_after_generation,
     route_to_finish
 )
 from .src.graph_state import GraphState
+from src.utils.tracing import traced_node
+from src.utils.deadline import deadline_node
+
+
+GENERATION_NODES = [
+    "generate_meta_description",
+    "generate_component_diagram",
+    "generate_behavior_diagram",
+    "generate_openapi_spec"
+]
 
 
 def create_agent_workflow():
@@ -29,13 +41,20 @@ def create_agent_workflow():
     # Create a stateful graph
     workflow = StateGraph(GraphState)
     
+    # Nodes in execution order: each node gets its share of the time the run has left
+    plan = ["clone_repository", "analyze_code"] + (["generate_all_artifacts"] if single_call_enabled() else GENERATION_NODES)
+    
+    def node(name, function):
+        return traced_node(name, deadline_node(name, function, plan))
+    
     # Add nodes to the graph
-    workflow.add_node("clone_repository", clone_repository)
-    workflow.add_node("analyze_code", analyze_code)
-    workflow.add_node("generate_meta_description", generate_meta_description)
-    workflow.add_node("generate_component_diagram", generate_component_diagram)
-    workflow.add_node("generate_behavior_diagram", generate_behavior_diagram)
-    workflow.add_node("generate_openapi_spec", generate_openapi_spec)
+    workflow.add_node("clone_repository", node("clone_repository", clone_repository))
+    workflow.add_node("analyze_code", node("analyze_code", analyze_code))
+    workflow.add_node("generate_meta_description", node("generate_meta_description", generate_meta_description))
+    workflow.add_node("generate_component_diagram", node("generate_component_diagram", generate_component_diagram))
+    workflow.add_node("generate_behavior_diagram", node("generate_behavior_diagram", generate_behavior_diagram))
+    workflow.add_node("generate_openapi_spec", node("generate_openapi_spec", generate_openapi_spec))
+    workflow.add_node("generate_all_artifacts", node("generate_all_artifacts", generate_all_artifacts))
     workflow.add_node("finish", lambda x: x)  # Terminal node
     workflow.add_node("error", lambda x: x)   # Error node
     
@@ -57,6 +76,7 @@ def create_agent_workflow():
         route_after_analysis,
         {
             "generate_meta_description": "generate_meta_description",
+            "generate_all_artifacts": "generate_all_artifacts",
             "error": "error"
         }
     )
@@ -79,6 +99,20 @@ def create_agent_workflow():
         }
     )
     
+    # Single-call mode fills every artifact at once, remaining tasks (if any) run one by one
+    workflow.add_conditional_edges(
+        "generate_all_artifacts",
+        route_after_generation,
+        {
+            "generate_meta_description": "generate_meta_description",
+            "generate_component_diagram": "generate_component_diagram",
+            "generate_behavior_diagram": "generate_behavior_diagram",
+            "generate_openapi_spec": "generate_openapi_spec",
+            "finish": "finish",
+            "error": "error"
+        }
+    )
+    
     # Add edges to terminal nodes
     workflow.add_edge("finish", "__end__")
     workflow.add_edge("error", "__end__")
@@ -2,6 +2,8 @@ import asyncio
 import os
 from dotenv import load_dotenv
 from src.agents.project_analyzer_agent import ProjectAnalyzerAgent
+from src.utils.tracing import tracer
+from src.utils.memory import memory
 
 # Загружаем переменные окружения
 load_dotenv()
@@ -25,7 +27,13 @@ async def main():
     
     try:
         print(f"Starting analysis of repository: {repo_url}")
-        result = await agent.analyze_project(repo_url, username, password)
+        # Артефакты выводятся (и пишутся в OUTPUT_DIR) по мере готовности, не дожидаясь конца анализа
+        result = None
+        async for name, value in agent.stream_project(repo_url, username, password):
+            if name == "final_result":
+                result = value
+            else:
+                print(f"[ready] {name}")
         
         print("\n=== PROJECT ANALYSIS RESULT ===")
         print(f"Project Name: {result.meta_description.project_name}")
@@ -47,6 +55,13 @@ async def main():
         
     except Exception as e:
         print(f"Error during analysis: {e}")
+    finally:
+        trace_path = tracer.export()
+        if trace_path:
+            print(f"Trace written to {trace_path}")
+        if memory.enabled:
+            report = memory.report()
+            print(f"Peak memory: {report['peak_rss_mb']} MB, degradations: {len(report['degradations'])}")
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
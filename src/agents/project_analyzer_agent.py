@@ -1,9 +1,78 @@
+import asyncio
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
 from langgraph.graph import END, START, StateGraph
-from typing import Dict, Any, List
-from src.models.project_description import ProjectAnalysisResult, ProjectMetaDescription
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple
+from src.models.project_description import ProjectAnalysisResult
 from src.utils.java_analyzer import JavaAnalyzer
 from src.diagrams.generator import DiagramGenerator
+from src.diagrams.renderer import DiagramRenderer
 from src.utils.repo_loader import RepoLoader
+from src.loader.sources import checkout_free_enabled, open_source
+from src.analyzer.project_meta import ProjectMetaGenerator
+from src.utils.tracing import traced_node, tracer
+from src.utils.memory import memory
+from src.utils.artifact_writer import ArtifactWriter, analysis_summary
+
+
+# Артефакты, которые становятся готовы после каждого узла графа
+NODE_ARTIFACTS = {
+    "load_repository": ["repo_info"],
+    "analyze_codebase": ["analysis_summary"],
+    "generate_meta_description": ["meta_description"],
+    "generate_diagrams": ["component_diagram", "sequence_diagram"],
+    "render_diagrams": ["rendered_diagrams"],
+    "generate_openapi_spec": ["openapi_specification"],
+    "compile_result": ["final_result"],
+}
+
+# Общий пул процессов для CPU-ёмкого анализа: несколько analyze_project не блокируют друг друга
+_analysis_workers: Optional[int] = None
+_analysis_executor = None
+
+
+def analysis_workers() -> int:
+    """
+    Размер пула анализа из ANALYSIS_WORKERS (0 - без пула). Читается при первом обращении,
+    после загрузки .env, и дальше не меняется, как и сам пул
+    """
+    global _analysis_workers
+    if _analysis_workers is None:
+        _analysis_workers = int(os.getenv("ANALYSIS_WORKERS", str(os.cpu_count() or 1)))
+    return _analysis_workers
+
+
+def get_analysis_executor() -> Executor:
+    """
+    Возвращает пул для анализа кода (None - стандартный пул потоков event loop)
+    """
+    global _analysis_executor
+    if _analysis_executor is None and analysis_workers() > 0:
+        _analysis_executor = ProcessPoolExecutor(max_workers=analysis_workers())
+    return _analysis_executor
+
+
+def _analyze_in_pool(parent_pid: int, budget_bytes: Optional[int], analyze, *args) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Запускает анализ в процессе пула и возвращает вместе с результатом замеры этого процесса
+    (фазы памяти, места аллокаций, деградации, время разбора файлов) для отчета родителя.
+    budget_bytes - доля бюджета памяти на один процесс пула
+    """
+    if os.getpid() == parent_pid:
+        return analyze(*args), {}
+    memory.limit(budget_bytes)
+    result = analyze(*args)
+    return result, {
+        "memory": memory.drain() if memory.enabled else {},
+        "file_timings": tracer.drain_files() if tracer.enabled else [],
+    }
+
+
+def _analysis_budget_share() -> Optional[int]:
+    """Бюджет памяти делится между процессами пула анализа"""
+    if not memory.budget_bytes or analysis_workers() <= 0:
+        return memory.budget_bytes
+    return memory.budget_bytes // analysis_workers()
 
 
 class ProjectAnalyzerAgent:
@@ -15,7 +84,9 @@ class ProjectAnalyzerAgent:
         self.api_key = api_key
         self.java_analyzer = JavaAnalyzer()
         self.diagram_generator = DiagramGenerator()
+        self.meta_generator = ProjectMetaGenerator()
         self.repo_loader = RepoLoader()
+        self.diagram_renderer = DiagramRenderer.from_env()
 
         # Инициализация LangGraph
         self.workflow = self._create_workflow()
@@ -25,58 +96,62 @@ class ProjectAnalyzerAgent:
         Создает граф workflow для анализа проекта
         """
         # Определяем узлы графа
-        def load_repository(state: Dict[str, Any]) -> Dict[str, Any]:
-            """Загружает репозиторий"""
+        async def load_repository(state: Dict[str, Any]) -> Dict[str, Any]:
+            """Загружает репозиторий (асинхронный git clone, информация о репозитории - в потоке)"""
             repo_url = state.get("repo_url")
             username = state.get("username")
             password = state.get("password")
 
             loader = RepoLoader(username=username, password=password)
-            repo_path = loader.clone_repo(repo_url)
+            commit = None
+            if checkout_free_enabled():
+                # Только объекты git, без рабочей копии: файлы читаются из блобов
+                repo_path, commit = await asyncio.to_thread(loader.clone_bare, repo_url, state.get("ref"))
+            else:
+                repo_path = await loader.clone_repo_async(repo_url)
+            repo_info = await asyncio.to_thread(loader.get_repo_info, repo_path)
 
             updated_state = state.copy()
             updated_state.update({
                 "repo_path": repo_path,
-                "repo_info": loader.get_repo_info(repo_path)
+                "repo_info": repo_info,
+                "commit": commit
             })
             return updated_state
 
-        def analyze_codebase(state: Dict[str, Any]) -> Dict[str, Any]:
-            """Анализирует кодовую базу"""
+        async def analyze_codebase(state: Dict[str, Any]) -> Dict[str, Any]:
+            """Анализирует кодовую базу в пуле процессов, не блокируя event loop"""
             repo_path = state.get("repo_path")
-            analysis_result = self.java_analyzer.analyze_project_structure(repo_path)
+            loop = asyncio.get_running_loop()
+            # При отмене задачи ещё не начатый анализ снимается из очереди пула
+            if state.get("commit"):
+                analysis_result, telemetry = await loop.run_in_executor(
+                    get_analysis_executor(), _analyze_in_pool, os.getpid(), _analysis_budget_share(),
+                    self.java_analyzer.analyze_commit, repo_path, state["commit"]
+                )
+            else:
+                analysis_result, telemetry = await loop.run_in_executor(
+                    get_analysis_executor(), _analyze_in_pool, os.getpid(), _analysis_budget_share(),
+                    self.java_analyzer.analyze_project_structure, repo_path
+                )
+            memory.absorb(telemetry.get("memory", {}))
+            tracer.absorb_files(telemetry.get("file_timings", []))
 
             updated_state = state.copy()
             updated_state.update({"code_analysis": analysis_result})
             return updated_state
 
         def generate_meta_description(state: Dict[str, Any]) -> Dict[str, Any]:
-            """Генерирует метаописание проекта"""
+            """
+            Генерирует метаописание проекта без LLM: стек технологий из pom.xml/build.gradle,
+            назначение из README, точки входа и контроллеры из результатов анализа
+            """
             code_analysis = state.get("code_analysis", {})
-            repo_info = state.get("repo_info", {})
-
-            # Извлекаем ключевые элементы для метаописания
-            project_name = repo_info.get("name", "Unknown")
-            technology_stack = ["Java"]
-
-            # Добавляем обнаруженные пакеты и классы в стек технологий
-            packages = code_analysis.get("all_packages", [])
-            classes = code_analysis.get("all_classes", [])
+            # Имя из сборки, иначе имя репозитория из URL
+            repo_name = (state.get("repo_url") or "").rstrip("/").split("/")[-1].removesuffix(".git") or None
 
-            # Определяем назначение и функциональность на основе анализа
-            purpose = "Java application"
-            functionality = "Contains various Java classes and packages"
-
-            # Определяем точки входа
-            entry_points = [cls for cls in classes if "main" in cls.lower() or "controller" in cls.lower()]
-
-            meta_description = ProjectMetaDescription(
-                project_name=project_name,
-                technology_stack=technology_stack + [pkg.replace('package ', '').replace(';', '') for pkg in packages],
-                purpose=purpose,
-                functionality=functionality,
-                entry_points=entry_points
-            )
+            with open_source(state["repo_path"], state.get("commit")) as source:
+                meta_description = self.meta_generator.generate(source, code_analysis, repo_name)
 
             updated_state = state.copy()
             updated_state.update({"meta_description": meta_description})
@@ -96,6 +171,32 @@ class ProjectAnalyzerAgent:
             })
             return updated_state
 
+        def render_diagrams(state: Dict[str, Any]) -> Dict[str, Any]:
+            """Отрисовывает диаграммы в SVG/PNG, если задан RENDER_DIR"""
+            if self.diagram_renderer is None:
+                return state
+
+            diagrams = {}
+            component_diagram = state.get("component_diagram")
+            if component_diagram:
+                diagrams["component"] = component_diagram.mermaid_code
+                for shard, code in (component_diagram.shards or {}).items():
+                    diagrams[f"component-{shard}"] = code
+            sequence_diagram = state.get("sequence_diagram")
+            if sequence_diagram:
+                diagrams["sequence"] = sequence_diagram.mermaid_code
+
+            # Отрисовка необязательна: без dot или при ошибке graphviz анализ продолжается без картинок
+            try:
+                rendered_diagrams = self.diagram_renderer.render_all(diagrams)
+            except Exception as e:
+                print(f"Error rendering diagrams: {str(e)}")
+                rendered_diagrams = {}
+
+            updated_state = state.copy()
+            updated_state.update({"rendered_diagrams": rendered_diagrams})
+            return updated_state
+
         def generate_openapi_spec(state: Dict[str, Any]) -> Dict[str, Any]:
             """Пытается сгенерировать OpenAPI спецификацию"""
             # В реальной реализации здесь будет логика поиска и анализа REST контроллеров
@@ -121,7 +222,8 @@ class ProjectAnalyzerAgent:
                 meta_description=meta_description,
                 component_diagram=component_diagram,
                 sequence_diagram=sequence_diagram,
-                openapi_specification=openapi_specification
+                openapi_specification=openapi_specification,
+                rendered_diagrams=state.get("rendered_diagrams")
             )
 
             updated_state = state.copy()
@@ -132,34 +234,87 @@ class ProjectAnalyzerAgent:
         workflow = StateGraph(dict)
 
         # Добавляем узлы
-        workflow.add_node("load_repository", load_repository)
-        workflow.add_node("analyze_codebase", analyze_codebase)
-        workflow.add_node("generate_meta_description", generate_meta_description)
-        workflow.add_node("generate_diagrams", generate_diagrams)
-        workflow.add_node("generate_openapi_spec", generate_openapi_spec)
-        workflow.add_node("compile_result", compile_result)
+        workflow.add_node("load_repository", traced_node("load_repository", load_repository))
+        workflow.add_node("analyze_codebase", traced_node("analyze_codebase", analyze_codebase))
+        workflow.add_node("generate_meta_description", traced_node("generate_meta_description", generate_meta_description))
+        workflow.add_node("generate_diagrams", traced_node("generate_diagrams", generate_diagrams))
+        workflow.add_node("render_diagrams", traced_node("render_diagrams", render_diagrams))
+        workflow.add_node("generate_openapi_spec", traced_node("generate_openapi_spec", generate_openapi_spec))
+        workflow.add_node("compile_result", traced_node("compile_result", compile_result))
 
         # Добавляем ребра - последовательное выполнение для избежания конфликта состояний
         workflow.add_edge(START, "load_repository")
         workflow.add_edge("load_repository", "analyze_codebase")
         workflow.add_edge("analyze_codebase", "generate_meta_description")
         workflow.add_edge("generate_meta_description", "generate_diagrams")
-        workflow.add_edge("generate_diagrams", "generate_openapi_spec")
+        workflow.add_edge("generate_diagrams", "render_diagrams")
+        workflow.add_edge("render_diagrams", "generate_openapi_spec")
         workflow.add_edge("generate_openapi_spec", "compile_result")
         workflow.add_edge("compile_result", END)
 
         return workflow.compile()
 
-    async def analyze_project(self, repo_url: str, username: str = None, password: str = None) -> ProjectAnalysisResult:
+    async def analyze_project(self, repo_url: str, username: str = None, password: str = None,
+                              ref: str = None) -> ProjectAnalysisResult:
         """
         Запускает анализ проекта
+        ref - ветка, тег или SHA коммита (используется при CHECKOUT_FREE)
         """
         inputs = {
             "repo_url": repo_url,
             "username": username,
-            "password": password
+            "password": password,
+            "ref": ref
         }
 
-        result = await self.workflow.ainvoke(inputs)
+        # Состояние отслеживается по ходу графа, чтобы освободить клон и при ошибке в любом узле
+        result: Dict[str, Any] = {}
+        try:
+            async for result in self.workflow.astream(inputs, stream_mode="values"):
+                pass
+        finally:
+            self._release_repo(result.get("repo_path"))
 
-        return result["final_result"]
\ No newline at end of file
+        return result["final_result"]
+
+    async def stream_project(self, repo_url: str, username: str = None, password: str = None,
+                             ref: str = None, output_dir: Optional[str] = None) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Запускает анализ проекта и отдает артефакты (имя, значение) по мере готовности узлов графа,
+        не дожидаясь compile_result. Если задан output_dir (или OUTPUT_DIR), каждый артефакт
+        сразу записывается в файл
+        """
+        writer = ArtifactWriter(output_dir) if output_dir else ArtifactWriter.from_env()
+        inputs = {
+            "repo_url": repo_url,
+            "username": username,
+            "password": password,
+            "ref": ref
+        }
+
+        repo_path = None
+        try:
+            async for update in self.workflow.astream(inputs, stream_mode="updates"):
+                for node, state in update.items():
+                    repo_path = (state or {}).get("repo_path") or repo_path
+                    for name in NODE_ARTIFACTS.get(node, []):
+                        if name == "analysis_summary":
+                            value = analysis_summary(state.get("code_analysis") or {})
+                        else:
+                            value = state.get(name)
+                        if value is None:
+                            continue
+                        # Итоговый результат повторяет уже записанные артефакты
+                        if writer is not None and name != "final_result":
+                            writer.write(name, value)
+                        yield name, value
+        finally:
+            # Также при ошибке узла или прерванной итерации
+            self._release_repo(repo_path)
+
+    def _release_repo(self, repo_path: Optional[str]):
+        """
+        Рабочая копия больше не нужна: возвращаем worktree в пул или удаляем временный клон
+        """
+        if repo_path:
+            self.repo_loader.release_repo(repo_path)
\ No newline at end of file
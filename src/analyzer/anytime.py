@@ -0,0 +1,174 @@
+"""Time-budgeted ("anytime") analysis: priority ordering of files and coverage statistics."""
+import os
+import random
+import re
+import time
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional
+
+from src.loader.sources import SourceFile
+
+
+# Settings read at call time, so that values loaded from .env count:
+#   ANALYSIS_TIME_BUDGET - wall-clock budget for the analysis in seconds; unset or 0 analyzes everything
+#   ANALYSIS_SCAN_SHARE - share of the budget that may be spent on the cheap header scan used for prioritization (0.25)
+
+HEADER_BYTES = 16 * 1024
+
+TIERS = ("entry_points", "public_api", "other")
+
+_PACKAGE_RE = re.compile(r"^\s*package\s+([\w.]+)\s*;", re.M)
+_IMPORT_RE = re.compile(r"^\s*import\s+(?:static\s+)?([\w.]+?)(?:\.\*)?\s*;", re.M)
+_PUBLIC_TYPE_RE = re.compile(r"\bpublic\s+(?:(?:abstract|final|sealed|non-sealed|static|strictfp)\s+)*(?:class|interface|enum|record|@interface)\b")
+_ENTRY_RE = re.compile(r"static\s+void\s+main\s*\(|@SpringBootApplication|@RestController|@Controller\b|@Path\b|@WebServlet")
+_ENTRY_FILE_SUFFIXES = ("Application.java", "Controller.java", "Resource.java", "Endpoint.java", "Main.java")
+
+
+def analysis_time_budget() -> Optional[float]:
+    """Wall-clock budget for the analysis in seconds from ANALYSIS_TIME_BUDGET; None analyzes everything."""
+    return float(os.getenv("ANALYSIS_TIME_BUDGET", "0")) or None
+
+
+def deadline_from_budget(time_budget: Optional[float]) -> Optional[float]:
+    """Absolute deadline (epoch seconds, valid across processes) for a budget in seconds."""
+    return time.time() + time_budget if time_budget else None
+
+
+class AnytimePlan:
+    """
+    Orders the files of a source so that the most valuable ones are analyzed first.
+
+    A header scan (package, imports, public types, entry point markers) of as
+    many files as the scan share of the budget allows gives every file a tier:
+    entry points and web endpoints, then public API, then everything else.
+    Packages with a high fan-in go first within a tier, and files are
+    interleaved across packages (stratified sampling) so that a cut-off
+    leaves a representative picture of the whole project.
+    """
+
+    def __init__(self, source, files: List[SourceFile], deadline: float, scan_share: Optional[float] = None):
+        if scan_share is None:
+            scan_share = float(os.getenv("ANALYSIS_SCAN_SHARE", "0.25"))
+        self.source = source
+        self.files = files
+        self.deadline = deadline
+        self.started = time.time()
+        self.scan_deadline = self.started + max(0.0, deadline - self.started) * scan_share
+        self.tier: Dict[str, str] = {}
+        self.package: Dict[str, str] = {}
+        self.scanned = 0
+        self.analyzed: List[str] = []
+        self.skipped: List[str] = []
+
+    def expired(self) -> bool:
+        return time.time() >= self.deadline
+
+    def record(self, source_file: SourceFile, skipped: bool = False):
+        """Mark a file as analyzed, or as reached but skipped (not admitted or failed to parse)."""
+        (self.skipped if skipped else self.analyzed).append(source_file.path)
+
+    def order(self) -> List[SourceFile]:
+        """Files in analysis order (the header scan happens here)."""
+        fan_in: Counter = Counter()
+        importers = defaultdict(set)
+        for source_file in self._stratified(self.files, lambda f: os.path.dirname(f.path), seed=True):
+            if time.time() >= self.scan_deadline:
+                break
+            try:
+                header = self.source.read_prefix(source_file, HEADER_BYTES).decode("latin-1")
+            except Exception:
+                continue
+            self.scanned += 1
+            package_match = _PACKAGE_RE.search(header)
+            package = package_match.group(1) if package_match else ""
+            self.package[source_file.path] = package
+            for imported in _IMPORT_RE.findall(header):
+                importers[imported.rsplit(".", 1)[0]].add(package)
+                importers[imported].add(package)
+            if _ENTRY_RE.search(header):
+                self.tier[source_file.path] = "entry_points"
+            elif _PUBLIC_TYPE_RE.search(header):
+                self.tier[source_file.path] = "public_api"
+            else:
+                self.tier[source_file.path] = "other"
+        for target, packages in importers.items():
+            fan_in[target] = len(packages - {target})
+
+        ordered = []
+        for tier in TIERS:
+            files = [f for f in self.files if self._tier(f) == tier]
+            ordered.extend(self._stratified(files, self._package, weights=fan_in))
+        return ordered
+
+    def _tier(self, source_file: SourceFile) -> str:
+        if source_file.path in self.tier:
+            return self.tier[source_file.path]
+        # Not scanned in time: fall back to naming conventions
+        return "entry_points" if source_file.path.endswith(_ENTRY_FILE_SUFFIXES) else "other"
+
+    def _package(self, source_file: SourceFile) -> str:
+        return self.package.get(source_file.path, os.path.dirname(source_file.path))
+
+    @staticmethod
+    def _stratified(files: List[SourceFile], key, weights: Optional[Counter] = None, seed: bool = False) -> List[SourceFile]:
+        """Round-robin over groups (heaviest group first), so every group is sampled early."""
+        groups: Dict[str, List[SourceFile]] = defaultdict(list)
+        for source_file in files:
+            groups[key(source_file)].append(source_file)
+        names = sorted(groups, key=lambda name: (-(weights or {}).get(name, 0), name))
+        if seed:
+            # Deterministic shuffle inside groups for the scan, so partial scans are not biased by file names
+            rng = random.Random(0)
+            for name in names:
+                rng.shuffle(groups[name])
+        ordered = []
+        active = [groups[name] for name in names]
+        index = 0
+        while active:
+            ordered.extend(group[index] for group in active)
+            index += 1
+            active = [group for group in active if len(group) > index]
+        return ordered
+
+    def coverage(self) -> Dict[str, Any]:
+        """How complete the analysis is; attached to results as 'coverage'."""
+        analyzed = set(self.analyzed)
+        tiers = {}
+        for tier in TIERS:
+            paths = [f.path for f in self.files if self._tier(f) == tier]
+            tiers[tier] = {"total": len(paths), "analyzed": sum(1 for path in paths if path in analyzed)}
+        packages = {self._package(f) for f in self.files}
+        covered = {self._package(f) for f in self.files if f.path in analyzed}
+        return {
+            "budget_seconds": round(self.deadline - self.started, 3),
+            "elapsed_seconds": round(time.time() - self.started, 3),
+            "complete": len(analyzed) + len(self.skipped) == len(self.files),
+            "files_total": len(self.files),
+            "files_scanned": self.scanned,
+            "files_analyzed": len(analyzed),
+            "files_skipped": len(self.skipped),
+            "files_not_reached": len(self.files) - len(analyzed) - len(self.skipped),
+            "packages_total": len(packages),
+            "packages_covered": len(covered),
+            "tiers": tiers,
+        }
+
+
+def merge_coverage(coverages: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Combine coverage statistics of several partial runs (e.g. one per build module)."""
+    coverages = [coverage for coverage in coverages if coverage]
+    if not coverages:
+        return None
+    merged = {
+        "budget_seconds": max(c["budget_seconds"] for c in coverages),
+        "elapsed_seconds": max(c["elapsed_seconds"] for c in coverages),
+        "complete": all(c["complete"] for c in coverages),
+        "tiers": {tier: {"total": 0, "analyzed": 0} for tier in TIERS},
+    }
+    for key in ("files_total", "files_scanned", "files_analyzed", "files_skipped", "files_not_reached", "packages_total", "packages_covered"):
+        merged[key] = sum(c[key] for c in coverages)
+    for coverage in coverages:
+        for tier, counts in coverage["tiers"].items():
+            merged["tiers"][tier]["total"] += counts["total"]
+            merged["tiers"][tier]["analyzed"] += counts["analyzed"]
+    return merged
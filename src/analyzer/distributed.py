@@ -0,0 +1,389 @@
+"""
+Coordinator/worker analysis sharded across processes or machines over TCP.
+
+The coordinator listens on a socket, workers connect to it and pull shards of
+the file list one at a time (multiprocessing.connection, authenticated with
+DIST_AUTHKEY; no external broker). Connections exchange pickles, so anyone
+holding the key can run code on both sides: listening on DIST_LISTEN requires
+an explicit DIST_AUTHKEY, and local-only runs use a random key. A worker streams one summary per file
+back; when a worker dies or stays silent for DIST_WORKER_TIMEOUT seconds, the
+files of its shard that were not reported yet go back to the queue. Results
+are keyed by file path, so the merged outcome does not depend on which worker
+analyzed what.
+
+Start a worker on another machine with
+
+    DIST_AUTHKEY=<secret> python -m src.analyzer.distributed HOST:PORT
+
+Workers open the repository from the spec() of the coordinator's source (the
+same path must be visible to them, e.g. a shared mount or a mirror at the same
+location) unless the coordinator ships file contents with the shards.
+"""
+import argparse
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from multiprocessing import Process
+from multiprocessing.connection import Client, Listener
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.loader.sources import SourceFile, open_spec
+
+
+# Settings, read at call time so that values loaded from .env count:
+#   DIST_AUTHKEY - shared secret of coordinator and remote workers; required with DIST_LISTEN
+#   DIST_SHARD_SIZE - files per shard; small shards balance better, large ones cost fewer round trips (200)
+#   DIST_WORKER_TIMEOUT - seconds without any message after which a busy worker is considered dead (300)
+#   DIST_IDLE_TIMEOUT - seconds the coordinator waits without any connected worker and without progress
+#       before it gives up (120)
+#   DIST_LISTEN - address the coordinator listens on ('host:port'); setting it (or DIST_LOCAL_WORKERS)
+#       enables distributed analysis
+#   DIST_LOCAL_WORKERS - worker processes the coordinator starts on its own machine (0)
+#   DIST_SHIP_SOURCES - send file contents with the shards instead of letting workers read the repository themselves
+
+
+def dist_authkey() -> Optional[bytes]:
+    return os.getenv("DIST_AUTHKEY", "").encode() or None
+
+
+def dist_listen() -> Optional[str]:
+    return os.getenv("DIST_LISTEN") or None
+
+
+def dist_local_workers() -> int:
+    return int(os.getenv("DIST_LOCAL_WORKERS", "0"))
+
+
+def distributed_enabled() -> bool:
+    return bool(dist_listen()) or dist_local_workers() > 0
+
+
+def parse_address(address: str) -> Tuple[str, int]:
+    """'host:port' -> (host, port)."""
+    host, _, port = address.rpartition(":")
+    return host or "0.0.0.0", int(port)
+
+
+def shard_files(files: List[SourceFile], shard_size: Optional[int] = None) -> List[List[SourceFile]]:
+    """Deterministic shards of a file list; files of one directory stay together where possible."""
+    if shard_size is None:
+        shard_size = int(os.getenv("DIST_SHARD_SIZE", "200"))
+    ordered = sorted(files, key=lambda f: (os.path.dirname(f.path), f.path))
+    return [ordered[i:i + shard_size] for i in range(0, len(ordered), max(1, shard_size))]
+
+
+class _ShippedSource:
+    """Source provider over file contents received from the coordinator."""
+
+    def __init__(self, contents: Dict[str, bytes]):
+        self.contents = contents
+
+    def read(self, source_file: SourceFile) -> bytes:
+        return self.contents[source_file.path]
+
+
+class Coordinator:
+    """
+    Hands out shards to connected workers and collects per-file summaries.
+
+    Args:
+        source: Source provider of the repository (its spec() is sent to workers)
+        analyze_file: Picklable callable (source, SourceFile) -> summary, run by the workers
+        address: (host, port) to listen on; port 0 picks a free one (see .address)
+        authkey: Shared secret of coordinator and workers
+        shard_size: Files per shard
+        worker_timeout: Seconds of silence after which a worker's shard is reassigned
+        ship_sources: Send file contents along with the shards
+        idle_timeout: Seconds without a connected worker and without progress after which run() fails
+    """
+
+    def __init__(self, source, analyze_file: Callable[[Any, SourceFile], Any], authkey: bytes,
+                 address: Tuple[str, int] = ("127.0.0.1", 0),
+                 shard_size: Optional[int] = None, worker_timeout: Optional[float] = None,
+                 ship_sources: Optional[bool] = None, idle_timeout: Optional[float] = None):
+        if not authkey:
+            raise Exception("Distributed analysis needs an authentication key")
+        if shard_size is None:
+            shard_size = int(os.getenv("DIST_SHARD_SIZE", "200"))
+        if worker_timeout is None:
+            worker_timeout = float(os.getenv("DIST_WORKER_TIMEOUT", "300"))
+        if ship_sources is None:
+            ship_sources = os.getenv("DIST_SHIP_SOURCES", "false").lower() == "true"
+        if idle_timeout is None:
+            idle_timeout = float(os.getenv("DIST_IDLE_TIMEOUT", "120"))
+        self.source = source
+        self.analyze_file = analyze_file
+        self.authkey = authkey
+        self.shard_size = shard_size
+        self.worker_timeout = worker_timeout
+        self.ship_sources = ship_sources
+        self.idle_timeout = idle_timeout
+        self.listener = Listener(address, authkey=authkey)
+        self.results: Dict[str, Any] = {}
+        self.stats: Dict[str, Any] = {"workers": 0, "shards": 0, "reassigned_shards": 0,
+                                      "files_by_worker": defaultdict(int)}
+        self._pending: deque = deque()
+        self._total = 0
+        self._done = False
+        self._active = 0
+        self._last_activity = time.time()
+        self._condition = threading.Condition()
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self.listener.address
+
+    def run(self, files: Optional[List[SourceFile]] = None, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Analyze the files (all files of the source by default) on whatever workers connect.
+
+        Args:
+            files: Files to analyze
+            timeout: Give up after this many seconds and return what has been collected
+
+        Returns:
+            Summary per file path, in sorted path order
+
+        Raises:
+            Exception: No worker was connected and no file was reported for idle_timeout seconds
+        """
+        files = self.source.list_files() if files is None else files
+        shards = shard_files(files, self.shard_size)
+        self._total = len({f.path for f in files})
+        self._pending.extend(enumerate(shards))
+        self.stats["shards"] = len(shards)
+
+        acceptor = threading.Thread(target=self._accept, daemon=True)
+        acceptor.start()
+        deadline = time.time() + timeout if timeout else None
+        self._last_activity = time.time()
+        idle = False
+        with self._condition:
+            while len(self.results) < self._total:
+                now = time.time()
+                remaining = deadline - now if deadline else None
+                if remaining is not None and remaining <= 0:
+                    print(f"Distributed analysis timed out with {self._total - len(self.results)} files left")
+                    break
+                idle_left = self._last_activity + self.idle_timeout - now
+                if not self._active and idle_left <= 0:
+                    idle = True
+                    break
+                waits = [w for w in (remaining, None if self._active else idle_left) if w is not None]
+                self._condition.wait(min(waits) if waits else None)
+            self._done = True
+            self._condition.notify_all()
+        host, port = self.address
+        self._wake_acceptor()
+        acceptor.join()
+        self.listener.close()
+        if idle:
+            raise Exception(f"No worker connected to {host}:{port} for {self.idle_timeout:.0f}s, "
+                            f"{self._total - len(self.results)} files left")
+        self.stats["files_by_worker"] = dict(self.stats["files_by_worker"])
+        return {path: self.results[path] for path in sorted(self.results)}
+
+    def _accept(self):
+        while True:
+            try:
+                conn = self.listener.accept()
+            except Exception as e:
+                if self._done:
+                    return
+                print(f"Rejected worker connection: {e}")
+                continue
+            if self._done:
+                conn.close()
+                return
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _wake_acceptor(self):
+        # accept() does not return on close(), so connect once to let the accept loop see _done
+        try:
+            Client(self.address, authkey=self.authkey).close()
+        except Exception:
+            pass
+
+    def _next_shard(self) -> Optional[Tuple[int, List[SourceFile]]]:
+        with self._condition:
+            while not self._pending and not self._done:
+                # Shards still running elsewhere may come back if their worker dies
+                self._condition.wait()
+            return None if self._done else self._pending.popleft()
+
+    def _serve(self, conn):
+        worker = "?"
+        shard = None
+        try:
+            _, worker = conn.recv()
+            with self._condition:
+                self.stats["workers"] += 1
+                self._active += 1
+                self._last_activity = time.time()
+            conn.send(("setup", self.source.spec(), self.analyze_file))
+            while True:
+                shard = self._next_shard()
+                if shard is None:
+                    conn.send(("done",))
+                    return
+                shard_id, files = shard
+                contents = {f.path: self.source.read(f) for f in files} if self.ship_sources else None
+                conn.send(("shard", shard_id, files, contents))
+                while True:
+                    if not conn.poll(self.worker_timeout):
+                        raise TimeoutError(f"no message for {self.worker_timeout}s")
+                    message = conn.recv()
+                    if message[0] == "shard_done":
+                        shard = None
+                        break
+                    _, path, summary = message
+                    with self._condition:
+                        # The first summary wins, a reassigned file may be reported twice
+                        if path not in self.results:
+                            self.results[path] = summary
+                            self.stats["files_by_worker"][worker] += 1
+                        self._last_activity = time.time()
+                        self._condition.notify_all()
+        except Exception as e:
+            if shard is not None:
+                print(f"Worker {worker} lost ({e.__class__.__name__}: {e}), reassigning shard {shard[0]}")
+                self._requeue(shard)
+        finally:
+            conn.close()
+            if worker != "?":
+                with self._condition:
+                    self._active -= 1
+                    self._last_activity = time.time()
+                    self._condition.notify_all()
+
+    def _requeue(self, shard: Tuple[int, List[SourceFile]]):
+        shard_id, files = shard
+        with self._condition:
+            remaining = [f for f in files if f.path not in self.results]
+            if remaining:
+                self._pending.appendleft((shard_id, remaining))
+                self.stats["reassigned_shards"] += 1
+            self._condition.notify_all()
+
+
+def run_worker(address: Tuple[str, int], authkey: bytes, worker_id: Optional[str] = None,
+               connect_timeout: float = 30.0) -> int:
+    """
+    Serve shards of a coordinator until it has no work left.
+
+    Returns:
+        Number of files analyzed by this worker
+    """
+    worker_id = worker_id or f"{os.uname().nodename}:{os.getpid()}"
+    started = time.time()
+    while True:
+        try:
+            conn = Client(address, authkey=authkey)
+            break
+        except ConnectionRefusedError:
+            if time.time() - started > connect_timeout:
+                raise
+            time.sleep(0.2)
+
+    analyzed = 0
+    source = None
+    try:
+        conn.send(("hello", worker_id))
+        while True:
+            message = conn.recv()
+            if message[0] == "done":
+                break
+            if message[0] == "setup":
+                _, spec, analyze_file = message
+                continue
+            _, shard_id, files, contents = message
+            if contents is not None:
+                shard_source = _ShippedSource(contents)
+            else:
+                if source is None:
+                    source = open_spec(spec)
+                shard_source = source
+            for source_file in files:
+                conn.send(("file", source_file.path, analyze_file(shard_source, source_file)))
+                analyzed += 1
+            conn.send(("shard_done", shard_id))
+    except EOFError:
+        # The coordinator finished (or went away) while this worker was idle
+        pass
+    finally:
+        if source is not None:
+            source.close()
+        conn.close()
+    return analyzed
+
+
+def start_local_workers(address: Tuple[str, int], count: int, authkey: bytes) -> List[Process]:
+    """Worker processes on this machine, e.g. for testing or to use all local cores."""
+    workers = []
+    for index in range(count):
+        worker = Process(target=run_worker, args=(address, authkey, f"local-{index}"), daemon=True)
+        worker.start()
+        workers.append(worker)
+    return workers
+
+
+def analyze_distributed(source, analyze_file: Callable[[Any, SourceFile], Any],
+                        files: Optional[List[SourceFile]] = None, listen: Optional[str] = None,
+                        local_workers: int = 0, timeout: Optional[float] = None) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Run a coordinator over a source, optionally with local worker processes.
+
+    Args:
+        source: Source provider of the repository
+        analyze_file: Picklable callable (source, SourceFile) -> summary
+        files: Files to analyze (all files of the source by default)
+        listen: 'host:port' remote workers connect to (localhost, free port by default)
+        local_workers: Worker processes to start on this machine
+        timeout: Seconds after which the analysis returns with the files collected so far
+
+    Returns:
+        (summary per file path in sorted order, coordinator statistics)
+
+    Raises:
+        Exception: listen is set without DIST_AUTHKEY, or no worker showed up for DIST_IDLE_TIMEOUT seconds
+    """
+    if listen:
+        authkey = dist_authkey()
+        if not authkey:
+            raise Exception("DIST_LISTEN requires an explicit DIST_AUTHKEY shared with the workers")
+        coordinator = Coordinator(source, analyze_file, authkey, parse_address(listen))
+    else:
+        # Only local workers: a random key nobody else knows
+        coordinator = Coordinator(source, analyze_file, os.urandom(32))
+    print(f"Distributed analysis coordinator listening on {coordinator.address[0]}:{coordinator.address[1]}")
+    files = source.list_files() if files is None else files
+    # More workers than shards would only sit idle
+    local_workers = min(local_workers, len(shard_files(files, coordinator.shard_size)))
+    workers = start_local_workers(coordinator.address, local_workers, coordinator.authkey)
+    try:
+        results = coordinator.run(files, timeout=timeout)
+    finally:
+        # Every result is in (or the timeout passed), workers still connecting or busy are not needed
+        for worker in workers:
+            worker.join(timeout=1)
+            if worker.is_alive():
+                worker.terminate()
+    return results, coordinator.stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Distributed analysis worker")
+    parser.add_argument("address", help="Coordinator address, host:port")
+    parser.add_argument("--id", help="Worker name shown in the coordinator statistics")
+    parser.add_argument("--connect-timeout", type=float, default=30.0)
+    args = parser.parse_args()
+    authkey = dist_authkey()
+    if not authkey:
+        parser.error("DIST_AUTHKEY must be set to the key of the coordinator")
+    analyzed = run_worker(parse_address(args.address), authkey, args.id, args.connect_timeout)
+    print(f"Worker finished, {analyzed} files analyzed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""Architecture history over a commit range, analyzing every distinct blob only once."""
+import argparse
+import csv
+import json
+import os
+import subprocess
+import sys
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.analyzer.package_graph import PackageGraph, collapse_package
+from src.loader.sources import GitBlobSource, is_bare_repository
+from src.utils.file_admission import FileAdmission
+from src.utils.java_analyzer import JavaAnalyzer
+
+
+METRIC_FIELDS = ["commit", "date", "subject", "files", "classes", "packages", "edges", "cycles",
+                 "cycle_packages", "new_blobs"]
+
+
+class ArchitectureHistory:
+    """
+    Time series of architecture metrics (classes, packages, package edges, cycles) across commits.
+
+    Files are identified by their blob SHA: a blob shared by many commits is
+    parsed once and its per-file result reused, and per-commit aggregates are
+    updated from the tree diff against the previous commit. The cost therefore
+    grows with churn rather than with commits times repository size.
+    """
+
+    def __init__(self, repo_path: str, package_depth: Optional[int] = None,
+                 blob_cache: Optional[Dict[str, Optional[Dict[str, Any]]]] = None):
+        self.repo_path = repo_path
+        self.package_depth = package_depth
+        self.analyzer = JavaAnalyzer()
+        self.admission = FileAdmission()
+        # blob SHA -> {'package', 'classes', 'dependencies'}, None for files that were not admitted
+        self.blob_cache = blob_cache if blob_cache is not None else {}
+        self.source: Optional[GitBlobSource] = None
+
+    def list_commits(self, rev_range: str = "HEAD", max_count: Optional[int] = None,
+                     first_parent: bool = True) -> List[Tuple[str, int, str]]:
+        """(sha, commit time, subject) of the last `max_count` commits of a range, oldest first."""
+        args = ["log", "--reverse", "--format=%H%x00%ct%x00%s"]
+        if first_parent:
+            args.append("--first-parent")
+        if max_count:
+            args.append(f"--max-count={max_count}")
+        return [tuple(line.split("\0", 2)) for line in self._git(*args, rev_range, "--").splitlines() if line]
+
+    def list_releases(self, max_count: Optional[int] = None) -> List[Tuple[str, int, str]]:
+        """(sha, commit time, tag name) of the last `max_count` tags, oldest first."""
+        output = self._git("for-each-ref", "--sort=creatordate",
+                           "--format=%(refname:short)%00%(*objectname)%00%(objectname)", "refs/tags")
+        releases = []
+        for line in output.splitlines():
+            tag, peeled, sha = line.split("\0")
+            commit = self._git("rev-parse", f"{peeled or sha}^{{commit}}").strip()
+            releases.append((commit, int(self._git("show", "-s", "--format=%ct", commit).strip()), tag))
+        return releases[-max_count:] if max_count else releases
+
+    def run(self, commits: List[Tuple[str, int, str]]) -> List[Dict[str, Any]]:
+        """
+        Compute metrics for each commit in the given order.
+
+        Args:
+            commits: (sha, commit time, label) tuples as returned by list_commits/list_releases
+
+        Returns:
+            One metrics dictionary per commit
+        """
+        metrics = []
+        files: Dict[str, str] = {}
+        classes: Counter = Counter()
+        package_files: Counter = Counter()
+        dependencies: Counter = Counter()
+        graph_key = None
+        graph_metrics: Dict[str, Any] = {}
+
+        with GitBlobSource(self.repo_path, commits[0][0] if commits else "HEAD") as self.source:
+            for sha, timestamp, label in commits:
+                cached_before = len(self.blob_cache)
+                current = {source_file.path: source_file for source_file in self.source.list_files(sha)}
+
+                for path, blob_id in list(files.items()):
+                    if path not in current or current[path].blob_id != blob_id:
+                        self._apply(self.blob_cache.get(blob_id), -1, classes, package_files, dependencies)
+                        del files[path]
+                for path, source_file in current.items():
+                    if path not in files:
+                        self._apply(self._analyze_blob(source_file), 1, classes, package_files, dependencies)
+                        files[path] = source_file.blob_id
+
+                # The package graph only has to be rebuilt when its edges or nodes changed
+                packages = frozenset(package for package, count in package_files.items() if count > 0)
+                edges = frozenset(edge for edge, count in dependencies.items() if count > 0)
+                if (packages, edges) != graph_key:
+                    graph_key = (packages, edges)
+                    graph_metrics = self._graph_metrics(packages, dependencies)
+
+                metrics.append({
+                    "commit": sha,
+                    "date": datetime.fromtimestamp(int(timestamp), tz=timezone.utc).isoformat(),
+                    "subject": label,
+                    "files": len(files),
+                    "classes": sum(1 for count in classes.values() if count > 0),
+                    "packages": len(packages),
+                    **graph_metrics,
+                    "new_blobs": len(self.blob_cache) - cached_before,
+                })
+        self.source = None
+        return metrics
+
+    def _analyze_blob(self, source_file) -> Optional[Dict[str, Any]]:
+        if source_file.blob_id in self.blob_cache:
+            return self.blob_cache[source_file.blob_id]
+        content = self.admission.read_source(self.source, source_file)
+        result = None
+        if content is not None:
+            class_info = self.analyzer.extract_class_info(source_file.path, content)
+            package = class_info['packages'][0].replace('package ', '').replace(';', '').strip() if class_info['packages'] else ''
+            result = {
+                'package': package,
+                'classes': sorted(set(class_info['classes'])),
+                'dependencies': [(dep['from_package'], dep['to_package'])
+                                 for dep in self.analyzer.extract_dependencies(class_info['imports'], package)]
+            }
+        self.blob_cache[source_file.blob_id] = result
+        return result
+
+    def _apply(self, result: Optional[Dict[str, Any]], sign: int,
+               classes: Counter, package_files: Counter, dependencies: Counter):
+        if result is None:
+            return
+        package = collapse_package(result['package'], self.package_depth)
+        package_files[package] += sign
+        for name in result['classes']:
+            classes[(result['package'], name)] += sign
+        for source, target in result['dependencies']:
+            dependencies[(collapse_package(source, self.package_depth), collapse_package(target, self.package_depth))] += sign
+
+    def _graph_metrics(self, packages: frozenset, dependencies: Counter) -> Dict[str, Any]:
+        edges = {(source, target): count for (source, target), count in dependencies.items()
+                 if count > 0 and source and source != target and target in packages}
+        graph = PackageGraph(edges, [package for package in packages if package])
+        cycles = [members for members in graph.strongly_connected_components() if len(members) > 1]
+        return {
+            "edges": len(edges),
+            "cycles": len(cycles),
+            "cycle_packages": sum(len(members) for members in cycles),
+        }
+
+    def _git(self, *args: str) -> str:
+        result = subprocess.run(["git", "-C", self.repo_path] + list(args), capture_output=True, text=True)
+        if result.returncode != 0:
+            raise Exception(f"git {args[0]} failed: {result.stderr.strip()}")
+        return result.stdout
+
+
+def write_metrics(metrics: List[Dict[str, Any]], output: str):
+    """Write metrics as CSV (.csv) or JSON (anything else)."""
+    if output.endswith(".csv"):
+        with open(output, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=METRIC_FIELDS)
+            writer.writeheader()
+            writer.writerows(metrics)
+    else:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(metrics, f, indent=2, ensure_ascii=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Architecture metrics across the history of a Java repository")
+    parser.add_argument("repo", help="Local repository (bare or not) or a remote URL")
+    parser.add_argument("range", nargs="?", default="HEAD", help="Revision range, e.g. v1.0..main")
+    parser.add_argument("--max-count", type=int, default=None, help="Only the last N commits (or releases)")
+    parser.add_argument("--releases", action="store_true", help="Use tags instead of the commits of the range")
+    parser.add_argument("--all-parents", action="store_true", help="Follow merged branches as well")
+    parser.add_argument("--package-depth", type=int, default=int(os.getenv("PACKAGE_GRAPH_DEPTH", "0")) or None)
+    parser.add_argument("--output", default=None, help="Write metrics to a .json or .csv file")
+    args = parser.parse_args()
+
+    repo_path, release = args.repo, None
+    if not os.path.isdir(args.repo):
+        from src.utils.repo_loader import RepoLoader
+        loader = RepoLoader(os.getenv("GIT_USERNAME"), os.getenv("GIT_PASSWORD"))
+        repo_path = loader.clone_bare(args.repo)[0]
+        release = lambda: loader.release_repo(repo_path)
+    elif not is_bare_repository(args.repo) and not os.path.exists(os.path.join(args.repo, ".git")):
+        raise SystemExit(f"{args.repo} is not a git repository")
+
+    try:
+        history = ArchitectureHistory(repo_path, package_depth=args.package_depth)
+        if args.releases:
+            commits = history.list_releases(args.max_count)
+        else:
+            commits = history.list_commits(args.range, args.max_count, first_parent=not args.all_parents)
+        metrics = history.run(commits)
+    finally:
+        if release:
+            release()
+
+    if args.output:
+        write_metrics(metrics, args.output)
+    else:
+        writer = csv.DictWriter(sys.stdout, fieldnames=METRIC_FIELDS)
+        writer.writeheader()
+        writer.writerows(metrics)
+    print(f"{len(metrics)} commits, {len(history.blob_cache)} distinct blobs analyzed", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
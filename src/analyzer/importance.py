@@ -0,0 +1,207 @@
+"""Importance ranking of classes and packages: PageRank, fan-in/fan-out and size over a sparse dependency graph."""
+from itertools import chain, repeat
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+PAGERANK_DAMPING = 0.85
+PAGERANK_TOLERANCE = 1e-9
+PAGERANK_MAX_ITERATIONS = 100
+
+# Weights of the normalized metrics in the combined score
+SCORE_WEIGHTS = {"pagerank": 1.0, "fan_in": 0.5, "fan_out": 0.1, "size": 0.25}
+
+
+def _normalized(values: np.ndarray) -> np.ndarray:
+    top = values.max() if values.size else 0.0
+    return values / top if top > 0 else np.zeros_like(values, dtype=np.float64)
+
+
+class ImportanceRanking:
+    """
+    Ranks the nodes of a dependency graph.
+
+    Edges point from a dependent to its dependency, so PageRank flows towards
+    what many (important) nodes use. The graph is kept as index arrays (a
+    sparse adjacency matrix in coordinate form with duplicate edges summed)
+    and every metric is computed with array operations, so a graph with 100k
+    nodes and 500k edges ranks well under a second.
+
+    Args:
+        nodes: Node names; ties are broken by their order
+        sources: Node position of the dependent of every edge
+        targets: Node position of the dependency of every edge
+        sizes: Size of every node (members, imports, classes, ...)
+        teleport: Teleport weight of every node (e.g. entry points), uniform by default
+    """
+
+    def __init__(self, nodes: List[str], sources: np.ndarray, targets: np.ndarray,
+                 sizes: Optional[np.ndarray] = None, teleport: Optional[np.ndarray] = None):
+        self.nodes = nodes
+        self.index: Dict[str, int] = {node: position for position, node in enumerate(nodes)}
+        count = len(nodes)
+
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+        valid = (sources >= 0) & (targets >= 0) & (sources != targets)
+        # Duplicate edges merged into weights: key = source * n + target
+        keys, weights = np.unique(sources[valid] * count + targets[valid], return_counts=True)
+        self.sources = keys // max(count, 1)
+        self.targets = keys % max(count, 1)
+        self.weights = weights.astype(np.float64)
+
+        self.sizes = np.zeros(count, dtype=np.float64) if sizes is None else np.asarray(sizes, dtype=np.float64)
+        teleport = np.ones(count, dtype=np.float64) if teleport is None else np.asarray(teleport, dtype=np.float64)
+        self.teleport = teleport / teleport.sum() if teleport.sum() > 0 else np.full(count, 1.0 / max(count, 1))
+
+        self.fan_in = np.bincount(self.targets, minlength=count).astype(np.float64)
+        self.fan_out = np.bincount(self.sources, minlength=count).astype(np.float64)
+        self.pagerank = self._pagerank()
+        self.scores = self._combined()
+
+    @classmethod
+    def from_edges(cls, nodes: Iterable[str], edges: Iterable[Tuple[str, str]],
+                   sizes: Optional[Dict[str, float]] = None,
+                   personalization: Optional[Dict[str, float]] = None,
+                   count_sizes: bool = False) -> "ImportanceRanking":
+        """
+        Ranking over named nodes.
+
+        Args:
+            nodes: Node names (sorted, so ties are broken alphabetically)
+            edges: (dependent, dependency) pairs; repeated pairs add up to the edge weight,
+                pairs with an unknown node and self-loops are ignored
+            sizes: Size per node, 0 when missing
+            personalization: Teleport weight per node, uniform by default
+            count_sizes: Size a node by its number of edges instead, those to unknown
+                nodes and self-loops included (counted over the positions, not per name)
+        """
+        nodes = sorted(set(nodes))
+        index = {node: position for position, node in enumerate(nodes)}
+        # One flat pass of dictionary lookups through map() (stays in C), -1 marks unknown names
+        names = list(chain.from_iterable(edges))
+        positions = np.fromiter(map(index.get, names, repeat(-1, len(names))), dtype=np.int64, count=len(names))
+
+        def per_node(values: Optional[Dict[str, float]]) -> Optional[np.ndarray]:
+            if not values:
+                return None
+            array = np.zeros(len(nodes), dtype=np.float64)
+            for node, value in values.items():
+                if node in index:
+                    array[index[node]] = value
+            return array
+
+        sources, targets = positions[0::2], positions[1::2]
+        if count_sizes:
+            size_array = np.bincount(sources[sources >= 0], minlength=len(nodes)).astype(np.float64)
+        else:
+            size_array = per_node(sizes)
+        return cls(nodes, sources, targets, size_array, per_node(personalization))
+
+    def _pagerank(self, damping: float = PAGERANK_DAMPING) -> np.ndarray:
+        count = len(self.nodes)
+        if not count:
+            return np.zeros(0, dtype=np.float64)
+        out_weight = np.bincount(self.sources, weights=self.weights, minlength=count)
+        transition = self.weights / out_weight[self.sources]
+        dangling = out_weight == 0
+        rank = self.teleport.copy()
+        for _ in range(PAGERANK_MAX_ITERATIONS):
+            # Sparse matrix-vector product: every edge carries its share of the source's rank
+            spread = np.bincount(self.targets, weights=transition * rank[self.sources], minlength=count)
+            updated = damping * (spread + rank[dangling].sum() * self.teleport) + (1 - damping) * self.teleport
+            converged = np.abs(updated - rank).sum() < PAGERANK_TOLERANCE
+            rank = updated
+            if converged:
+                break
+        return rank
+
+    def _combined(self) -> np.ndarray:
+        return (SCORE_WEIGHTS["pagerank"] * _normalized(self.pagerank)
+                + SCORE_WEIGHTS["fan_in"] * _normalized(np.log1p(self.fan_in))
+                + SCORE_WEIGHTS["fan_out"] * _normalized(np.log1p(self.fan_out))
+                + SCORE_WEIGHTS["size"] * _normalized(np.log1p(self.sizes)))
+
+    def metrics(self, node: str) -> Dict[str, float]:
+        """All figures of one node."""
+        position = self.index[node]
+        return {
+            "score": float(self.scores[position]),
+            "pagerank": float(self.pagerank[position]),
+            "fan_in": int(self.fan_in[position]),
+            "fan_out": int(self.fan_out[position]),
+            "size": float(self.sizes[position]),
+        }
+
+    def score(self, node: str) -> float:
+        """Combined score of a node, 0 for unknown nodes."""
+        position = self.index.get(node)
+        return float(self.scores[position]) if position is not None else 0.0
+
+    def normalized_scores(self) -> Dict[str, float]:
+        """Combined score per node scaled to [0, 1]."""
+        return dict(zip(self.nodes, _normalized(self.scores).tolist()))
+
+    def top(self, k: int, candidates: Optional[Sequence[str]] = None) -> List[str]:
+        """
+        The k highest-scoring nodes.
+
+        Args:
+            k: Number of nodes
+            candidates: Restrict the selection to these nodes (unknown ones score 0, ties broken by name)
+        """
+        if candidates is None:
+            names = self.nodes
+            scores = self.scores
+        else:
+            names = sorted(set(candidates))
+            scores = np.fromiter(map(self.score, names), dtype=np.float64, count=len(names))
+        if k <= 0 or not len(names):
+            return []
+        if k < len(names):
+            # Partial selection first, the full sort only runs over the winners and the ties at the cut
+            threshold = np.partition(scores, len(scores) - k)[len(scores) - k]
+            chosen = np.flatnonzero(scores >= threshold)
+        else:
+            chosen = np.arange(len(names))
+        order = chosen[np.lexsort((chosen, -scores[chosen]))]
+        return [names[position] for position in order[:k]]
+
+    def ranked(self) -> List[Tuple[str, float]]:
+        """All nodes with their combined score, best first."""
+        return [(node, self.score(node)) for node in self.top(len(self.nodes))]
+
+
+def rank_packages(dependencies: Iterable[Dict[str, str]], sizes: Optional[Dict[str, float]] = None) -> ImportanceRanking:
+    """
+    Package ranking from import records ('from_package' / 'to_package').
+
+    Args:
+        dependencies: Import records of an analysis
+        sizes: Classes per package; its keys are the project packages (imports of
+            anything else are ignored). All importing packages by default.
+    """
+    dependencies = list(dependencies)
+    packages = set(sizes) if sizes else {dep.get('from_package') for dep in dependencies}
+    packages.discard(None)
+    packages.discard('')
+    edges = ((dep.get('from_package'), dep.get('to_package')) for dep in dependencies)
+    return ImportanceRanking.from_edges(packages, edges, sizes)
+
+
+def rank_classes(project_structure: Dict[str, Any]) -> ImportanceRanking:
+    """
+    Class ranking of a src.utils.java_analyzer structure.
+
+    Classes are named 'package.Class'. An import of a project class is an edge
+    from the top-level class of the importing file to it; the size of a class
+    is the number of imports of its file.
+    """
+    nodes = [f"{package}.{cls}" if package else cls
+             for package, classes in project_structure.get('classes_by_package', {}).items() for cls in classes]
+    dependencies = [dep for dep in project_structure.get('dependencies', []) if dep.get('from_class')]
+    sources = [f"{dep['from_package']}.{dep['from_class']}" if dep.get('from_package') else dep['from_class']
+               for dep in dependencies]
+    edges = zip(sources, (dep.get('target', '') for dep in dependencies))
+    return ImportanceRanking.from_edges(nodes, edges, count_sizes=True)
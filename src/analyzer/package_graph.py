@@ -0,0 +1,164 @@
+"""Package-level dependency graph: aggregation, cycle detection and transitive reduction."""
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+
+Edge = Tuple[str, str]
+
+
+def collapse_package(package: str, depth: Optional[int]) -> str:
+    """Cut a package name down to its first `depth` segments."""
+    if not depth or depth <= 0:
+        return package
+    return '.'.join(package.split('.')[:depth])
+
+
+class PackageGraph:
+    """Weighted directed graph of packages built from import dependencies."""
+
+    def __init__(self, edges: Optional[Dict[Edge, int]] = None, nodes: Optional[Iterable[str]] = None):
+        self.edges: Dict[Edge, int] = dict(edges or {})
+        self.nodes: Set[str] = set(nodes or [])
+        for source, target in self.edges:
+            self.nodes.add(source)
+            self.nodes.add(target)
+
+    @classmethod
+    def from_dependencies(cls, dependencies: Iterable[Dict[str, str]], depth: Optional[int] = None,
+                          known_packages: Optional[Iterable[str]] = None) -> "PackageGraph":
+        """
+        Aggregate import edges into a weighted package graph.
+
+        Args:
+            dependencies: Import records with 'from_package' and 'to_package' keys
+            depth: Collapse packages to this many name segments (None keeps full names)
+            known_packages: Packages of the project itself; imports of anything else
+                (third-party libraries) are dropped. Defaults to all importing packages.
+        """
+        dependencies = list(dependencies)
+        if known_packages is None:
+            known_packages = {dep.get('from_package') for dep in dependencies}
+        known = {collapse_package(pkg, depth) for pkg in known_packages if pkg}
+
+        edges: Dict[Edge, int] = defaultdict(int)
+        for dep in dependencies:
+            source = collapse_package(dep.get('from_package') or '', depth)
+            target = collapse_package(dep.get('to_package') or '', depth)
+            if source and target and source != target and target in known:
+                edges[(source, target)] += 1
+        return cls(edges, known)
+
+    def successors(self) -> Dict[str, List[str]]:
+        """Adjacency lists in a deterministic order."""
+        adjacency: Dict[str, List[str]] = {node: [] for node in sorted(self.nodes)}
+        for source, target in sorted(self.edges):
+            adjacency[source].append(target)
+        return adjacency
+
+    def strongly_connected_components(self) -> List[List[str]]:
+        """Tarjan's algorithm, iterative so that deep graphs do not hit the recursion limit."""
+        adjacency = self.successors()
+        index: Dict[str, int] = {}
+        lowlink: Dict[str, int] = {}
+        on_stack: Set[str] = set()
+        stack: List[str] = []
+        components: List[List[str]] = []
+        counter = 0
+
+        for root in adjacency:
+            if root in index:
+                continue
+            work = [(root, iter(adjacency[root]))]
+            index[root] = lowlink[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack.add(root)
+
+            while work:
+                node, children = work[-1]
+                advanced = False
+                for child in children:
+                    if child not in index:
+                        index[child] = lowlink[child] = counter
+                        counter += 1
+                        stack.append(child)
+                        on_stack.add(child)
+                        work.append((child, iter(adjacency[child])))
+                        advanced = True
+                        break
+                    if child in on_stack:
+                        lowlink[node] = min(lowlink[node], index[child])
+                if advanced:
+                    continue
+
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+                if lowlink[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(sorted(component))
+
+        # Tarjan emits components in reverse topological order
+        components.reverse()
+        return components
+
+    def condense(self, reduce: bool = True) -> Dict[str, Any]:
+        """
+        Collapse cycles into single nodes and optionally apply transitive reduction.
+
+        Returns:
+            Dictionary with 'components' (name -> member packages, in topological order),
+            'edges' ((component, component) -> summed weight), 'cycles' (packages taking
+            part in dependency cycles) and 'removed_edges' (edges dropped by the reduction)
+        """
+        components = self.strongly_connected_components()
+        names = [members[0] if len(members) == 1 else ' | '.join(members) for members in components]
+        component_of = {member: i for i, members in enumerate(components) for member in members}
+
+        weights: Dict[Tuple[int, int], int] = defaultdict(int)
+        for (source, target), weight in self.edges.items():
+            a, b = component_of[source], component_of[target]
+            if a != b:
+                weights[(a, b)] += weight
+
+        kept = set(weights)
+        if reduce:
+            kept = self._transitive_reduction(len(components), weights)
+
+        return {
+            'components': {names[i]: members for i, members in enumerate(components)},
+            'edges': {(names[a], names[b]): weights[(a, b)] for a, b in sorted(kept)},
+            'cycles': [members for members in components if len(members) > 1],
+            'removed_edges': len(weights) - len(kept)
+        }
+
+    @staticmethod
+    def _transitive_reduction(count: int, edges: Iterable[Tuple[int, int]]) -> Set[Tuple[int, int]]:
+        """
+        Transitive reduction of a DAG whose nodes are numbered in topological order.
+
+        Reachability sets are kept as integer bitsets; successors are visited in
+        topological order, so an edge is redundant exactly when its target is
+        already reachable through an earlier successor.
+        """
+        adjacency: Dict[int, List[int]] = defaultdict(list)
+        for source, target in edges:
+            adjacency[source].append(target)
+
+        reach = [0] * count
+        kept: Set[Tuple[int, int]] = set()
+        for node in range(count - 1, -1, -1):
+            reachable = 0
+            for target in sorted(adjacency[node]):
+                if not reachable >> target & 1:
+                    kept.add((node, target))
+                    reachable |= reach[target] | (1 << target)
+            reach[node] = reachable
+        return kept
@@ -0,0 +1,234 @@
+"""Static project meta description from build files, the README and the code analysis, without an LLM."""
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.analyzer.importance import rank_packages
+from src.loader.build_modules import read_build_info
+from src.models.project_description import ProjectMetaDescription
+
+
+# (regular expression over 'group:artifact' of a dependency or a plugin id, technology), first match per pattern
+TECHNOLOGY_MARKERS: List[Tuple[str, str]] = [
+    (r"^org\.springframework\.boot:|^org\.springframework\.boot$", "Spring Boot"),
+    (r"spring-boot-starter-web$|:spring-webmvc$", "Spring MVC"),
+    (r"spring-boot-starter-webflux$|:spring-webflux$", "Spring WebFlux"),
+    (r"spring-boot-starter-data-jpa$|:hibernate-core$|persistence-api$", "JPA/Hibernate"),
+    (r"spring-boot-starter-jdbc$|:spring-jdbc$", "JDBC"),
+    (r"spring-boot-starter-data-mongodb|:mongodb-driver", "MongoDB"),
+    (r"spring-boot-starter-data-redis|:jedis$|:lettuce-core$", "Redis"),
+    (r"spring-boot-starter-data-elasticsearch|elasticsearch", "Elasticsearch"),
+    (r":spring-kafka$|:kafka-clients$|:kafka-streams$", "Kafka"),
+    (r"spring-boot-starter-amqp$|:amqp-client$", "RabbitMQ"),
+    (r"spring-boot-starter-security$|:spring-security-", "Spring Security"),
+    (r"^org\.springframework\.cloud:", "Spring Cloud"),
+    (r"spring-boot-starter-actuator$", "Spring Boot Actuator"),
+    (r":postgresql$", "PostgreSQL"),
+    (r":mysql-connector|:mariadb-java-client$", "MySQL/MariaDB"),
+    (r"^com\.h2database:", "H2"),
+    (r":ojdbc\d*$", "Oracle Database"),
+    (r":flyway-", "Flyway"),
+    (r":liquibase-", "Liquibase"),
+    (r"springdoc-openapi|springfox|swagger", "OpenAPI/Swagger"),
+    (r"^io\.grpc:", "gRPC"),
+    (r"graphql", "GraphQL"),
+    (r"^io\.quarkus", "Quarkus"),
+    (r"^io\.micronaut", "Micronaut"),
+    (r"^io\.micrometer:", "Micrometer"),
+    (r"^org\.projectlombok:", "Lombok"),
+    (r"^org\.mapstruct:", "MapStruct"),
+]
+
+SPRING_BOOT_ANNOTATIONS = {"SpringBootApplication"}
+CONTROLLER_ANNOTATIONS = {"RestController", "Controller"}
+ENDPOINT_ANNOTATIONS = {"GetMapping", "PostMapping", "PutMapping", "DeleteMapping", "PatchMapping", "RequestMapping"}
+REPOSITORY_ANNOTATIONS = {"Repository"}
+SPRING_DATA_REPOSITORY = r"(?:[\w.]+\.)?(?:Jpa|Crud|ListCrud|PagingAndSorting|Mongo|Reactive\w*)Repository\b"
+LISTENER_ANNOTATIONS = {"KafkaListener", "RabbitListener", "JmsListener", "EventListener"}
+SCHEDULED_ANNOTATIONS = {"Scheduled"}
+
+README_NAMES = ("README.md", "README.MD", "Readme.md", "readme.md", "README.adoc", "README.rst", "README.txt", "README")
+README_INTRO_CHARS = 600
+TOP_PACKAGES = 5
+
+
+def _count(number: int, noun: str, plural: Optional[str] = None) -> str:
+    return f"{number} {noun if number == 1 else plural or noun + 's'}"
+
+
+def detect_technologies(build_info: Dict[str, Any]) -> List[str]:
+    """Technology stack declared by the build: language, build tool, frameworks and infrastructure."""
+    coordinates = build_info["dependencies"] + build_info["parents"] + build_info["plugins"]
+    stack = ["Java" + (f" {build_info['java_version']}" if build_info.get("java_version") else "")]
+    if build_info.get("build"):
+        stack.append(build_info["build"].capitalize())
+    for pattern, technology in TECHNOLOGY_MARKERS:
+        if technology not in stack and any(re.search(pattern, coordinate) for coordinate in coordinates):
+            stack.append(technology)
+    return stack
+
+
+def readme_intro(source, max_chars: int = README_INTRO_CHARS) -> Optional[str]:
+    """First prose paragraph of the README (headings, badges, images, HTML and code skipped), as plain text."""
+    text = None
+    for name in README_NAMES:
+        data = source.read_path(name)
+        if data is not None:
+            text = data.decode("utf-8", errors="replace")
+            break
+    if not text:
+        return None
+
+    paragraph: List[str] = []
+    in_code = False
+    for raw_line in text.splitlines():
+        line = raw_line.strip()
+        if line.startswith(("```", "~~~")):
+            in_code = not in_code
+            continue
+        if in_code:
+            continue
+        if re.fullmatch(r"=+|-+", line):
+            # Setext underline: the lines above were a heading, not the intro (or, without any, a rule)
+            paragraph.clear()
+            continue
+        prose = line and not line.startswith(("#", "=", "[![", "![", "<", "|", ":", ".. ", "---", "***"))
+        if prose:
+            paragraph.append(line)
+        elif paragraph:
+            break
+    if not paragraph:
+        return None
+
+    intro = " ".join(paragraph)
+    intro = re.sub(r"!?\[([^\]]*)\]\([^)]*\)", r"\1", intro)      # links and images -> their text
+    intro = re.sub(r"(\*\*|__|\*|_|`)(.+?)\1", r"\2", intro)      # emphasis and inline code
+    if len(intro) > max_chars:
+        cut = intro[:max_chars]
+        intro = cut[:cut.rfind(". ") + 1] if ". " in cut else cut.rsplit(" ", 1)[0] + "..."
+    return intro
+
+
+def _annotation_facts(code_analysis: Dict[str, Any]) -> Dict[str, Any]:
+    """Annotated classes and counts from either analysis format (agent JavaAnalyzer or src JavaAnalyzer)."""
+    facts = {"spring_boot": [], "controllers": [], "repositories": [], "listeners": 0, "scheduled": 0,
+             "endpoints": 0, "main_classes": []}
+    if "classes_by_annotation" in code_analysis:
+        by_annotation = code_analysis["classes_by_annotation"]
+        counts = code_analysis.get("annotation_counts", {})
+        for key, annotations in (("spring_boot", SPRING_BOOT_ANNOTATIONS), ("controllers", CONTROLLER_ANNOTATIONS),
+                                 ("repositories", REPOSITORY_ANNOTATIONS)):
+            facts[key] = sorted({cls for annotation in annotations for cls in by_annotation.get(annotation, [])})
+        # A class-level @RequestMapping is a path prefix, not an endpoint
+        facts["endpoints"] = sum(counts.get(annotation, 0) for annotation in ENDPOINT_ANNOTATIONS) \
+            - len(by_annotation.get("RequestMapping", []))
+        facts["listeners"] = sum(counts.get(annotation, 0) for annotation in LISTENER_ANNOTATIONS)
+        facts["scheduled"] = sum(counts.get(annotation, 0) for annotation in SCHEDULED_ANNOTATIONS)
+        facts["main_classes"] = sorted(set(code_analysis.get("main_classes", [])))
+        return facts
+
+    types = {**code_analysis.get("classes", {}), **code_analysis.get("interfaces", {})}
+    for fqn, info in sorted(types.items()):
+        annotations = set(info.get("annotations", []))
+        if annotations & SPRING_BOOT_ANNOTATIONS:
+            facts["spring_boot"].append(info.get("name", fqn))
+        if annotations & CONTROLLER_ANNOTATIONS:
+            facts["controllers"].append(info.get("name", fqn))
+        supertypes = [info["extends"]] if isinstance(info.get("extends"), str) else list(info.get("extends") or [])
+        if annotations & REPOSITORY_ANNOTATIONS or any(re.match(SPRING_DATA_REPOSITORY, name) for name in supertypes):
+            facts["repositories"].append(info.get("name", fqn))
+        for method in info.get("methods", []):
+            method_annotations = set(method.get("annotations", []))
+            facts["endpoints"] += bool(method_annotations & ENDPOINT_ANNOTATIONS)
+            facts["listeners"] += bool(method_annotations & LISTENER_ANNOTATIONS)
+            facts["scheduled"] += bool(method_annotations & SCHEDULED_ANNOTATIONS)
+    facts["main_classes"] = sorted({entry.get("class") for entry in code_analysis.get("entry_points", []) if entry.get("class")})
+    return facts
+
+
+def _packages(code_analysis: Dict[str, Any]) -> Dict[str, int]:
+    """Classes per package in either analysis format."""
+    if "classes_by_package" in code_analysis:
+        return {package: len(classes) for package, classes in code_analysis["classes_by_package"].items() if package}
+    return {package: len(info.get("classes", [])) + len(info.get("interfaces", []))
+            for package, info in code_analysis.get("packages", {}).items()}
+
+
+class ProjectMetaGenerator:
+    """
+    Builds a ProjectMetaDescription from what the repository declares.
+
+    The build files give name, description and technology stack, the README
+    its first paragraph, and the code analysis the Spring Boot applications,
+    controllers, endpoints, repositories and message listeners. Everything is
+    read from the source provider, so it works on working trees and on bare
+    clones alike and takes milliseconds.
+    """
+
+    def generate(self, source, code_analysis: Dict[str, Any], project_name: Optional[str] = None) -> ProjectMetaDescription:
+        """
+        Args:
+            source: FileSystemSource or GitBlobSource of the repository
+            code_analysis: Result of either JavaAnalyzer
+            project_name: Fallback name (e.g. the repository name) when the build declares none
+
+        Returns:
+            Meta description of the project
+        """
+        build_info = read_build_info(source)
+        facts = _annotation_facts(code_analysis)
+        stack = detect_technologies(build_info)
+        intro = readme_intro(source)
+
+        kind = "Spring Boot application" if facts["spring_boot"] or "Spring Boot" in stack else "Java application"
+        if facts["controllers"]:
+            kind = kind.replace("application", "web service")
+        purpose = intro or build_info.get("description") or kind
+        if build_info.get("description") and intro and build_info["description"] not in intro:
+            purpose = f"{build_info['description']}. {intro}"
+
+        functionality = [f"{kind[0].upper()}{kind[1:]}" + (f" built with {build_info['build'].capitalize()}" if build_info.get("build") else "")]
+        if facts["controllers"]:
+            functionality.append(f"Exposes {_count(facts['endpoints'], 'HTTP endpoint')} in {_count(len(facts['controllers']), 'controller')} "
+                                 f"({', '.join(facts['controllers'])})")
+        if facts["repositories"]:
+            storage = next((technology for technology in stack if technology in ("JPA/Hibernate", "MongoDB", "JDBC", "Redis")), None)
+            functionality.append(f"Persists data through {_count(len(facts['repositories']), 'repository', 'repositories')}" + (f" ({storage})" if storage else ""))
+        if facts["listeners"]:
+            messaging = [technology for technology in stack if technology in ("Kafka", "RabbitMQ")]
+            functionality.append(f"Consumes messages in {_count(facts['listeners'], 'listener')}" + (f" ({', '.join(messaging)})" if messaging else ""))
+        if facts["scheduled"]:
+            functionality.append(f"Runs {_count(facts['scheduled'], 'scheduled job')}")
+        packages = _packages(code_analysis)
+        if packages:
+            important = rank_packages(code_analysis.get("dependencies", []), packages).top(TOP_PACKAGES)
+            functionality.append(f"{_count(len(packages), 'package')}, most central: {', '.join(important)}")
+        modules = code_analysis.get("module_graph", {}).get("modules", {})
+        if len(modules) > 1:
+            functionality.append(f"{_count(len(modules), 'build module')}: {', '.join(sorted(modules))}")
+
+        entry_points = facts["spring_boot"] + [cls for cls in facts["main_classes"] if cls not in facts["spring_boot"]]
+        entry_points += [cls for cls in facts["controllers"] if cls not in entry_points]
+
+        return ProjectMetaDescription(
+            project_name=build_info.get("name") or project_name or "Unknown",
+            technology_stack=stack,
+            purpose=purpose,
+            functionality=". ".join(functionality) + ".",
+            entry_points=entry_points
+        )
+
+
+def format_meta_description(meta: ProjectMetaDescription) -> str:
+    """Plain-text rendering of a meta description, in the shape of the LLM-written one."""
+    lines = [
+        f"# {meta.project_name}",
+        "",
+        meta.purpose,
+        "",
+        f"Technology stack: {', '.join(meta.technology_stack)}",
+        "",
+        f"Functionality: {meta.functionality}",
+    ]
+    if meta.entry_points:
+        lines += ["", f"Entry points: {', '.join(meta.entry_points)}"]
+    return "\n".join(lines)
@@ -1,78 +1,216 @@
-from typing import Dict, Any, List
+import io
+import os
+from typing import Dict, Any, List, Optional, TextIO, Tuple
 from src.models.project_description import ComponentDiagram, SequenceDiagram
+from src.analyzer.importance import rank_classes
+from src.analyzer.package_graph import PackageGraph, collapse_package
+from src.diagrams.mermaid_writer import (
+    DEFAULT_GROUP,
+    DEFAULT_MAX_NODES,
+    MermaidWriter,
+    node_id,
+    shard_groups,
+    write_overview,
+)
+
+
+# Диаграмма последовательности читаема только при небольшом числе участников
+MAX_SEQUENCE_PARTICIPANTS = 5
+
+# Глубина схлопывания пакетов на компонентной диаграмме (0 - полные имена пакетов)
+PACKAGE_DEPTH = int(os.getenv("PACKAGE_GRAPH_DEPTH", "0")) or None
 
 
 class DiagramGenerator:
     """
     Генератор диаграмм в формате Mermaid
     """
-    
-    def generate_component_diagram(self, project_structure: Dict[str, Any]) -> ComponentDiagram:
+
+    def generate_component_diagram(self, project_structure: Dict[str, Any],
+                                   max_nodes: int = DEFAULT_MAX_NODES,
+                                   package_depth: Optional[int] = PACKAGE_DEPTH) -> ComponentDiagram:
         """
-        Генерирует компонентную диаграмму на основе структуры проекта
+        Генерирует компонентную диаграмму на основе структуры проекта.
+        Связи между пакетами строятся по импортам: циклы выделяются через SCC,
+        избыточные транзитивные связи удаляются. Если узлов больше max_nodes,
+        диаграмма разбивается на шарды по пакетам с обзорной диаграммой-индексом;
+        классы при этом не отбрасываются.
         """
-        mermaid_code = "```mermaid\ncomponentDiagram\n"
-        
-        # Получаем уникальные пакеты и классы
-        packages = project_structure.get('all_packages', [])
         classes = project_structure.get('all_classes', [])
-        
-        # Создаем компоненты для пакетов
-        for pkg in packages:
-            pkg_name = pkg.replace('package ', '').replace(';', '')
-            mermaid_code += f"    component [{pkg_name}] as {pkg_name.replace('.', '_')}\n"
-        
-        # Создаем компоненты для основных классов
-        for cls in classes[:10]:  # Ограничиваем количество классов для читаемости
-            mermaid_code += f"    component [{cls}] as {cls}\n"
-        
-        # Добавляем связи между компонентами (упрощенно)
-        if packages and classes:
-            pkg_name = packages[0].replace('package ', '').replace(';', '').replace('.', '_')
-            cls_name = classes[0] if classes else "MainClass"
-            mermaid_code += f"    {pkg_name} -- {cls_name} : contains\n"
-        
-        mermaid_code += "```"
-        
-        description = f"Component diagram showing {len(packages)} packages and {len(classes)} classes"
-        
+        groups = self._group_classes(project_structure, package_depth)
+        edges, condensed = self._package_edges(project_structure, groups, package_depth)
+
+        description = f"Component diagram showing {len(groups)} packages and {len(classes)} classes"
+        if condensed['cycles']:
+            description += f", {len(condensed['cycles'])} package dependency cycles"
+        skipped = project_structure.get('admission', {}).get('skipped', 0)
+        if skipped:
+            description += f" ({skipped} source files skipped, see admission summary)"
+
+        if len(groups) + len(classes) <= max_nodes:
+            buffer = io.StringIO()
+            self.write_component_diagram(buffer, groups, edges)
+            return ComponentDiagram(
+                mermaid_code=buffer.getvalue(),
+                description=description
+            )
+
+        # Один узел в каждом шарде занимает сам пакет
+        shards = shard_groups(groups, max(max_nodes - 1, 1))
+        shard_of = {}
+        shard_diagrams = {}
+        for shard, members in shards.items():
+            pkg_name = shard if shard in groups else shard.rsplit(" (part ", 1)[0]
+            shard_of.setdefault(pkg_name, shard)
+            buffer = io.StringIO()
+            self.write_component_diagram(buffer, {shard: members})
+            shard_diagrams[shard] = buffer.getvalue()
+
+        shard_weights: Dict[Tuple[str, str], int] = {}
+        for source, target, weight, _ in edges:
+            key = (shard_of[source], shard_of[target])
+            if key[0] != key[1]:
+                shard_weights[key] = shard_weights.get(key, 0) + weight
+
+        overview = io.StringIO()
+        write_overview(overview, shards, shard_weights)
+
         return ComponentDiagram(
-            mermaid_code=mermaid_code,
-            description=description
+            mermaid_code=overview.getvalue(),
+            description=f"{description}, split into {len(shards)} sub-diagrams",
+            shards=shard_diagrams
         )
-    
-    def generate_sequence_diagram(self, project_structure: Dict[str, Any]) -> SequenceDiagram:
+
+    def write_component_diagram(self, out: TextIO, groups: Dict[str, List[str]],
+                                edges: Optional[List[Tuple[str, str, int, str]]] = None):
+        """
+        Потоково записывает компонентную диаграмму: пакеты, содержащиеся в них классы
+        и зависимости между пакетами
+        """
+        with MermaidWriter(out, "componentDiagram") as writer:
+            for pkg_name, members in groups.items():
+                writer.line(f"component [{pkg_name}] as {node_id(pkg_name)}")
+                for cls in members:
+                    writer.line(f"component [{cls}] as {node_id(pkg_name + '.' + cls)}")
+
+            for pkg_name, members in groups.items():
+                for cls in members:
+                    writer.line(f"{node_id(pkg_name)} -- {node_id(pkg_name + '.' + cls)} : contains")
+
+            for source, target, weight, kind in edges or []:
+                writer.line(f"{node_id(source)} --> {node_id(target)} : {weight} {kind}")
+
+    def generate_sequence_diagram(self, project_structure: Dict[str, Any],
+                                  max_participants: int = MAX_SEQUENCE_PARTICIPANTS) -> SequenceDiagram:
         """
-        Генерирует диаграмму последовательности на основе методов и вызовов
+        Генерирует диаграмму последовательности на основе методов и вызовов.
+        Участниками становятся самые важные классы по графу импортов
         """
-        mermaid_code = "```mermaid\nsequenceDiagram\n"
-        
         # Получаем уникальные методы
-        methods = project_structure.get('all_methods', [])
-        classes = project_structure.get('all_classes', [])[:5]  # Ограничиваем количество классов
-        
+        methods = sorted(project_structure.get('all_methods', []))
+        all_classes = project_structure.get('all_classes', [])
+        classes = self._important_classes(project_structure, max_participants)
+
         if not classes:
             classes = ['MainClass']
-        
-        # Создаем участников диаграммы (классы)
-        for cls in classes:
-            mermaid_code += f"    participant {cls}\n"
-        
-        # Добавляем простые вызовы между классами
-        if len(classes) > 1:
-            for i in range(len(classes)-1):
-                mermaid_code += f"    {classes[i]}->>+{classes[i+1]}: callMethod()\n"
-                mermaid_code += f"    {classes[i+1]}-->>-{classes[i]}: returnValue()\n"
-        else:
-            # Если только один класс, добавляем внутренние вызовы
-            for i, method in enumerate(methods[:3]):
-                mermaid_code += f"    {classes[0]}->>{classes[0]}: {method}()\n"
-        
-        mermaid_code += "```"
-        
+
+        buffer = io.StringIO()
+        with MermaidWriter(buffer, "sequenceDiagram") as writer:
+            # Создаем участников диаграммы (классы)
+            for cls in classes:
+                writer.line(f"participant {cls}")
+
+            # Добавляем простые вызовы между классами
+            if len(classes) > 1:
+                for i in range(len(classes)-1):
+                    writer.line(f"{classes[i]}->>+{classes[i+1]}: callMethod()")
+                    writer.line(f"{classes[i+1]}-->>-{classes[i]}: returnValue()")
+            else:
+                # Если только один класс, добавляем внутренние вызовы
+                for i, method in enumerate(methods[:3]):
+                    writer.line(f"{classes[0]}->>{classes[0]}: {method}()")
+
         description = f"Sequence diagram showing interactions between {len(classes)} classes"
-        
+        if len(all_classes) > len(classes):
+            description += f" (out of {len(all_classes)})"
+
         return SequenceDiagram(
-            mermaid_code=mermaid_code,
+            mermaid_code=buffer.getvalue(),
             description=description
-        )
\ No newline at end of file
+        )
+
+    def _important_classes(self, project_structure: Dict[str, Any], limit: int) -> List[str]:
+        """
+        Возвращает limit самых важных классов: PageRank по графу импортов,
+        fan-in/fan-out и размер (src.analyzer.importance). Классы вне
+        classes_by_package добавляются в конце по алфавиту
+        """
+        ranking = rank_classes(project_structure)
+        selected: List[str] = []
+        for qualified_name in ranking.top(len(ranking.nodes)):
+            if len(selected) >= limit:
+                return selected
+            name = qualified_name.rsplit('.', 1)[-1]
+            if name not in selected:
+                selected.append(name)
+        for name in sorted(project_structure.get('all_classes', [])):
+            if len(selected) >= limit:
+                break
+            if name not in selected:
+                selected.append(name)
+        return selected
+
+    def _package_name(self, package_line: str) -> str:
+        """
+        Приводит строку объявления пакета к имени пакета
+        """
+        return package_line.replace('package ', '').replace(';', '')
+
+    def _group_classes(self, project_structure: Dict[str, Any],
+                       package_depth: Optional[int] = None) -> Dict[str, List[str]]:
+        """
+        Группирует классы по пакетам (при необходимости схлопнутым до package_depth);
+        классы без пакета попадают в группу по умолчанию
+        """
+        groups: Dict[str, List[str]] = {
+            collapse_package(self._package_name(pkg), package_depth): []
+            for pkg in project_structure.get('all_packages', [])
+        }
+        assigned = set()
+        for pkg_name, members in project_structure.get('classes_by_package', {}).items():
+            pkg_name = collapse_package(pkg_name, package_depth)
+            groups.setdefault(pkg_name or DEFAULT_GROUP, []).extend(members)
+            assigned.update(members)
+
+        unassigned = [cls for cls in project_structure.get('all_classes', []) if cls not in assigned]
+        if unassigned:
+            groups.setdefault(DEFAULT_GROUP, []).extend(unassigned)
+        return groups
+
+    def _package_edges(self, project_structure: Dict[str, Any], groups: Dict[str, List[str]],
+                       package_depth: Optional[int] = None) -> Tuple[List[Tuple[str, str, int, str]], Dict[str, Any]]:
+        """
+        Строит рёбра диаграммы из сжатого графа зависимостей пакетов.
+        Для каждой связи между компонентами берётся самая «тяжёлая» пара пакетов,
+        рёбра внутри циклов сохраняются и помечаются как cycle
+        """
+        graph = PackageGraph.from_dependencies(
+            project_structure.get('dependencies', []),
+            depth=package_depth,
+            known_packages=[pkg for pkg in groups if pkg != DEFAULT_GROUP]
+        )
+        condensed = graph.condense()
+        component_of = {pkg: name for name, members in condensed['components'].items() for pkg in members}
+
+        representative: Dict[Tuple[str, str], Tuple[int, str, str]] = {}
+        cycle_edges = []
+        for (source, target), weight in sorted(graph.edges.items()):
+            key = (component_of[source], component_of[target])
+            if key[0] == key[1]:
+                cycle_edges.append((source, target, weight, "cycle"))
+            elif key in condensed['edges'] and weight > representative.get(key, (0, '', ''))[0]:
+                representative[key] = (weight, source, target)
+
+        edges = [(source, target, condensed['edges'][key], "imports")
+                 for key, (_, source, target) in sorted(representative.items())]
+        return edges + cycle_edges, condensed
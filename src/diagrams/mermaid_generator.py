@@ -1,73 +1,121 @@
 """Mermaid diagram generator for UML diagrams."""
-from typing import Dict, List
+import io
+from typing import Dict, List, TextIO
+
+from src.diagrams.mermaid_writer import (
+    DEFAULT_GROUP,
+    DEFAULT_MAX_NODES,
+    MermaidWriter,
+    cluster_nodes,
+    shard_edges,
+    shard_groups,
+    write_overview,
+)
 
 
 class MermaidGenerator:
     """Generate Mermaid diagrams from parsed code structure."""
-    
+
     def __init__(self):
         pass
-    
+
     def generate_class_diagram(self, classes: List[Dict]) -> str:
         """Generate a Mermaid class diagram from class definitions."""
-        diagram = "```mermaid\nclassDiagram\n"
-        
-        # Define classes and their relationships
-        for cls in classes:
-            class_name = cls.get('name', 'Unknown')
-            
-            # Add class definition
-            diagram += f"    class {class_name} {{\n"
-            
-            # Add fields
-            for field in cls.get('fields', []):
-                field_name = field.get('name', '')
-                field_type = field.get('type', 'unknown')
-                diagram += f"        + {field_type} {field_name}\n"
-            
-            # Add methods
-            for method in cls.get('methods', []):
-                method_name = method.get('name', '')
-                return_type = method.get('return_type', 'void')
-                params = ", ".join([f"{param[0]} {param[1]}" for param in method.get('parameters', [])])
-                diagram += f"        + {return_type} {method_name}({params})\n"
-            
-            diagram += "    }\n"
-        
-        # Add inheritance relationships
-        for cls in classes:
-            class_name = cls.get('name', 'Unknown')
-            extends = cls.get('extends')
-            if extends:
-                diagram += f"    {extends} <|-- {class_name}\n"
-            
-            implements_list = cls.get('implements', [])
-            for impl in implements_list:
-                diagram += f"    {impl} <|.. {class_name}\n"
-        
-        diagram += "```"
-        return diagram
-    
+        buffer = io.StringIO()
+        self.write_class_diagram(classes, buffer)
+        return buffer.getvalue()
+
+    def write_class_diagram(self, classes: List[Dict], out: TextIO):
+        """Stream a Mermaid class diagram into a file or buffer."""
+        with MermaidWriter(out, "classDiagram") as writer:
+            # Define classes and their relationships
+            for cls in classes:
+                class_name = cls.get('name', 'Unknown')
+
+                # Add class definition
+                writer.line(f"class {class_name} {{")
+
+                # Add fields
+                for field in cls.get('fields', []):
+                    field_name = field.get('name', '')
+                    field_type = field.get('type', 'unknown')
+                    writer.line(f"+ {field_type} {field_name}", indent=2)
+
+                # Add methods
+                for method in cls.get('methods', []):
+                    method_name = method.get('name', '')
+                    return_type = method.get('return_type', 'void')
+                    params = ", ".join([f"{param[0]} {param[1]}" for param in method.get('parameters', [])])
+                    writer.line(f"+ {return_type} {method_name}({params})", indent=2)
+
+                writer.line("}")
+
+            # Add inheritance relationships
+            for cls in classes:
+                class_name = cls.get('name', 'Unknown')
+                extends = cls.get('extends')
+                if extends:
+                    writer.line(f"{extends} <|-- {class_name}")
+
+                implements_list = cls.get('implements', [])
+                for impl in implements_list:
+                    writer.line(f"{impl} <|.. {class_name}")
+
+    def generate_class_diagram_shards(self, classes: List[Dict], max_nodes: int = DEFAULT_MAX_NODES) -> Dict[str, str]:
+        """
+        Generate class diagrams split into shards of at most max_nodes classes.
+
+        Classes are grouped by their 'package' key when present, otherwise by
+        inheritance clusters. The returned dict holds an 'overview' index diagram
+        followed by one diagram per shard; small inputs yield a single shard.
+        """
+        by_name = {cls.get('name', 'Unknown'): cls for cls in classes}
+        relations = [
+            (cls.get('name', 'Unknown'), parent)
+            for cls in classes
+            for parent in ([cls['extends']] if cls.get('extends') else []) + list(cls.get('implements', []))
+        ]
+
+        if any(cls.get('package') for cls in classes):
+            groups: Dict[str, List[str]] = {}
+            for name, cls in by_name.items():
+                groups.setdefault(cls.get('package') or DEFAULT_GROUP, []).append(name)
+        else:
+            groups = cluster_nodes(by_name, relations)
+
+        shards = shard_groups(groups, max_nodes)
+        shard_of = {name: shard for shard, members in shards.items() for name in members}
+
+        overview = io.StringIO()
+        write_overview(overview, shards, shard_edges(relations, shard_of.get))
+
+        result = {'overview': overview.getvalue()}
+        for shard, members in shards.items():
+            result[shard] = self.generate_class_diagram([by_name[name] for name in members])
+        return result
+
     def generate_sequence_diagram(self, interactions: List[Dict]) -> str:
         """Generate a Mermaid sequence diagram from interaction data."""
-        diagram = "```mermaid\nsequenceDiagram\n"
-        
-        # Extract participants from interactions
-        participants = set()
-        for interaction in interactions:
-            participants.add(interaction.get('source', 'Unknown'))
-            participants.add(interaction.get('target', 'Unknown'))
-        
-        # Add participants
-        for participant in participants:
-            diagram += f"    participant {participant}\n"
-        
-        # Add interactions
-        for interaction in interactions:
-            source = interaction.get('source', 'Unknown')
-            target = interaction.get('target', 'Unknown')
-            message = interaction.get('message', 'call')
-            diagram += f"    {source}->>{target}: {message}\n"
-        
-        diagram += "```"
-        return diagram
\ No newline at end of file
+        buffer = io.StringIO()
+        self.write_sequence_diagram(interactions, buffer)
+        return buffer.getvalue()
+
+    def write_sequence_diagram(self, interactions: List[Dict], out: TextIO):
+        """Stream a Mermaid sequence diagram into a file or buffer."""
+        with MermaidWriter(out, "sequenceDiagram") as writer:
+            # Extract participants from interactions
+            participants = set()
+            for interaction in interactions:
+                participants.add(interaction.get('source', 'Unknown'))
+                participants.add(interaction.get('target', 'Unknown'))
+
+            # Add participants
+            for participant in participants:
+                writer.line(f"participant {participant}")
+
+            # Add interactions
+            for interaction in interactions:
+                source = interaction.get('source', 'Unknown')
+                target = interaction.get('target', 'Unknown')
+                message = interaction.get('message', 'call')
+                writer.line(f"{source}->>{target}: {message}")
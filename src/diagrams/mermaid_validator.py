@@ -0,0 +1,249 @@
+"""Fast local syntax check for the Mermaid diagram types the generators and the LLM produce."""
+import re
+from typing import Iterable, List, Optional, Tuple
+
+
+FLOWCHART_TYPES = {"flowchart", "graph"}
+# componentDiagram is not a Mermaid type, but src.diagrams.generator writes it and the renderer reads it
+KNOWN_TYPES = FLOWCHART_TYPES | {
+    "sequenceDiagram", "classDiagram", "componentDiagram", "stateDiagram", "stateDiagram-v2", "erDiagram",
+    "C4Context", "C4Container", "C4Component", "C4Dynamic", "C4Deployment", "mindmap", "journey", "gantt", "pie",
+}
+DIRECTIONS = {"TB", "TD", "BT", "RL", "LR"}
+
+_ID = r"[A-Za-z0-9_][\w.\-]*"
+
+
+def _shape(open_: str, close: str) -> str:
+    # Labels may be quoted, quoted labels may contain any bracket
+    stop = re.escape(close[0]) + '"'
+    return re.escape(open_) + rf'(?:"[^"]*"|[^{stop}])*' + re.escape(close)
+
+
+_SHAPES = "|".join(_shape(o, c) for o, c in (
+    ("[[", "]]"), ("[(", ")]"), ("((", "))"), ("([", "])"), ("{{", "}}"), ("[/", "/]"), ("[\\", "\\]"),
+    ("[/", "\\]"), ("[\\", "/]"), ("[", "]"), ("(", ")"), ("{", "}"), (">", "]"),
+))
+# A@{ shape: rect } declares the shape (or, for an edge id, the properties) as an object
+_NODE = rf"{_ID}(?:{_SHAPES}|@\{{[^}}]*\}})?(?::::{_ID})?"
+_NODES = rf"{_NODE}(?:\s*&\s*{_NODE})*"
+_FLOW_LINK = (
+    rf"(?:{_ID}@)?"                                            # A e1@--> B (edge id)
+    r"(?:[<ox]?(?:-{2,}|={2,}|-\.+-)[>ox]?|~{3,}"             # A --> B, A --- B, A ==> B, A -.-> B, A ~~~ B
+    r"|[<ox]?(?:--|==|-\.)\s+[^|]*?\s+(?:-{2,}|={2,}|\.-)[>ox]?)"  # A -- text --> B
+    r"(?:\s*\|(?:\"[^\"]*\"|[^|])*\|)?"                        # A -->|text| B
+)
+# Applied after quoted labels are blanked to ""
+_ASYMMETRIC = re.compile(r"(?<=\w)>(?:\"\"|[^\[\]\"])*\]")
+_FLOW_STATEMENT = re.compile(rf"{_NODES}(?:\s*{_FLOW_LINK}\s*{_NODES})*\s*;?")
+_FLOW_KEYWORDS = re.compile(r"(?:classDef|class|style|linkStyle|click|direction)\b.*")
+_SUBGRAPH = re.compile(rf"subgraph\s+(?:{_ID}\s*(?:{_SHAPES})?|\"[^\"]*\"|[^\[\]{{}}()]+)")
+_COMPONENT = re.compile(rf"component\s+\[[^\]]+\]\s+as\s+{_ID}")
+_COMPONENT_EDGE = re.compile(rf"{_ID}\s*(?:-->|--|\.\.>)\s*{_ID}(?:\s*:.*)?")
+
+_PARTICIPANT = re.compile(r"(?:create\s+)?(?:participant|actor)\s+[^\s:]+(?:\s+as\s+.+)?")
+_SEQUENCE_ARROW = r"(?:<<-->>|<<->>|-->>|->>|-->|->|--x|-x|--\)|-\))"
+_MESSAGE = re.compile(rf"[^\s:>\-][^:>]*?\s*{_SEQUENCE_ARROW}\s*[+-]?\s*[^\s:][^:]*:.*")
+_NOTE = re.compile(r"[Nn]ote\s+(?:left of|right of|over)\s+[^:]+:.*")
+_SEQUENCE_SIMPLE = re.compile(r"(?:autonumber|title\b.*|(?:activate|deactivate|destroy)\s+\S+|links?\s+.*)")
+_SEQUENCE_OPEN = re.compile(r"(?:loop|alt|opt|par|critical|break|rect|box)\b.*")
+_SEQUENCE_BRANCH = {"else": "alt", "and": "par", "option": "critical"}
+
+_CLASS_NAME = r"[\w.$]+(?:~[^~]+~)?"
+_CLASS_ARROW = r"(?:<\|--|--\|>|<\|\.\.|\.\.\|>|\*--|--\*|o--|--o|-->|<--|--|\.\.>|<\.\.|\.\.)"
+_CLASS = re.compile(rf"class\s+{_CLASS_NAME}(?:\s*\[\"[^\"]*\"\])?(?:\s*:::\w+)?\s*(?P<open>\{{)?")
+_CLASS_RELATION = re.compile(
+    rf"{_CLASS_NAME}\s*(?:\"[^\"]*\"\s*)?{_CLASS_ARROW}\s*(?:\"[^\"]*\"\s*)?{_CLASS_NAME}(?:\s*:.*)?")
+_CLASS_MEMBER = re.compile(rf"{_CLASS_NAME}\s*:\s*.+")
+_CLASS_SIMPLE = re.compile(r"(?:<<\w+>>\s*[\w.$]+|direction\s+\w+|note\b.*|classDef\b.*|cssClass\b.*|click\b.*|link\b.*|callback\b.*)")
+_NAMESPACE = re.compile(r"namespace\s+[\w.]+\s*\{")
+
+
+class MermaidError:
+    """One syntax problem: 1-based line number within the diagram code, message and offending text."""
+
+    def __init__(self, line: int, message: str, text: str = ""):
+        self.line = line
+        self.message = message
+        self.text = text
+
+    def __str__(self) -> str:
+        return f"line {self.line}: {self.message}" + (f": {self.text}" if self.text else "")
+
+    def __repr__(self) -> str:
+        return f"MermaidError({self})"
+
+
+def strip_fences(code: str) -> str:
+    """Diagram code without a surrounding ```mermaid fence."""
+    text = code.strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1] if "\n" in text else ""
+        text = text.rsplit("```", 1)[0]
+    return text
+
+
+def _statements(code: str) -> Iterable[Tuple[int, str]]:
+    """(line number, statement) pairs without blank lines, comments and directives."""
+    for number, raw_line in enumerate(code.split("\n"), start=1):
+        line = raw_line.strip()
+        if line and not line.startswith("%%"):
+            yield number, line
+
+
+def _unbalanced(line: str) -> Optional[str]:
+    """Unclosed quote or bracket of a single statement, if any."""
+    if line.count('"') % 2:
+        return "unterminated string"
+    stack = []
+    pairs = {")": "(", "]": "[", "}": "{"}
+    # The asymmetric shape id>label] closes a bracket it never opened
+    text = _ASYMMETRIC.sub("", re.sub(r'"[^"]*"', '""', line))
+    for char in text:
+        if char in "([{":
+            stack.append(char)
+        elif char in pairs:
+            if not stack or stack[-1] != pairs[char]:
+                return f"unexpected '{char}'"
+            stack.pop()
+    return f"unclosed '{stack[-1]}'" if stack else None
+
+
+def _check_flowchart(statements: List[Tuple[int, str]], errors: List[MermaidError], component: bool = False):
+    depth = 0
+    for number, line in statements:
+        if line == "end":
+            if depth == 0:
+                errors.append(MermaidError(number, "'end' without an open subgraph", line))
+            depth = max(0, depth - 1)
+            continue
+        if line.startswith("subgraph"):
+            if not _SUBGRAPH.fullmatch(line):
+                errors.append(MermaidError(number, "invalid subgraph header", line))
+            depth += 1
+            continue
+        if component and (_COMPONENT.fullmatch(line) or _COMPONENT_EDGE.fullmatch(line)):
+            continue
+        if _FLOW_KEYWORDS.fullmatch(line):
+            continue
+        problem = _unbalanced(line)
+        if problem:
+            errors.append(MermaidError(number, problem, line))
+            continue
+        if re.search(r"(?:^|[\s&>|-])end(?:$|[\s&;\[({-])", line):
+            # A node called 'end' closes the enclosing block and breaks the whole diagram
+            errors.append(MermaidError(number, "'end' cannot be used as a node id", line))
+            continue
+        if not _FLOW_STATEMENT.fullmatch(line):
+            errors.append(MermaidError(number, "invalid node or link statement", line))
+    if depth:
+        errors.append(MermaidError(statements[-1][0] if statements else 1, f"{depth} subgraph(s) not closed with 'end'"))
+
+
+def _check_sequence(statements: List[Tuple[int, str]], errors: List[MermaidError]):
+    blocks: List[Tuple[str, int]] = []
+    for number, line in statements:
+        keyword = line.split()[0]
+        if line == "end":
+            if not blocks:
+                errors.append(MermaidError(number, "'end' without an open block", line))
+            else:
+                blocks.pop()
+            continue
+        if keyword in _SEQUENCE_BRANCH:
+            if not blocks or blocks[-1][0] != _SEQUENCE_BRANCH[keyword]:
+                errors.append(MermaidError(number, f"'{keyword}' outside of a '{_SEQUENCE_BRANCH[keyword]}' block", line))
+            continue
+        if _SEQUENCE_OPEN.fullmatch(line):
+            blocks.append((keyword, number))
+            continue
+        if _PARTICIPANT.fullmatch(line) or _NOTE.fullmatch(line) or _SEQUENCE_SIMPLE.fullmatch(line):
+            continue
+        if _MESSAGE.fullmatch(line):
+            continue
+        if re.search(_SEQUENCE_ARROW, line) and ":" not in line:
+            errors.append(MermaidError(number, "message without ':' and text", line))
+        else:
+            errors.append(MermaidError(number, "invalid sequence statement", line))
+    for keyword, number in blocks:
+        errors.append(MermaidError(number, f"'{keyword}' block not closed with 'end'"))
+
+
+def _check_class(statements: List[Tuple[int, str]], errors: List[MermaidError]):
+    body_start = None
+    namespaces = 0
+    for number, line in statements:
+        if body_start is not None:
+            if line == "}":
+                body_start = None
+            elif "{" in line or "}" in line:
+                errors.append(MermaidError(number, "braces inside a class body", line))
+            continue
+        if line == "}":
+            if namespaces == 0:
+                errors.append(MermaidError(number, "unexpected '}'", line))
+            namespaces = max(0, namespaces - 1)
+            continue
+        if _NAMESPACE.fullmatch(line):
+            namespaces += 1
+            continue
+        match = _CLASS.fullmatch(line)
+        if match:
+            if match.group("open"):
+                body_start = number
+            continue
+        if line.startswith("class ") and line.endswith("}") and "{" in line:
+            # One-line body: class A { +field }
+            continue
+        if _CLASS_RELATION.fullmatch(line) or _CLASS_MEMBER.fullmatch(line) or _CLASS_SIMPLE.fullmatch(line):
+            continue
+        errors.append(MermaidError(number, "invalid class diagram statement", line))
+    if body_start is not None:
+        errors.append(MermaidError(body_start, "class body not closed with '}'"))
+    if namespaces:
+        errors.append(MermaidError(statements[-1][0], "namespace not closed with '}'"))
+
+
+def validate_mermaid(code: str, allowed_types: Optional[Iterable[str]] = None) -> List[MermaidError]:
+    """
+    Check Mermaid code without rendering it.
+
+    Flowcharts, component diagrams (generator dialect), sequence diagrams and
+    class diagrams are checked statement by statement, other known diagram
+    types only for balanced quotes and brackets.
+
+    Args:
+        code: Diagram code, with or without a ```mermaid fence
+        allowed_types: Diagram types accepted for this artifact (any known type by default)
+
+    Returns:
+        Problems found, empty when the diagram is valid
+    """
+    statements = list(_statements(strip_fences(code)))
+    if not statements:
+        return [MermaidError(1, "empty diagram")]
+
+    header_line, header = statements[0]
+    parts = header.split()
+    diagram_type = parts[0]
+    if diagram_type not in KNOWN_TYPES:
+        return [MermaidError(header_line, "unknown diagram type", header)]
+    if allowed_types is not None and diagram_type not in set(allowed_types):
+        return [MermaidError(header_line, f"expected one of {', '.join(sorted(allowed_types))}", header)]
+    if diagram_type in FLOWCHART_TYPES and len(parts) > 1 and parts[1] not in DIRECTIONS:
+        return [MermaidError(header_line, f"unknown direction '{parts[1]}'", header)]
+
+    errors: List[MermaidError] = []
+    body = statements[1:]
+    if diagram_type in FLOWCHART_TYPES or diagram_type == "componentDiagram":
+        _check_flowchart(body, errors, component=diagram_type == "componentDiagram")
+    elif diagram_type == "sequenceDiagram":
+        _check_sequence(body, errors)
+    elif diagram_type == "classDiagram":
+        _check_class(body, errors)
+    else:
+        for number, line in body:
+            problem = _unbalanced(line)
+            if problem:
+                errors.append(MermaidError(number, problem, line))
+    return errors
@@ -0,0 +1,109 @@
+"""Streaming Mermaid writer and sharding helpers for large diagrams."""
+import os
+import re
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, TextIO, Tuple
+
+
+# Renderers struggle well before a thousand nodes, keep every diagram below this size
+DEFAULT_MAX_NODES = int(os.getenv("MERMAID_MAX_NODES", "150"))
+
+DEFAULT_GROUP = "(default)"
+
+
+def node_id(name: str) -> str:
+    """Turn an arbitrary name into a Mermaid-safe identifier."""
+    return re.sub(r"\W", "_", name) or "_"
+
+
+class MermaidWriter:
+    """Write a Mermaid diagram line by line into a text stream (file or buffer)."""
+
+    def __init__(self, out: TextIO, diagram_type: str, fenced: bool = True):
+        self.out = out
+        self.diagram_type = diagram_type
+        self.fenced = fenced
+        self.lines_written = 0
+
+    def __enter__(self):
+        if self.fenced:
+            self.out.write("```mermaid\n")
+        self.out.write(f"{self.diagram_type}\n")
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.fenced:
+            self.out.write("```")
+        return False
+
+    def line(self, text: str, indent: int = 1):
+        """Write a single diagram statement."""
+        self.out.write("    " * indent + text + "\n")
+        self.lines_written += 1
+
+    def lines(self, texts: Iterable[str], indent: int = 1):
+        """Write several diagram statements."""
+        for text in texts:
+            self.line(text, indent)
+
+
+def shard_groups(groups: Dict[str, List[str]], max_nodes: int = DEFAULT_MAX_NODES) -> Dict[str, List[str]]:
+    """
+    Split oversized groups into numbered parts so that no shard exceeds max_nodes.
+
+    Groups are kept whole whenever they fit; nothing is dropped.
+    """
+    shards: Dict[str, List[str]] = {}
+    for group in sorted(groups):
+        members = sorted(groups[group])
+        if len(members) <= max_nodes:
+            shards[group] = members
+            continue
+        parts = (len(members) + max_nodes - 1) // max_nodes
+        for index in range(parts):
+            shards[f"{group} (part {index + 1}/{parts})"] = members[index * max_nodes:(index + 1) * max_nodes]
+    return shards
+
+
+def cluster_nodes(nodes: Iterable[str], edges: Iterable[Tuple[str, str]]) -> Dict[str, List[str]]:
+    """Group nodes into connected clusters (union-find over the given edges)."""
+    parent: Dict[str, str] = {}
+
+    def find(item: str) -> str:
+        parent.setdefault(item, item)
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    for node in nodes:
+        find(node)
+    for source, target in edges:
+        if source in parent and target in parent:
+            root_a, root_b = find(source), find(target)
+            if root_a != root_b:
+                parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    clusters: Dict[str, List[str]] = defaultdict(list)
+    for node in parent:
+        clusters[find(node)].append(node)
+    return {f"cluster {root}": members for root, members in clusters.items()}
+
+
+def shard_edges(edges: Iterable[Tuple[str, str]], shard_of: Callable[[str], Optional[str]]) -> Dict[Tuple[str, str], int]:
+    """Aggregate node edges into weighted edges between shards."""
+    weights: Dict[Tuple[str, str], int] = defaultdict(int)
+    for source, target in edges:
+        source_shard, target_shard = shard_of(source), shard_of(target)
+        if source_shard and target_shard and source_shard != target_shard:
+            weights[(source_shard, target_shard)] += 1
+    return dict(weights)
+
+
+def write_overview(out: TextIO, shards: Dict[str, List[str]], edges: Optional[Dict[Tuple[str, str], int]] = None):
+    """Write an index flowchart with one node per shard and weighted edges between shards."""
+    with MermaidWriter(out, "flowchart LR") as writer:
+        for name, members in shards.items():
+            writer.line(f'{node_id(name)}["{name} ({len(members)})"]')
+        for (source, target), weight in sorted((edges or {}).items()):
+            writer.line(f"{node_id(source)} -->|{weight}| {node_id(target)}")
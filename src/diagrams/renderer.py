@@ -0,0 +1,159 @@
+"""Local rendering of generated Mermaid diagrams to SVG/PNG through Graphviz."""
+import hashlib
+import os
+import re
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import graphviz
+
+
+# Above this many nodes the hierarchical 'dot' layout gets too slow, switch to 'sfdp'
+SFDP_NODE_THRESHOLD = int(os.getenv("RENDER_SFDP_THRESHOLD", "300"))
+
+_COMPONENT = re.compile(r'^component \[(?P<label>.+)\] as (?P<id>\S+)$')
+_FLOW_NODE = re.compile(r'^(?P<id>[\w]+)\["(?P<label>.*)"\]$')
+_CLASS = re.compile(r'^class (?P<id>[\w.$<>]+)\s*\{?$')
+_PARTICIPANT = re.compile(r'^participant (?P<id>\S+)(?: as (?P<label>.+))?$')
+_MESSAGE = re.compile(r'^(?P<src>[\w.]+)\s*-{1,2}>>[+-]?\s*(?P<dst>[\w.]+)\s*:\s*(?P<label>.*)$')
+_EDGE = re.compile(
+    r'^(?P<src>[\w.$]+)\s*(?P<arrow><\|--|<\|\.\.|-->|--|\.\.>|\*--|o--)\s*(?:\|(?P<pipe>[^|]*)\|\s*)?'
+    r'(?P<dst>[\w.$]+)(?:\s*:\s*(?P<label>.*))?$'
+)
+
+
+def mermaid_to_dot(mermaid_code: str, name: str = "diagram") -> Tuple[str, int]:
+    """
+    Convert the subset of Mermaid emitted by the generators into Graphviz DOT.
+
+    Supports component diagrams, flowcharts, class diagrams and sequence diagrams
+    (messages become numbered edges). Returns the DOT source and the node count.
+    """
+    nodes: Dict[str, str] = {}
+    edges: List[Tuple[str, str, str, str]] = []
+    kind = ""
+    in_class_body = False
+    message_index = 0
+
+    for raw_line in mermaid_code.splitlines():
+        line = raw_line.strip()
+        if not line or line.startswith("```") or line.startswith("%%"):
+            continue
+        if not kind:
+            kind = line.split()[0]
+            continue
+        if in_class_body:
+            if line == "}":
+                in_class_body = False
+            continue
+
+        match = _COMPONENT.match(line) or _FLOW_NODE.match(line)
+        if match:
+            nodes[match.group('id')] = match.group('label')
+            continue
+        match = _CLASS.match(line)
+        if match:
+            nodes.setdefault(match.group('id'), match.group('id'))
+            in_class_body = line.endswith("{")
+            continue
+        match = _PARTICIPANT.match(line)
+        if match:
+            nodes.setdefault(match.group('id'), match.group('label') or match.group('id'))
+            continue
+        match = _MESSAGE.match(line)
+        if match:
+            message_index += 1
+            edges.append((match.group('src'), match.group('dst'), f"{message_index}. {match.group('label')}", "solid"))
+            continue
+        match = _EDGE.match(line)
+        if match:
+            source, target, arrow = match.group('src'), match.group('dst'), match.group('arrow')
+            label = match.group('pipe') or match.group('label') or ""
+            if arrow.startswith("<|"):
+                # Mermaid writes 'Parent <|-- Child', draw the arrow from child to parent
+                source, target = target, source
+            style = "dashed" if ".." in arrow else "solid"
+            edges.append((source, target, label, style))
+
+    for source, target, _, _ in edges:
+        nodes.setdefault(source, source)
+        nodes.setdefault(target, target)
+
+    graph = graphviz.Digraph(name=name)
+    graph.attr("node", shape="box", fontname="Helvetica")
+    if kind == "sequenceDiagram":
+        graph.attr(rankdir="LR")
+    for node, label in nodes.items():
+        graph.node(node, label=label)
+    for source, target, label, style in edges:
+        graph.edge(source, target, label=label, style=style)
+    return graph.source, len(nodes)
+
+
+class DiagramRenderer:
+    """Render diagrams in a worker pool, caching output by diagram content hash."""
+
+    def __init__(self, output_dir: str, cache_dir: Optional[str] = None,
+                 formats: Iterable[str] = ("svg",), max_workers: Optional[int] = None):
+        self.output_dir = output_dir
+        self.cache_dir = cache_dir or os.path.join(output_dir, ".render-cache")
+        self.formats = tuple(formats)
+        self.max_workers = max_workers or min(8, os.cpu_count() or 1)
+        os.makedirs(self.output_dir, exist_ok=True)
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @classmethod
+    def from_env(cls) -> Optional["DiagramRenderer"]:
+        """Build a renderer from RENDER_DIR / RENDER_FORMATS, or None when rendering is off."""
+        output_dir = os.getenv("RENDER_DIR")
+        if not output_dir:
+            return None
+        formats = [fmt.strip() for fmt in os.getenv("RENDER_FORMATS", "svg").split(",") if fmt.strip()]
+        return cls(output_dir, cache_dir=os.getenv("RENDER_CACHE_DIR"), formats=formats)
+
+    def select_engine(self, node_count: int) -> str:
+        """Pick a layout engine suitable for the graph size."""
+        return "sfdp" if node_count > SFDP_NODE_THRESHOLD else "dot"
+
+    def render_all(self, diagrams: Dict[str, str]) -> Dict[str, List[str]]:
+        """
+        Render several Mermaid diagrams concurrently.
+
+        Args:
+            diagrams: Mapping of diagram name to Mermaid code
+
+        Returns:
+            Mapping of diagram name to the rendered file paths
+        """
+        if not diagrams:
+            return {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {name: pool.submit(self.render, name, code) for name, code in diagrams.items()}
+            return {name: future.result() for name, future in futures.items()}
+
+    def render(self, name: str, mermaid_code: str) -> List[str]:
+        """Render one Mermaid diagram to every configured format."""
+        dot_source, node_count = mermaid_to_dot(mermaid_code)
+        engine = self.select_engine(node_count)
+        digest = hashlib.sha256(f"{engine}\n{dot_source}".encode("utf-8")).hexdigest()
+
+        paths = []
+        for fmt in self.formats:
+            cached = os.path.join(self.cache_dir, f"{digest}.{fmt}")
+            if not os.path.exists(cached):
+                data = graphviz.Source(dot_source, engine=engine).pipe(format=fmt)
+                tmp_path = f"{cached}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, cached)
+
+            target = os.path.join(self.output_dir, f"{_safe_name(name)}.{fmt}")
+            shutil.copyfile(cached, target)
+            paths.append(target)
+        return paths
+
+
+def _safe_name(name: str) -> str:
+    return re.sub(r"[^\w.-]+", "_", name).strip("_") or "diagram"
@@ -0,0 +1,368 @@
+"""Maven/Gradle module discovery and per-module partitioning of a source tree."""
+import os
+import posixpath
+import re
+import sys
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from src.loader.sources import SourceFile, open_spec
+from src.utils.memory import memory
+from src.utils.tracing import tracer
+
+
+def default_source_roots() -> Tuple[str, ...]:
+    """
+    Source roots analyzed inside each module (MODULE_SOURCE_ROOTS, comma-separated); tests,
+    samples and generated code live elsewhere. Read at call time so that a value from .env counts.
+    """
+    return tuple(root.strip().strip("/") for root in
+                 os.getenv("MODULE_SOURCE_ROOTS", "src/main/java").split(",") if root.strip())
+
+
+def module_workers() -> int:
+    """Worker processes for the module analysis (MODULE_WORKERS, one per CPU by default)."""
+    return int(os.getenv("MODULE_WORKERS", str(os.cpu_count() or 1)))
+
+_GRADLE_SETTINGS = ("settings.gradle", "settings.gradle.kts")
+_GRADLE_BUILDS = ("build.gradle", "build.gradle.kts")
+
+
+class BuildModule:
+    """One Maven module or Gradle project: its directory, source roots and declared module dependencies."""
+
+    def __init__(self, name: str, path: str, build: str, source_roots: Optional[List[str]] = None,
+                 dependencies: Optional[List[str]] = None, coordinates: Optional[str] = None):
+        self.name = name
+        self.path = path.strip("/") if path not in ("", ".") else ""
+        self.build = build
+        self.source_roots = list(source_roots or default_source_roots())
+        self.dependencies = list(dependencies or [])
+        self.coordinates = coordinates
+
+    def prefixes(self) -> List[str]:
+        """Repository-relative directories holding the module sources, with a trailing slash."""
+        prefixes = []
+        for root in self.source_roots:
+            prefix = posixpath.join(self.path, root) if root else self.path
+            prefixes.append(f"{prefix.strip('/')}/" if prefix.strip("/") else "")
+        return prefixes
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "path": self.path or ".",
+            "build": self.build,
+            "source_roots": self.source_roots,
+            "dependencies": self.dependencies,
+            "coordinates": self.coordinates,
+        }
+
+
+def _text(source, relative_path: str) -> Optional[str]:
+    data = source.read_path(relative_path)
+    return data.decode("utf-8", errors="replace") if data is not None else None
+
+
+def _strip_namespaces(root: ET.Element) -> ET.Element:
+    for element in root.iter():
+        if isinstance(element.tag, str) and "}" in element.tag:
+            element.tag = element.tag.split("}", 1)[1]
+    return root
+
+
+def _discover_maven(source) -> List[BuildModule]:
+    modules: Dict[str, BuildModule] = {}
+    declared: Dict[str, List[Tuple[str, str]]] = {}
+    queue = [""]
+    while queue:
+        path = queue.pop(0)
+        if path in modules:
+            continue
+        text = _text(source, posixpath.join(path, "pom.xml"))
+        if text is None:
+            continue
+        try:
+            project = _strip_namespaces(ET.fromstring(text))
+        except ET.ParseError as e:
+            print(f"Skipping unparsable {posixpath.join(path, 'pom.xml')}: {e}")
+            continue
+
+        artifact_id = (project.findtext("artifactId") or path or "root").strip()
+        group_id = (project.findtext("groupId") or project.findtext("parent/groupId") or "").strip()
+        source_directory = (project.findtext("build/sourceDirectory") or "").strip()
+        source_roots = None
+        if source_directory:
+            source_roots = [re.sub(r"^\$\{(project\.)?basedir\}/?", "", source_directory)]
+        modules[path] = BuildModule(artifact_id, path, "maven", source_roots, coordinates=f"{group_id}:{artifact_id}")
+        declared[path] = [((dep.findtext("groupId") or "").strip(), (dep.findtext("artifactId") or "").strip())
+                          for dep in project.findall("dependencies/dependency")]
+
+        for module in project.findall("modules/module") + project.findall("profiles/profile/modules/module"):
+            child = posixpath.normpath(posixpath.join(path, (module.text or "").strip()))
+            queue.append("" if child == "." else child)
+
+    by_artifact = {module.name: module for module in modules.values()}
+    for path, dependencies in declared.items():
+        module = modules[path]
+        group_id = module.coordinates.split(":", 1)[0]
+        for dep_group, dep_artifact in dependencies:
+            target = by_artifact.get(dep_artifact)
+            if target is None or target is module:
+                continue
+            # ${project.groupId} and friends are taken as the group of the reactor
+            if dep_group and "${" not in dep_group and dep_group != target.coordinates.split(":", 1)[0] and dep_group != group_id:
+                continue
+            module.dependencies.append(target.name)
+    return list(modules.values())
+
+
+def _gradle_accessor(name: str) -> str:
+    """Type-safe project accessor of a Gradle project path: ':core-api:rest' -> 'coreApi.rest'."""
+    return ".".join(re.sub(r"[-_](\w)", lambda m: m.group(1).upper(), part) for part in name.strip(":").split(":"))
+
+
+def _discover_gradle(source) -> List[BuildModule]:
+    settings = next((text for text in (_text(source, name) for name in _GRADLE_SETTINGS) if text is not None), None)
+    if settings is None:
+        return []
+
+    settings = re.sub(r"//[^\n]*|/\*.*?\*/", "", settings, flags=re.S)
+    project_paths = [""]
+    # include(":a", ":b") may span lines up to its paren, include 'a', 'b' continues after a trailing comma
+    for statement in re.findall(r"\binclude\b\s*(?:\(([^)]*)\)|((?:[^\n]*,[ \t]*\n)*[^\n]*))", settings, re.S):
+        statement = "".join(statement)
+        for name in re.findall(r"['\"]([^'\"]+)['\"]", statement):
+            project_paths.append(":" + name.lstrip(":"))
+    directories = {name: directory for name, directory in re.findall(
+        r"project\(\s*['\"](:[^'\"]+)['\"]\s*\)\.projectDir\s*=\s*(?:new\s+File\(\s*settingsDir\s*,\s*|file\(\s*)['\"]([^'\"]+)['\"]",
+        settings)}
+
+    modules: Dict[str, BuildModule] = {}
+    for project_path in dict.fromkeys(project_paths):
+        directory = directories.get(project_path, project_path.strip(":").replace(":", "/"))
+        name = project_path.strip(":") or "root"
+        modules[project_path] = BuildModule(name, directory, "gradle")
+
+    accessors = {_gradle_accessor(project_path): project_path for project_path in modules if project_path}
+    for project_path, module in modules.items():
+        build = next((text for text in (_text(source, posixpath.join(module.path, name)) for name in _GRADLE_BUILDS)
+                      if text is not None), "")
+        build = re.sub(r"//[^\n]*|/\*.*?\*/", "", build, flags=re.S)
+        targets = re.findall(r"project\(\s*(?:path\s*[:=]\s*)?['\"](:[^'\"]+)['\"]", build)
+        targets += [accessors[accessor] for accessor in re.findall(r"\bprojects\.([\w.]+)", build) if accessor in accessors]
+        for target in dict.fromkeys(targets):
+            if target in modules and target != project_path:
+                module.dependencies.append(modules[target].name)
+    return list(modules.values())
+
+
+def discover_modules(source, files: Optional[List[SourceFile]] = None) -> List[BuildModule]:
+    """
+    Find the build modules of a source tree.
+
+    Maven reactors are read from pom.xml <modules> (recursively), Gradle builds
+    from settings.gradle(.kts) include statements. A tree without either is a
+    single module; its sources are restricted to the default source roots when
+    they exist, and the whole tree is analyzed otherwise.
+    """
+    modules = _discover_maven(source) or _discover_gradle(source)
+    if modules:
+        return modules
+    module = BuildModule("root", "", "none")
+    paths = [source.relative_path(source_file.path) for source_file in (files if files is not None else source.list_files())]
+    if not any(path.startswith(prefix) for path in paths for prefix in module.prefixes()):
+        module.source_roots = [""]
+    return [module]
+
+
+def _maven_info(source, path: str, info: Dict[str, Any]):
+    text = _text(source, posixpath.join(path, "pom.xml"))
+    if text is None:
+        return
+    try:
+        project = _strip_namespaces(ET.fromstring(text))
+    except ET.ParseError:
+        return
+    info["build"] = "maven"
+    if not path:
+        info["name"] = (project.findtext("name") or project.findtext("artifactId") or "").strip() or None
+        info["description"] = " ".join((project.findtext("description") or "").split()) or None
+        info["version"] = (project.findtext("version") or project.findtext("parent/version") or "").strip() or None
+        for prop in ("java.version", "maven.compiler.release", "maven.compiler.source", "maven.compiler.target"):
+            version = (project.findtext(f"properties/{prop}") or "").strip()
+            if version and "${" not in version:
+                info["java_version"] = version
+                break
+    parent = ":".join((project.findtext(f"parent/{key}") or "").strip() for key in ("groupId", "artifactId"))
+    if parent != ":":
+        info["parents"].append(parent)
+    for dep in project.findall("dependencies/dependency"):
+        if (dep.findtext("scope") or "").strip() == "test":
+            continue
+        info["dependencies"].append(f"{(dep.findtext('groupId') or '').strip()}:{(dep.findtext('artifactId') or '').strip()}")
+    for plugin in project.findall("build/plugins/plugin"):
+        info["plugins"].append(f"{(plugin.findtext('groupId') or '').strip()}:{(plugin.findtext('artifactId') or '').strip()}")
+
+
+def _gradle_info(source, path: str, info: Dict[str, Any]):
+    build = next((text for text in (_text(source, posixpath.join(path, name)) for name in _GRADLE_BUILDS)
+                  if text is not None), None)
+    if build is None:
+        return
+    info["build"] = info["build"] or "gradle"
+    build = re.sub(r"//[^\n]*|/\*.*?\*/", "", build, flags=re.S)
+    if not path:
+        description = re.search(r"^\s*description\s*=\s*['\"]([^'\"]+)['\"]", build, re.M)
+        version = re.search(r"^\s*version\s*=\s*['\"]([^'\"]+)['\"]", build, re.M)
+        java = re.search(r"(?:sourceCompatibility\s*=\s*(?:JavaVersion\.VERSION_)?['\"]?([\d._]+)"
+                         r"|languageVersion(?:\.set\(|\s*=\s*)\s*JavaLanguageVersion\.of\(\s*(\d+))", build)
+        info["description"] = info["description"] or (description.group(1) if description else None)
+        info["version"] = info["version"] or (version.group(1) if version else None)
+        if java and not info["java_version"]:
+            info["java_version"] = (java.group(1) or java.group(2)).replace("_", ".")
+    for configuration, group, artifact in re.findall(
+            r"\b(\w+)\s*\(?\s*['\"]([\w.\-]+):([\w.\-]+)(?::[^'\"]*)?['\"]", build):
+        if not configuration.lower().startswith("test"):
+            info["dependencies"].append(f"{group}:{artifact}")
+    info["plugins"] += re.findall(r"\bid\s*\(?\s*['\"]([\w.\-]+)['\"]", build)
+
+
+def read_build_info(source) -> Dict[str, Any]:
+    """
+    Project facts declared in pom.xml / build.gradle(.kts) of all modules.
+
+    Returns:
+        build ('maven', 'gradle' or None), name, description, version and
+        java_version of the root project, and the parents, plugins and
+        non-test dependencies ('group:artifact') of all modules
+    """
+    info: Dict[str, Any] = {"build": None, "name": None, "description": None, "version": None,
+                            "java_version": None, "parents": [], "plugins": [], "dependencies": []}
+    modules = _discover_maven(source) or _discover_gradle(source)
+    for path in dict.fromkeys([""] + [module.path for module in modules]):
+        _maven_info(source, path, info)
+        _gradle_info(source, path, info)
+    if info["build"] == "gradle" and not info["name"]:
+        settings = next((text for text in (_text(source, name) for name in _GRADLE_SETTINGS) if text is not None), "")
+        name = re.search(r"rootProject\.name\s*=\s*['\"]([^'\"]+)['\"]", settings)
+        info["name"] = name.group(1) if name else None
+    for key in ("parents", "plugins", "dependencies"):
+        info[key] = sorted(set(info[key]))
+    return info
+
+
+def module_graph(modules: List[BuildModule]) -> Dict[str, Any]:
+    """Module-level dependency graph built from the declared inter-module dependencies."""
+    return {
+        "modules": {module.name: module.to_dict() for module in modules},
+        "edges": [(module.name, dependency) for module in modules for dependency in module.dependencies],
+    }
+
+
+class ModuleSource:
+    """View of a source provider restricted to the source roots of one module."""
+
+    def __init__(self, source, prefixes: List[str], files: Optional[List[SourceFile]] = None):
+        self.source = source
+        self.prefixes = prefixes
+        self._files = files
+
+    def _matches(self, path: str) -> bool:
+        relative = self.source.relative_path(path)
+        return any(relative.startswith(prefix) for prefix in self.prefixes)
+
+    def list_files(self) -> List[SourceFile]:
+        if self._files is None:
+            self._files = [source_file for source_file in self.source.list_files() if self._matches(source_file.path)]
+        return self._files
+
+    def read(self, source_file: SourceFile) -> bytes:
+        return self.source.read(source_file)
+
+    def read_prefix(self, source_file: SourceFile, size: int) -> bytes:
+        return self.source.read_prefix(source_file, size)
+
+    def directories(self) -> Iterator[Tuple[str, List[str], List[str]]]:
+        """Directories inside the module source roots and their ancestors (the latter without files)."""
+        for rel_dir, dirs, files in self.source.directories():
+            path = "" if rel_dir == "." else rel_dir.replace(os.sep, "/") + "/"
+            inside = any(path.startswith(prefix) for prefix in self.prefixes)
+            if inside or any(prefix.startswith(path) for prefix in self.prefixes):
+                yield rel_dir, dirs, files if inside else []
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+def _analyze_module(spec: Tuple[str, ...], prefixes: List[str], analyze: Callable[[Any], Dict[str, Any]],
+                    budget_bytes: Optional[int] = None) -> Dict[str, Any]:
+    # Workers share the memory budget; their phases travel back with the result (see analyze_modules)
+    memory.limit(budget_bytes)
+    with open_spec(spec) as source:
+        result = analyze(ModuleSource(source, prefixes))
+    if memory.enabled:
+        result["memory_report"] = memory.drain()
+    if tracer.enabled:
+        result["file_timings"] = tracer.drain_files()
+    return result
+
+
+def analyze_modules(source, analyze: Callable[[Any], Dict[str, Any]],
+                    workers: Optional[int] = None) -> Tuple[List[BuildModule], Dict[str, Dict[str, Any]], int]:
+    """
+    Run an analysis once per build module, in parallel processes when there are several.
+
+    Args:
+        source: Source provider of the whole repository
+        analyze: Picklable callable analyzing one ModuleSource
+        workers: Worker processes (MODULE_WORKERS by default, 1 runs inline)
+
+    Returns:
+        (modules, analysis result per module name, number of Java files outside all modules)
+    """
+    all_files = source.list_files()
+    modules = discover_modules(source, all_files)
+    partitions = []
+    covered = 0
+    for module in modules:
+        prefixes = module.prefixes()
+        files = [f for f in all_files if any(source.relative_path(f.path).startswith(p) for p in prefixes)]
+        covered += len(files)
+        partitions.append((module, prefixes, files))
+    if all_files and not covered:
+        # The build declares modules but none of them holds a source file (unusual layout or unparsed
+        # settings): analyze the whole tree rather than returning an empty analysis
+        print(f"No source files in the source roots of {len(modules)} build module(s), analyzing the whole tree")
+        module = BuildModule("root", "", modules[0].build if modules else "none", [""])
+        modules = [module]
+        partitions = [(module, module.prefixes(), all_files)]
+        covered = len(all_files)
+
+    workers = module_workers() if workers is None else workers
+    busy = [partition for partition in partitions if partition[2]]
+    results: Dict[str, Dict[str, Any]] = {}
+    if workers > 1 and len(busy) > 1:
+        pool_options = {}
+        if memory.budget_bytes and sys.version_info >= (3, 11):
+            # Under a memory budget every module gets a fresh process, so one large module's heap is not kept around
+            pool_options["max_tasks_per_child"] = 1
+        processes = min(workers, len(busy))
+        budget_share = memory.budget_bytes // processes if memory.budget_bytes else None
+        with ProcessPoolExecutor(max_workers=processes, **pool_options) as executor:
+            futures = {module.name: executor.submit(_analyze_module, source.spec(), prefixes, analyze, budget_share)
+                       for module, prefixes, _ in busy}
+            results = {name: future.result() for name, future in futures.items()}
+        for result in results.values():
+            memory.absorb(result.pop("memory_report", {}))
+            tracer.absorb_files(result.pop("file_timings", []))
+    else:
+        for module, prefixes, files in busy:
+            results[module.name] = analyze(ModuleSource(source, prefixes, files))
+    return modules, results, len(all_files) - covered
@@ -0,0 +1,213 @@
+"""Source providers feeding Java files to the analyzers from a directory or straight from git objects."""
+import os
+import subprocess
+import threading
+from typing import Iterator, List, Optional, Tuple
+
+
+def checkout_free_enabled() -> bool:
+    """Whether repositories should be analyzed from git objects instead of a checkout (CHECKOUT_FREE)."""
+    return os.getenv("CHECKOUT_FREE", "").lower() in ("1", "true", "yes")
+
+
+def is_bare_repository(path: str) -> bool:
+    """A bare repository or mirror: git metadata at the top level and no working tree."""
+    return (os.path.isfile(os.path.join(path, "HEAD")) and os.path.isdir(os.path.join(path, "objects"))
+            and not os.path.exists(os.path.join(path, ".git")))
+
+
+def open_spec(spec: Tuple[str, ...]):
+    """Reopen a source from its spec(), e.g. inside a worker process."""
+    if spec[0] == "git":
+        return GitBlobSource(spec[1], spec[2])
+    return FileSystemSource(spec[1])
+
+
+def open_source(path: str, commit: Optional[str] = None):
+    """GitBlobSource for bare repositories or when a commit is given, FileSystemSource otherwise."""
+    if commit or is_bare_repository(path):
+        return GitBlobSource(path, commit or "HEAD")
+    return FileSystemSource(path)
+
+
+class SourceFile:
+    """A source file known to a provider: its path, size and (for git) blob id."""
+
+    __slots__ = ("path", "size", "blob_id")
+
+    def __init__(self, path: str, size: Optional[int] = None, blob_id: Optional[str] = None):
+        self.path = path
+        self.size = size
+        self.blob_id = blob_id
+
+
+class FileSystemSource:
+    """Java files of a checked out working tree."""
+
+    def __init__(self, root: str, suffix: str = ".java"):
+        self.root = root
+        self.suffix = suffix
+
+    def list_files(self) -> List[SourceFile]:
+        files = []
+        for root, dirs, names in os.walk(self.root):
+            for name in names:
+                if name.endswith(self.suffix):
+                    path = os.path.join(root, name)
+                    try:
+                        size = os.path.getsize(path)
+                    except OSError:
+                        size = None
+                    files.append(SourceFile(path, size))
+        return files
+
+    def read(self, source_file: SourceFile) -> bytes:
+        with open(source_file.path, "rb") as f:
+            return f.read()
+
+    def read_prefix(self, source_file: SourceFile, size: int) -> bytes:
+        """The first size bytes of a file (e.g. for a header scan) without reading the rest."""
+        with open(source_file.path, "rb") as f:
+            return f.read(size)
+
+    def read_path(self, relative_path: str) -> Optional[bytes]:
+        """Any file of the tree (e.g. a build file) by its repository-relative path, None if missing."""
+        try:
+            with open(os.path.join(self.root, relative_path), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def relative_path(self, path: str) -> str:
+        return os.path.relpath(path, self.root).replace(os.sep, "/")
+
+    def spec(self) -> Tuple[str, ...]:
+        """Picklable description to reopen the source in another process (see open_spec)."""
+        return ("fs", self.root)
+
+    def directories(self) -> Iterator[Tuple[str, List[str], List[str]]]:
+        """(relative dir, subdirectories, java files) for every directory."""
+        for root, dirs, files in os.walk(self.root):
+            yield os.path.relpath(root, self.root), dirs, [f for f in files if f.endswith(self.suffix)]
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class GitBlobSource:
+    """
+    Java files of a commit read straight from the git object database.
+
+    The tree is listed once with `git ls-tree -r`, blob contents are streamed
+    through a single persistent `git cat-file --batch` process. Works on bare
+    mirrors, so no working tree is ever written to disk.
+    """
+
+    def __init__(self, repo_path: str, commit: str = "HEAD", suffix: str = ".java"):
+        self.repo_path = repo_path
+        self.suffix = suffix
+        self.commit = self._git("rev-parse", f"{commit}^{{commit}}").decode().strip()
+        self._process: Optional[subprocess.Popen] = None
+        self._lock = threading.Lock()
+
+    def list_files(self, commit: Optional[str] = None) -> List[SourceFile]:
+        """Java blobs of the source commit, or of another commit of the same repository."""
+        output = self._git("ls-tree", "-r", "-z", "--long", commit or self.commit)
+        files = []
+        for entry in output.split(b"\0"):
+            if not entry:
+                continue
+            meta, _, raw_path = entry.partition(b"\t")
+            mode, object_type, blob_id, size = meta.split()
+            path = raw_path.decode("utf-8", errors="surrogateescape")
+            if object_type == b"blob" and path.endswith(self.suffix):
+                files.append(SourceFile(path, int(size), blob_id.decode()))
+        return files
+
+    def read(self, source_file: SourceFile) -> bytes:
+        return self.read_blob(source_file.blob_id)
+
+    def read_prefix(self, source_file: SourceFile, size: int) -> bytes:
+        """The first size bytes of a blob; cat-file streams whole blobs, so the rest is read and dropped."""
+        return self.read_blob(source_file.blob_id)[:size]
+
+    def read_path(self, relative_path: str) -> Optional[bytes]:
+        """Any file of the commit (e.g. a build file) by its repository-relative path, None if missing."""
+        try:
+            return self.read_blob(f"{self.commit}:{relative_path}")
+        except Exception:
+            return None
+
+    def relative_path(self, path: str) -> str:
+        return path
+
+    def spec(self) -> Tuple[str, ...]:
+        """Picklable description to reopen the source in another process (see open_spec)."""
+        return ("git", self.repo_path, self.commit)
+
+    def read_blob(self, blob_id: str) -> bytes:
+        """Fetch one blob through the persistent cat-file process."""
+        with self._lock:
+            process = self._batch_process()
+            process.stdin.write(f"{blob_id}\n".encode())
+            process.stdin.flush()
+            header = process.stdout.readline().split()
+            if len(header) < 3 or header[-1] in (b"missing", b"ambiguous"):
+                raise Exception(f"Blob {blob_id} is missing from {self.repo_path}")
+            if header[1] != b"blob":
+                # Trees and commits asked for by path are drained and reported as not found
+                process.stdout.read(int(header[2]) + 1)
+                raise Exception(f"{blob_id} is a {header[1].decode()}, not a blob")
+            size = int(header[2])
+            data = process.stdout.read(size)
+            process.stdout.read(1)  # trailing newline
+            return data
+
+    def directories(self) -> Iterator[Tuple[str, List[str], List[str]]]:
+        """(relative dir, subdirectories, java files) derived from the tree listing."""
+        dirs = {}
+        for source_file in self.list_files():
+            parent, name = os.path.split(source_file.path)
+            dirs.setdefault(parent or ".", (set(), []))[1].append(name)
+            while parent:
+                grandparent, child = os.path.split(parent)
+                dirs.setdefault(grandparent or ".", (set(), []))[0].add(child)
+                parent = grandparent
+        for rel_dir, (subdirs, files) in sorted(dirs.items()):
+            yield rel_dir, sorted(subdirs), files
+
+    def _batch_process(self) -> subprocess.Popen:
+        if self._process is None or self._process.poll() is not None:
+            self._process = subprocess.Popen(
+                ["git", "-C", self.repo_path, "cat-file", "--batch"],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE
+            )
+        return self._process
+
+    def _git(self, *args: str) -> bytes:
+        result = subprocess.run(["git", "-C", self.repo_path] + list(args), capture_output=True)
+        if result.returncode != 0:
+            raise Exception(f"git {args[0]} failed: {result.stderr.decode(errors='replace').strip()}")
+        return result.stdout
+
+    def close(self):
+        with self._lock:
+            if self._process is not None:
+                self._process.stdin.close()
+                self._process.wait()
+                self._process.stdout.close()
+                self._process = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
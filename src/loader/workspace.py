@@ -0,0 +1,306 @@
+"""Managed checkout workspace: one mirror per repository, reusable worktrees, LRU eviction."""
+import fcntl
+import hashlib
+import os
+import re
+import shutil
+import subprocess
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+
+DEFAULT_QUOTA_MB = 10 * 1024
+
+
+def _with_credentials(repo_url: str, username: Optional[str], password: Optional[str]) -> str:
+    """Embed credentials into an http(s) URL."""
+    if not (username and password):
+        return repo_url
+    parsed_url = urlparse(repo_url)
+    if parsed_url.scheme not in ("http", "https"):
+        return repo_url
+    scheme, netloc = parsed_url.scheme, parsed_url.netloc
+    return repo_url.replace(f"{scheme}://{netloc}", f"{scheme}://{username}:{password}@{netloc}", 1)
+
+
+def _redact_credentials(message: str, args) -> str:
+    """Mask passwords of credentialed URLs among the git arguments wherever git echoed them."""
+    for arg in args:
+        try:
+            password = urlparse(arg).password
+        except ValueError:
+            continue
+        if password:
+            message = message.replace(password, "***")
+    return message
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for root, dirs, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+class _FileLock:
+    """Advisory flock on a lock file; works across processes and across threads."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    def acquire(self, blocking: bool = True) -> bool:
+        self._file = open(self.path, "a+")
+        try:
+            fcntl.flock(self._file, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            return True
+        except BlockingIOError:
+            self._file.close()
+            self._file = None
+            return False
+
+    def release(self):
+        if self._file is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+
+class WorkspaceLease:
+    """Exclusive use of one worktree checked out at a given commit."""
+
+    def __init__(self, manager: "WorkspaceManager", repo_url: str, path: str, commit: str, lock: _FileLock):
+        self.manager = manager
+        self.repo_url = repo_url
+        self.path = path
+        self.commit = commit
+        self._lock = lock
+
+    def release(self):
+        """Give the worktree back to the pool."""
+        self.manager.release(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+
+class WorkspaceManager:
+    """
+    Keeps one bare mirror per repository URL under a root directory.
+
+    Mirrors are updated with `git fetch` (only new objects are transferred),
+    requested commits are checked out into reusable detached worktrees, every
+    worktree is leased under a file lock, and whole repositories are evicted
+    in least-recently-used order once the disk quota is exceeded.
+    """
+
+    def __init__(self, root: str, quota_bytes: int = DEFAULT_QUOTA_MB * 1024 * 1024):
+        self.root = os.path.abspath(root)
+        self.quota_bytes = quota_bytes
+        self._leases: Dict[str, WorkspaceLease] = {}
+        self._leases_lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def repo_dir(self, repo_url: str) -> str:
+        """Directory holding the mirror and worktrees of a repository."""
+        name = re.sub(r"[^\w.-]+", "_", repo_url.rstrip("/").split("/")[-1].removesuffix(".git"))[:40]
+        digest = hashlib.sha1(repo_url.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.root, f"{name}-{digest}")
+
+    def acquire(self, repo_url: str, ref: Optional[str] = None,
+                username: Optional[str] = None, password: Optional[str] = None) -> WorkspaceLease:
+        """
+        Check out `ref` (default: the remote HEAD) into a free worktree and lease it.
+
+        Args:
+            repo_url: Repository URL without credentials
+            ref: Branch, tag or commit SHA to check out
+            username: Optional username for http(s) remotes
+            password: Optional password or token for http(s) remotes
+
+        Returns:
+            Lease whose `path` is the checked out worktree
+        """
+        repo_dir = self.repo_dir(repo_url)
+        mirror = os.path.join(repo_dir, "mirror.git")
+        worktrees = os.path.join(repo_dir, "worktrees")
+        os.makedirs(worktrees, exist_ok=True)
+        auth_url = _with_credentials(repo_url, username, password)
+
+        with _FileLock(os.path.join(repo_dir, "mirror.lock")):
+            commit = self._update_mirror(repo_url, auth_url, mirror, ref)
+            path, lock = self._lease_worktree(mirror, worktrees, commit)
+            self._touch(repo_dir)
+
+        lease = WorkspaceLease(self, repo_url, path, commit, lock)
+        with self._leases_lock:
+            self._leases[path] = lease
+        self.enforce_quota(keep=repo_dir)
+        return lease
+
+    def mirror_path(self, repo_url: str, ref: Optional[str] = None,
+                    username: Optional[str] = None, password: Optional[str] = None) -> Tuple[str, str]:
+        """Bring the bare mirror up to date without checking anything out; returns (mirror, commit)."""
+        repo_dir = self.repo_dir(repo_url)
+        mirror = os.path.join(repo_dir, "mirror.git")
+        os.makedirs(repo_dir, exist_ok=True)
+        with _FileLock(os.path.join(repo_dir, "mirror.lock")):
+            commit = self._update_mirror(repo_url, _with_credentials(repo_url, username, password), mirror, ref)
+            self._touch(repo_dir)
+        self.enforce_quota(keep=repo_dir)
+        return mirror, commit
+
+    def owns(self, path: str) -> bool:
+        """Whether a path is a worktree leased from this workspace."""
+        with self._leases_lock:
+            return path in self._leases
+
+    def manages(self, path: str) -> bool:
+        """Whether a path lives inside the workspace root (mirrors and worktrees must not be deleted by callers)."""
+        return os.path.realpath(path).startswith(os.path.realpath(self.root) + os.sep)
+
+    def release(self, path: str):
+        """Release the lease on a worktree; the checkout stays on disk for reuse."""
+        with self._leases_lock:
+            lease = self._leases.pop(path, None)
+        if lease is not None:
+            lease._lock.release()
+
+    def enforce_quota(self, keep: Optional[str] = None) -> List[str]:
+        """
+        Evict least recently used repositories until the workspace fits the quota.
+
+        Repositories with a leased worktree or a running fetch are skipped.
+
+        Returns:
+            Evicted repository directories
+        """
+        entries = []
+        total = 0
+        for name in os.listdir(self.root):
+            repo_dir = os.path.join(self.root, name)
+            if not os.path.isdir(repo_dir):
+                continue
+            size = _dir_size(repo_dir)
+            total += size
+            entries.append((self._last_used(repo_dir), repo_dir, size))
+
+        evicted = []
+        for _, repo_dir, size in sorted(entries):
+            if total <= self.quota_bytes:
+                break
+            if repo_dir == keep or not self._try_evict(repo_dir):
+                continue
+            total -= size
+            evicted.append(repo_dir)
+        return evicted
+
+    def _update_mirror(self, repo_url: str, auth_url: str, mirror: str, ref: Optional[str]) -> str:
+        if not os.path.isdir(mirror):
+            self._git(None, "clone", "--mirror", "--quiet", auth_url, mirror)
+            # Do not keep credentials in the mirror config
+            self._git(mirror, "remote", "set-url", "origin", repo_url)
+        elif not (ref and self._has_commit(mirror, ref)):
+            self._git(mirror, "fetch", "--prune", "--quiet", auth_url,
+                      "+refs/heads/*:refs/heads/*", "+refs/tags/*:refs/tags/*")
+        return self._git(mirror, "rev-parse", f"{ref or 'HEAD'}^{{commit}}").strip()
+
+    def _has_commit(self, mirror: str, ref: str) -> bool:
+        # Only immutable full SHAs can skip the fetch, branch names may have moved
+        if not re.fullmatch(r"[0-9a-f]{40}", ref):
+            return False
+        return subprocess.run(
+            ["git", "-C", mirror, "cat-file", "-e", f"{ref}^{{commit}}"],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        ).returncode == 0
+
+    def _lease_worktree(self, mirror: str, worktrees: str, commit: str) -> Tuple[str, _FileLock]:
+        index = 0
+        while True:
+            path = os.path.join(worktrees, f"wt-{index}")
+            lock = _FileLock(f"{path}.lock")
+            if lock.acquire(blocking=False):
+                try:
+                    if os.path.isdir(path):
+                        self._git(path, "checkout", "--quiet", "--detach", "--force", commit)
+                        self._git(path, "clean", "-fdxq")
+                    else:
+                        self._git(mirror, "worktree", "prune")
+                        self._git(mirror, "worktree", "add", "--quiet", "--detach", path, commit)
+                except Exception:
+                    lock.release()
+                    raise
+                return path, lock
+            index += 1
+
+    def _try_evict(self, repo_dir: str) -> bool:
+        locks = [_FileLock(os.path.join(repo_dir, "mirror.lock"))]
+        worktrees = os.path.join(repo_dir, "worktrees")
+        if os.path.isdir(worktrees):
+            locks += [_FileLock(os.path.join(worktrees, name)) for name in os.listdir(worktrees) if name.endswith(".lock")]
+        acquired = []
+        try:
+            for lock in locks:
+                if not lock.acquire(blocking=False):
+                    return False
+                acquired.append(lock)
+            shutil.rmtree(repo_dir, ignore_errors=True)
+            return True
+        finally:
+            for lock in acquired:
+                lock.release()
+
+    def _touch(self, repo_dir: str):
+        with open(os.path.join(repo_dir, "last_used"), "w") as f:
+            f.write(str(time.time()))
+
+    def _last_used(self, repo_dir: str) -> float:
+        try:
+            return os.path.getmtime(os.path.join(repo_dir, "last_used"))
+        except OSError:
+            return 0.0
+
+    def _git(self, cwd: Optional[str], *args: str) -> str:
+        command = ["git"] + (["-C", cwd] if cwd else []) + list(args)
+        result = subprocess.run(
+            command, capture_output=True, text=True,
+            env={**os.environ, "GIT_TERMINAL_PROMPT": "0"}
+        )
+        if result.returncode != 0:
+            raise Exception(f"git {args[0]} failed: {_redact_credentials(result.stderr.strip(), args)}")
+        return result.stdout
+
+
+_workspace: Optional[WorkspaceManager] = None
+_workspace_lock = threading.Lock()
+
+
+def get_workspace() -> Optional[WorkspaceManager]:
+    """Process-wide workspace configured by WORKSPACE_DIR / WORKSPACE_QUOTA_MB, or None."""
+    global _workspace
+    root = os.getenv("WORKSPACE_DIR")
+    if not root:
+        return None
+    with _workspace_lock:
+        if _workspace is None or _workspace.root != os.path.abspath(root):
+            quota_mb = int(os.getenv("WORKSPACE_QUOTA_MB", str(DEFAULT_QUOTA_MB)))
+            _workspace = WorkspaceManager(root, quota_mb * 1024 * 1024)
+        return _workspace
@@ -6,6 +6,8 @@ class ComponentDiagram(BaseModel):
     """Компонентная диаграмма в формате Mermaid"""
     mermaid_code: str
     description: str
+    # Поддиаграммы по пакетам, если диаграмма слишком велика (mermaid_code тогда содержит обзор)
+    shards: Optional[Dict[str, str]] = None
 
 
 class SequenceDiagram(BaseModel):
@@ -35,4 +37,6 @@ class ProjectAnalysisResult(BaseModel):
     meta_description: ProjectMetaDescription
     component_diagram: Optional[ComponentDiagram] = None
     sequence_diagram: Optional[SequenceDiagram] = None
-    openapi_specification: Optional[OpenAPISpecification] = None
\ No newline at end of file
+    openapi_specification: Optional[OpenAPISpecification] = None
+    # Пути к отрисованным SVG/PNG файлам по имени диаграммы
+    rendered_diagrams: Optional[Dict[str, List[str]]] = None
\ No newline at end of file
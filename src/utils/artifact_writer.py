@@ -0,0 +1,94 @@
+"""Write pipeline artifacts to an output directory as soon as they are produced."""
+import json
+import os
+import re
+import tempfile
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel
+
+
+MERMAID_STARTS = ("graph", "flowchart", "sequenceDiagram", "classDiagram", "stateDiagram", "erDiagram", "```mermaid")
+
+
+def analysis_summary(code_analysis: Dict[str, Any]) -> Dict[str, Any]:
+    """Small summary of an analysis result (agent or src format) that is cheap to print and store."""
+    summary = {}
+    for key in ("classes", "interfaces", "packages", "entry_points", "dependencies",
+                "java_files", "all_classes", "all_packages"):
+        if key in code_analysis:
+            summary[key] = len(code_analysis[key])
+    if "admission" in code_analysis:
+        summary["skipped_by_category"] = code_analysis["admission"].get("skipped_by_category", {})
+    if "coverage" in code_analysis:
+        summary["coverage"] = code_analysis["coverage"]
+    return summary
+
+
+class ArtifactWriter:
+    """Stores every artifact under its name; files are replaced atomically so readers never see partial output."""
+
+    def __init__(self, output_dir: str):
+        self.output_dir = output_dir
+        os.makedirs(output_dir, exist_ok=True)
+
+    @classmethod
+    def from_env(cls) -> Optional["ArtifactWriter"]:
+        """Writer for OUTPUT_DIR, or None when it is not set."""
+        output_dir = os.getenv("OUTPUT_DIR")
+        return cls(output_dir) if output_dir else None
+
+    def write(self, name: str, value: Any) -> List[str]:
+        """
+        Write one artifact.
+
+        Mermaid code goes to <name>.mmd (diagram shards to <name>-<shard>.mmd),
+        structured data to <name>.json and other text to <name>.md.
+
+        Returns:
+            Paths of the written files
+        """
+        if value is None or value == "":
+            return []
+        paths = []
+        if hasattr(value, "mermaid_code"):
+            paths.append(self._write_file(f"{name}.mmd", value.mermaid_code))
+            for shard, code in (getattr(value, "shards", None) or {}).items():
+                paths.append(self._write_file(f"{name}-{self._slug(shard)}.mmd", code))
+        if isinstance(value, BaseModel):
+            paths.append(self._write_file(f"{name}.json", value.model_dump_json(indent=2)))
+        elif isinstance(value, (dict, list)):
+            paths.append(self._write_file(f"{name}.json", json.dumps(value, indent=2, ensure_ascii=False, default=str)))
+        elif isinstance(value, str):
+            text = value.strip()
+            if text.startswith(MERMAID_STARTS):
+                paths.append(self._write_file(f"{name}.mmd", value))
+            elif self._is_json(text):
+                paths.append(self._write_file(f"{name}.json", value))
+            else:
+                paths.append(self._write_file(f"{name}.md", value))
+        else:
+            paths.append(self._write_file(f"{name}.txt", str(value)))
+        return paths
+
+    def _write_file(self, file_name: str, content: str) -> str:
+        path = os.path.join(self.output_dir, file_name)
+        fd, tmp_path = tempfile.mkstemp(dir=self.output_dir, prefix=f".{file_name}.")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+        return path
+
+    @staticmethod
+    def _slug(name: str) -> str:
+        return re.sub(r"[^\w.-]+", "_", name).strip("_")
+
+    @staticmethod
+    def _is_json(text: str) -> bool:
+        if not text.startswith(("{", "[")):
+            return False
+        try:
+            json.loads(text)
+            return True
+        except ValueError:
+            return False
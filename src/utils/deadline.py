@@ -0,0 +1,152 @@
+"""Per-run deadline split into node budgets, with cancellation of calls that would overrun it."""
+import contextvars
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+
+# Calls (LLM requests, clones) are not started with less than this many seconds left
+MIN_CALL_SECONDS = float(os.getenv("DEADLINE_MIN_CALL_SECONDS", "1"))
+
+# Relative share of the remaining budget per node: a node gets its weight over the
+# weights of all nodes still ahead of it, so time saved by one node goes to the next.
+# Nodes without a weight have no fallback (cloning) and may use all the time left.
+NODE_BUDGET_WEIGHTS = {
+    "analyze_code": 3.0,
+    "generate_meta_description": 1.0,
+    "generate_component_diagram": 2.0,
+    "generate_behavior_diagram": 2.0,
+    "generate_openapi_spec": 2.0,
+    "generate_all_artifacts": 6.0,
+}
+
+_current_deadline: contextvars.ContextVar = contextvars.ContextVar("current_deadline", default=None)
+
+
+def run_time_budget() -> Optional[float]:
+    """
+    Wall-clock budget of a whole run in seconds from RUN_TIME_BUDGET; unset or 0 runs without a deadline.
+
+    Read when the run starts rather than at import, so that a value from .env loaded by main() counts.
+    """
+    return float(os.getenv("RUN_TIME_BUDGET", "0")) or None
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a stage cannot finish before the deadline in force."""
+
+    def __init__(self, stage: str, deadline: Optional[float] = None):
+        self.stage = stage
+        self.deadline = deadline
+        super().__init__(f"Deadline exceeded in {stage}")
+
+
+def current_deadline() -> Optional[float]:
+    """Absolute deadline (epoch seconds) of the running node or call, None without one."""
+    return _current_deadline.get()
+
+
+def remaining(deadline: Optional[float] = None) -> Optional[float]:
+    """Seconds left until the given (or the current) deadline, None without one."""
+    deadline = deadline if deadline is not None else current_deadline()
+    return deadline - time.time() if deadline is not None else None
+
+
+@contextmanager
+def deadline_scope(deadline: Optional[float]):
+    """Run the enclosed block under a deadline; an outer, earlier deadline stays in force."""
+    outer = current_deadline()
+    if deadline is None or (outer is not None and outer <= deadline):
+        yield outer
+        return
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def check_deadline(stage: str, min_seconds: float = 0.0):
+    """Raise DeadlineExceeded if less than min_seconds are left."""
+    left = remaining()
+    if left is not None and left <= min_seconds:
+        raise DeadlineExceeded(stage, current_deadline())
+
+
+def call_with_deadline(stage: str, call: Callable, *args, **kwargs) -> Any:
+    """
+    Run a blocking call and give up on it at the current deadline.
+
+    Without a deadline the call runs inline. Otherwise it runs in a daemon
+    thread (in a copy of the current context, so tracing spans nest) and the
+    caller waits at most until the deadline; an abandoned call is left to its
+    own timeout and its result is discarded. A failure of the call after the
+    deadline has passed is reported as DeadlineExceeded as well.
+
+    Raises:
+        DeadlineExceeded: Less than MIN_CALL_SECONDS were left, or the call did not return in time
+    """
+    deadline = current_deadline()
+    if deadline is None:
+        return call(*args, **kwargs)
+    check_deadline(stage, MIN_CALL_SECONDS)
+
+    outcome: Dict[str, Any] = {}
+    context = contextvars.copy_context()
+
+    def run():
+        try:
+            outcome["result"] = context.run(call, *args, **kwargs)
+        except BaseException as e:
+            outcome["error"] = e
+
+    worker = threading.Thread(target=run, name=f"deadline-{stage}", daemon=True)
+    worker.start()
+    worker.join(max(0.0, deadline - time.time()))
+    if worker.is_alive():
+        raise DeadlineExceeded(stage, deadline)
+    if "error" in outcome:
+        if time.time() >= deadline and not isinstance(outcome["error"], DeadlineExceeded):
+            raise DeadlineExceeded(stage, deadline) from outcome["error"]
+        raise outcome["error"]
+    return outcome["result"]
+
+
+def node_deadline(run_deadline: Optional[float], node: str, pending: List[str],
+                  weights: Dict[str, float] = NODE_BUDGET_WEIGHTS) -> Optional[float]:
+    """
+    Deadline of one node: its weighted share of the time left in the run.
+
+    Args:
+        run_deadline: Absolute deadline of the run, None without one
+        node: Node about to run
+        pending: Nodes still ahead, the node itself included
+        weights: Relative share per node; a node without one gets the run deadline
+    """
+    if run_deadline is None or node not in weights:
+        return run_deadline
+    total = sum(weights.get(name, 0.0) for name in set(pending) | {node})
+    now = time.time()
+    return now + max(0.0, run_deadline - now) * weights[node] / total
+
+
+def deadline_node(name: str, node: Callable, plan: List[str]) -> Callable:
+    """
+    Wrap a LangGraph node so that it runs within its share of state['deadline'].
+
+    Args:
+        name: Node name
+        node: Node function
+        plan: Nodes of the workflow in execution order; those not yet in
+            state['completed_tasks'] count as still ahead
+    """
+    @functools.wraps(node)
+    def wrapper(state, *args, **kwargs):
+        completed = set(state.get("completed_tasks", []))
+        pending = [step for step in plan if step not in completed]
+        with deadline_scope(node_deadline(state.get("deadline"), name, pending)):
+            return node(state, *args, **kwargs)
+    return wrapper
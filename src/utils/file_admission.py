@@ -0,0 +1,178 @@
+"""Admission policy deciding which source files are worth parsing."""
+import os
+import re
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# Files above ADMISSION_MAX_FILE_SIZE bytes are skipped; read per FileAdmission so that a value from .env counts
+DEFAULT_MAX_FILE_SIZE = 512 * 1024
+
+# Tried in order; cp1252 leaves a few bytes undefined, so a file can still end up undecodable
+DEFAULT_ENCODINGS = ("utf-8-sig", "cp1251", "cp1252")
+
+# Build-output directories of code generators (Maven/Gradle annotation processors, protoc, JAXB, ...),
+# matched at the start of a path segment; a source package named 'generated' is analyzed
+GENERATED_PATH_MARKERS = (
+    "/generated-sources/",
+    "/generated-test-sources/",
+    "/target/generated/",
+    "/build/generated/",
+    "/build/generated-src/",
+)
+
+# Header markers written by common generators, looked up in the beginning of the file
+GENERATED_HEADER_MARKERS = (
+    "@Generated",
+    "@javax.annotation.Generated",
+    "@javax.annotation.processing.Generated",
+    "Generated by the protocol buffer compiler",
+    "This file was generated by the JavaTM Architecture for XML Binding",
+    "This file was automatically generated",
+    "Autogenerated by Thrift",
+    "DO NOT EDIT",
+)
+
+HEADER_SCAN_BYTES = 8 * 1024
+
+
+def _looks_cyrillic(data: bytes) -> bool:
+    """
+    Whether the non-ASCII bytes read as cp1251 Cyrillic rather than Western text.
+
+    Both code pages put letters at 0xC0-0xFF, but Cyrillic words are made of
+    them, while accented Western letters mostly sit between ASCII ones.
+    """
+    runs = re.findall(rb"[\xc0-\xff]+", data)
+    letters = sum(len(run) for run in runs)
+    return letters > 0 and (letters - len(runs)) / letters >= 0.5
+
+
+# Single-byte code pages decode almost anything: take them only when the bytes fit
+ENCODING_CHECKS = {"cp1251": _looks_cyrillic}
+
+
+class FileAdmission:
+    """Filter out oversized, generated, binary and undecodable files while keeping count of them."""
+
+    def __init__(self, max_file_size: Optional[int] = None,
+                 encodings: Tuple[str, ...] = DEFAULT_ENCODINGS, skip_generated: bool = True):
+        if max_file_size is None:
+            max_file_size = int(os.getenv("ADMISSION_MAX_FILE_SIZE", str(DEFAULT_MAX_FILE_SIZE)))
+        self.max_file_size = max_file_size
+        self.encodings = encodings
+        self.skip_generated = skip_generated
+        self.admitted = 0
+        self.admitted_bytes = 0
+        self.skipped: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self.encoding_fallbacks: Dict[str, str] = {}
+        # Sizes of the admitted files, to take back a file skipped later (e.g. on a parse error)
+        self._admitted_sizes: Dict[str, int] = {}
+
+    def read(self, file_path: str) -> Optional[str]:
+        """Return the decoded file content, or None if the file is not admitted."""
+        try:
+            size = os.path.getsize(file_path)
+            if size > self.max_file_size:
+                self.record_skip(file_path, "too_large", size=size)
+                return None
+            with open(file_path, "rb") as f:
+                data = f.read()
+        except OSError as e:
+            self.record_skip(file_path, "unreadable", reason=str(e))
+            return None
+        return self.admit(file_path, data)
+
+    def read_source(self, source, source_file) -> Optional[str]:
+        """Like read(), for a file served by a source provider (src.loader.sources)."""
+        if source_file.size is not None and source_file.size > self.max_file_size:
+            self.record_skip(source_file.path, "too_large", size=source_file.size)
+            return None
+        try:
+            data = source.read(source_file)
+        except Exception as e:
+            self.record_skip(source_file.path, "unreadable", reason=str(e))
+            return None
+        return self.admit(source_file.path, data)
+
+    def admit(self, file_path: str, data: bytes) -> Optional[str]:
+        """Apply the policy to already loaded file bytes."""
+        if len(data) > self.max_file_size:
+            self.record_skip(file_path, "too_large", size=len(data))
+            return None
+
+        normalized_path = "/" + file_path.replace(os.sep, "/").lstrip("/")
+        if self.skip_generated and any(marker in normalized_path for marker in GENERATED_PATH_MARKERS):
+            self.record_skip(file_path, "generated", size=len(data), reason="generated sources directory")
+            return None
+
+        if b"\x00" in data[:HEADER_SCAN_BYTES]:
+            self.record_skip(file_path, "binary", size=len(data))
+            return None
+
+        content = self._decode(file_path, data)
+        if content is None:
+            self.record_skip(file_path, "undecodable", size=len(data))
+            return None
+
+        if self.skip_generated:
+            header = content[:HEADER_SCAN_BYTES]
+            marker = next((m for m in GENERATED_HEADER_MARKERS if m in header), None)
+            if marker:
+                self.record_skip(file_path, "generated", size=len(data), reason=marker)
+                return None
+
+        self.admitted += 1
+        self.admitted_bytes += len(data)
+        self._admitted_sizes[file_path] = len(data)
+        return content
+
+    def record_skip(self, file_path: str, category: str, **details):
+        """Remember a file that was not analyzed and why; a file admitted before no longer counts as admitted."""
+        size = self._admitted_sizes.pop(file_path, None)
+        if size is not None:
+            self.admitted -= 1
+            self.admitted_bytes -= size
+        self.skipped[category].append({"file_path": file_path, **details})
+
+    def _decode(self, file_path: str, data: bytes) -> Optional[str]:
+        for encoding in self.encodings:
+            check = ENCODING_CHECKS.get(encoding)
+            if check is not None and not check(data):
+                continue
+            try:
+                content = data.decode(encoding)
+            except UnicodeDecodeError:
+                continue
+            if encoding not in ("utf-8", "utf-8-sig"):
+                self.encoding_fallbacks[file_path] = encoding
+            return content
+        return None
+
+    def summary(self) -> Dict[str, Any]:
+        """Counters per skip category plus the list of skipped files."""
+        skipped_count = sum(len(files) for files in self.skipped.values())
+        return {
+            "admitted": self.admitted,
+            "admitted_bytes": self.admitted_bytes,
+            "skipped": skipped_count,
+            "skipped_by_category": {category: len(files) for category, files in self.skipped.items()},
+            "skipped_files": {category: list(files) for category, files in self.skipped.items()},
+            "encoding_fallbacks": dict(self.encoding_fallbacks)
+        }
+
+
+def merge_summaries(summaries: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Combine FileAdmission.summary() results of several partial runs (e.g. one per build module)."""
+    merged = {"admitted": 0, "admitted_bytes": 0, "skipped": 0, "skipped_by_category": {},
+              "skipped_files": {}, "encoding_fallbacks": {}}
+    for summary in summaries:
+        merged["admitted"] += summary.get("admitted", 0)
+        merged["admitted_bytes"] += summary.get("admitted_bytes", 0)
+        merged["skipped"] += summary.get("skipped", 0)
+        for category, count in summary.get("skipped_by_category", {}).items():
+            merged["skipped_by_category"][category] = merged["skipped_by_category"].get(category, 0) + count
+        for category, files in summary.get("skipped_files", {}).items():
+            merged["skipped_files"].setdefault(category, []).extend(files)
+        merged["encoding_fallbacks"].update(summary.get("encoding_fallbacks", {}))
+    return merged
@@ -1,7 +1,15 @@
 import ast
 import os
+import re
+from functools import partial
 from typing import List, Dict, Any, Optional
 from pathlib import Path
+from src.utils.tracing import tracer
+from src.utils.memory import memory
+from src.utils.file_admission import FileAdmission, merge_summaries
+from src.loader.sources import FileSystemSource, GitBlobSource
+from src.loader.build_modules import analyze_modules, module_graph
+from src.analyzer.anytime import AnytimePlan, analysis_time_budget, deadline_from_budget, merge_coverage
 
 
 class JavaAnalyzer:
@@ -23,10 +31,11 @@ class JavaAnalyzer:
                     java_files.append(os.path.join(root, file))
         return java_files
     
-    def extract_class_info(self, java_file_path: str) -> Dict[str, Any]:
+    def extract_class_info(self, java_file_path: str, content: Optional[str] = None) -> Dict[str, Any]:
         """
         Извлекает информацию о классе из Java файла
         Пока заглушка, так как Python не может напрямую разбирать Java AST
+        Если content передан, файл повторно не читается
         """
         # TODO: Реализовать полноценный парсер Java с помощью ANTLR или другого инструмента
         class_info = {
@@ -35,45 +44,125 @@ class JavaAnalyzer:
             'methods': [],
             'imports': [],
             'interfaces': [],
-            'packages': []
+            'packages': [],
+            'annotations': {},
+            'annotation_counts': {},
+            'main_classes': []
         }
         
         # Простое извлечение базовой информации через регулярные выражения
         try:
-            with open(java_file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-                
-                # Извлечение импортов
-                import_lines = [line.strip() for line in content.split('\n') if line.strip().startswith('import ')]
-                class_info['imports'] = import_lines
-                
-                # Извлечение пакета
-                package_lines = [line.strip() for line in content.split('\n') if line.strip().startswith('package ')]
-                if package_lines:
-                    class_info['packages'] = package_lines
-                
-                # Извлечение классов и методов (простая эвристика)
-                lines = content.split('\n')
-                for line in lines:
-                    line = line.strip()
-                    if ' class ' in line and '{' in line:
-                        class_name = line.split(' class ')[1].split('{')[0].strip().split()[0]
-                        class_info['classes'].append(class_name)
-                    elif ('public ' in line or 'private ' in line or 'protected ' in line) and '(' in line and ')' in line:
-                        method_parts = line.split('(')[0].split()
-                        if len(method_parts) >= 2:
-                            method_name = method_parts[-1]
-                            class_info['methods'].append(method_name)
-                            
+            if content is None:
+                with open(java_file_path, 'r', encoding='utf-8') as f:
+                    content = f.read()
+
+            # Извлечение импортов
+            import_lines = [line.strip() for line in content.split('\n') if line.strip().startswith('import ')]
+            class_info['imports'] = import_lines
+            
+            # Извлечение пакета
+            package_lines = [line.strip() for line in content.split('\n') if line.strip().startswith('package ')]
+            if package_lines:
+                class_info['packages'] = package_lines
+            
+            # Извлечение классов и методов (простая эвристика)
+            lines = content.split('\n')
+            pending_annotations = []
+            for line in lines:
+                line = line.strip()
+                # Аннотации копятся до объявления, к которому относятся
+                annotation = re.match(r'@(\w+(?:\.\w+)*)', line)
+                if annotation and not line.startswith('@interface'):
+                    name = annotation.group(1).rsplit('.', 1)[-1]
+                    pending_annotations.append(name)
+                    class_info['annotation_counts'][name] = class_info['annotation_counts'].get(name, 0) + 1
+                declaration = re.search(r'\b(class|interface|enum|record)\s+(\w+)', line)
+                if declaration and '{' in line and not line.startswith(('//', '*', 'return', 'new ')):
+                    for name in pending_annotations:
+                        class_info['annotations'].setdefault(name, []).append(declaration.group(2))
+                if line and not line.startswith(('@', '//', '*', '/*')) or declaration:
+                    pending_annotations = []
+                if ' class ' in line and '{' in line:
+                    class_name = line.split(' class ')[1].split('{')[0].strip().split()[0]
+                    class_info['classes'].append(class_name)
+                elif ('public ' in line or 'private ' in line or 'protected ' in line) and '(' in line and ')' in line:
+                    method_parts = line.split('(')[0].split()
+                    if len(method_parts) >= 2:
+                        method_name = method_parts[-1]
+                        class_info['methods'].append(method_name)
+                # После объявления класса: main может стоять в той же строке
+                if 'static void main(' in line and class_info['classes']:
+                    class_info['main_classes'].append(class_info['classes'][-1])
+
         except Exception as e:
             print(f"Error analyzing {java_file_path}: {e}")
             
         return class_info
     
-    def analyze_project_structure(self, project_path: str) -> Dict[str, Any]:
+    def extract_dependencies(self, import_lines: List[str], current_package: str,
+                             source_class: Optional[str] = None) -> List[Dict[str, str]]:
+        """
+        Превращает строки импортов в зависимости между пакетами
+        (тот же формат, что и у анализатора агента); source_class - класс
+        верхнего уровня файла, по нему строится граф классов для ранжирования
+        """
+        dependencies = []
+        for line in import_lines:
+            import_path = line.replace('import ', '').replace('static ', '').replace(';', '').strip()
+            if import_path.startswith('java.') or import_path.startswith('javax.'):
+                continue
+            if import_path.endswith('.*'):
+                to_package = import_path[:-2]
+            else:
+                to_package = '.'.join(import_path.split('.')[:-1])
+            dependencies.append({
+                'type': 'import',
+                'from_package': current_package,
+                'to_package': to_package,
+                'target': import_path,
+                'from_class': source_class
+            })
+        return dependencies
+    
+    def analyze_project_structure(self, project_path: str, time_budget: Optional[float] = None) -> Dict[str, Any]:
         """
         Анализирует структуру всего Java-проекта
+        time_budget - ограничение по времени в секундах, 0 - без ограничения
+        (по умолчанию ANALYSIS_TIME_BUDGET)
+        """
+        with FileSystemSource(project_path) as source:
+            return self.analyze_source(source, project_path, time_budget=time_budget)
+    
+    def analyze_commit(self, repo_path: str, commit: str = "HEAD",
+                       time_budget: Optional[float] = None) -> Dict[str, Any]:
         """
+        Анализирует проект на любом коммите прямо из базы объектов git
+        (подходит для bare-зеркал, рабочая копия не создается)
+        """
+        with GitBlobSource(repo_path, commit) as source:
+            return self.analyze_source(source, repo_path, time_budget=time_budget)
+    
+    def analyze_source(self, source, project_path: str, by_module: bool = True,
+                       time_budget: Optional[float] = None,
+                       deadline: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Анализирует Java-файлы, которые отдает провайдер исходников
+        (рабочая копия или объекты git без checkout, см. src.loader.sources).
+        По умолчанию проект делится на модули сборки (pom.xml / settings.gradle),
+        в каждом берется только src/main/java, модули анализируются параллельно.
+        При ограничении по времени файлы разбираются по приоритету (точки входа,
+        публичный API, популярные пакеты, затем стратифицированная выборка), а в
+        результат добавляется статистика покрытия 'coverage'
+        """
+        if deadline is None:
+            deadline = deadline_from_budget(analysis_time_budget() if time_budget is None else time_budget)
+        if by_module:
+            modules, results, outside = analyze_modules(
+                source, partial(self.analyze_source, project_path=project_path, by_module=False,
+                                time_budget=0, deadline=deadline)
+            )
+            return self._merge_modules(project_path, modules, results, outside)
+
         structure = {
             'project_path': project_path,
             'java_files': [],
@@ -81,19 +170,77 @@ class JavaAnalyzer:
             'all_methods': [],
             'all_imports': [],
             'all_packages': [],
+            'classes_by_package': {},
+            'classes_by_annotation': {},
+            'annotation_counts': {},
+            'main_classes': [],
+            'dependencies': [],
             'directory_structure': {}
         }
         
-        java_files = self.find_java_files(project_path)
-        structure['java_files'] = java_files
+        with memory.phase("list_files"):
+            source_files = source.list_files()
+            structure['java_files'] = [source_file.path for source_file in source_files]
+            plan = AnytimePlan(source, source_files, deadline) if deadline else None
+            if plan:
+                source_files = plan.order()
+        admission = FileAdmission()
         
-        for java_file in java_files:
-            class_info = self.extract_class_info(java_file)
-            structure['all_classes'].extend(class_info['classes'])
-            structure['all_methods'].extend(class_info['methods'])
-            structure['all_imports'].extend(class_info['imports'])
-            structure['all_packages'].extend(class_info['packages'])
+        summary_only = False
+        degradations = []
+        with memory.phase("parse_files"):
+            for index, source_file in enumerate(source_files):
+                # Время вышло - возвращаем то, что успели разобрать
+                if plan:
+                    if plan.expired():
+                        break
+                # Бюджет памяти превышен: перестаем собирать методы, а при большом превышении прекращаем разбор
+                if memory.budget_bytes and index and index % memory.check_interval == 0:
+                    if memory.over_budget(memory.stop_factor):
+                        for skipped_file in source_files[index:]:
+                            admission.record_skip(skipped_file.path, "memory_budget")
+                        degradations.append(memory.degrade("analyze_project", "stopped parsing", files_analyzed=index,
+                                                           files_left=len(source_files) - index))
+                        break
+                    if not summary_only and memory.over_budget():
+                        summary_only = True
+                        structure['all_methods'] = []
+                        degradations.append(memory.degrade("analyze_project", "summary mode", files_analyzed=index))
+                java_file = source_file.path
+                # Пропускаем сгенерированные, слишком большие и бинарные файлы
+                content = admission.read_source(source, source_file)
+                if content is None:
+                    if plan:
+                        plan.record(source_file, skipped=True)
+                    continue
+                with tracer.timed_file(java_file):
+                    class_info = self.extract_class_info(java_file, content)
+                structure['all_classes'].extend(class_info['classes'])
+                if not summary_only:
+                    structure['all_methods'].extend(class_info['methods'])
+                structure['all_imports'].extend(class_info['imports'])
+                structure['all_packages'].extend(class_info['packages'])
+
+                # Запоминаем принадлежность классов пакетам для шардирования диаграмм
+                package_name = class_info['packages'][0].replace('package ', '').replace(';', '') if class_info['packages'] else ''
+                package_classes = structure['classes_by_package'].setdefault(package_name, [])
+                package_classes.extend(cls for cls in class_info['classes'] if cls not in package_classes)
+                structure['dependencies'].extend(self.extract_dependencies(
+                    class_info['imports'], package_name, class_info['classes'][0] if class_info['classes'] else None
+                ))
+                # Аннотации и main-классы нужны статическому метаописанию (точки входа, контроллеры)
+                self._merge_annotations(structure, class_info['annotations'], class_info['annotation_counts'])
+                structure['main_classes'].extend(class_info['main_classes'])
+                if plan:
+                    plan.record(source_file)
             
+        # Пропущенные файлы учитываются, чтобы диаграммы не вводили в заблуждение
+        structure['admission'] = admission.summary()
+        if plan:
+            structure['coverage'] = plan.coverage()
+        if degradations:
+            structure['memory_degradations'] = degradations
+
         # Уникальные значения
         structure['all_classes'] = list(set(structure['all_classes']))
         structure['all_methods'] = list(set(structure['all_methods']))
@@ -101,11 +248,76 @@ class JavaAnalyzer:
         structure['all_packages'] = list(set(structure['all_packages']))
         
         # Получение директорией структуры
-        for root, dirs, files in os.walk(project_path):
-            rel_path = os.path.relpath(root, project_path)
+        for rel_path, dirs, files in source.directories():
             structure['directory_structure'][rel_path] = {
                 'dirs': dirs,
-                'files': [f for f in files if f.endswith('.java')]
+                'files': files
             }
         
-        return structure
\ No newline at end of file
+        return structure
+    
+    @staticmethod
+    def _merge_annotations(structure: Dict[str, Any], classes_by_annotation: Dict[str, List[str]],
+                           annotation_counts: Dict[str, int]):
+        """
+        Добавляет аннотированные классы и счетчики аннотаций файла или модуля в структуру проекта
+        """
+        for annotation, classes in classes_by_annotation.items():
+            annotated = structure['classes_by_annotation'].setdefault(annotation, [])
+            annotated.extend(cls for cls in classes if cls not in annotated)
+        for annotation, count in annotation_counts.items():
+            structure['annotation_counts'][annotation] = structure['annotation_counts'].get(annotation, 0) + count
+
+    def _merge_modules(self, project_path: str, modules, results: Dict[str, Dict[str, Any]], outside: int) -> Dict[str, Any]:
+        """
+        Объединяет результаты по модулям в одну структуру проекта и добавляет граф модулей
+        """
+        structure = {
+            'project_path': project_path,
+            'java_files': [],
+            'all_classes': [],
+            'all_methods': [],
+            'all_imports': [],
+            'all_packages': [],
+            'classes_by_package': {},
+            'classes_by_annotation': {},
+            'annotation_counts': {},
+            'main_classes': [],
+            'dependencies': [],
+            'directory_structure': {}
+        }
+        for module in modules:
+            result = results.get(module.name)
+            if not result:
+                continue
+            for key in ('java_files', 'all_classes', 'all_methods', 'all_imports', 'all_packages', 'dependencies'):
+                structure[key].extend(result[key])
+            for package_name, classes in result['classes_by_package'].items():
+                package_classes = structure['classes_by_package'].setdefault(package_name, [])
+                package_classes.extend(cls for cls in classes if cls not in package_classes)
+            self._merge_annotations(structure, result['classes_by_annotation'], result['annotation_counts'])
+            structure['main_classes'].extend(result['main_classes'])
+            for rel_path, entry in result['directory_structure'].items():
+                merged = structure['directory_structure'].setdefault(rel_path, {'dirs': [], 'files': []})
+                merged['dirs'] = sorted(set(merged['dirs']) | set(entry['dirs']))
+                merged['files'] = sorted(set(merged['files']) | set(entry['files']))
+
+        structure['admission'] = merge_summaries([result['admission'] for result in results.values()])
+        coverage = merge_coverage([result.get('coverage') for result in results.values()])
+        if coverage:
+            structure['coverage'] = coverage
+        # Решения по бюджету памяти, принятые в процессах модулей, попадают в отчет этого запуска
+        degradations = [event for result in results.values() for event in result.get('memory_degradations', [])]
+        if degradations:
+            structure['memory_degradations'] = degradations
+            memory.add_degradations(degradations)
+        for key in ('all_classes', 'all_methods', 'all_imports', 'all_packages'):
+            structure[key] = list(set(structure[key]))
+
+        # Модули и зависимости между ними, объявленные в сборке
+        structure['module_graph'] = module_graph(modules)
+        for module in modules:
+            result = results.get(module.name, {})
+            structure['module_graph']['modules'][module.name]['java_files'] = len(result.get('java_files', []))
+        structure['module_graph']['files_outside_modules'] = outside
+        return structure
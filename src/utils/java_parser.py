@@ -2,6 +2,8 @@
 import javalang
 from typing import Dict, List, Optional
 
+from src.utils.java_visitor import visit_java
+
 
 class JavaParser:
     """Parse Java source code to extract structural information."""
@@ -19,72 +21,37 @@ class JavaParser:
             return None
     
     def extract_classes_and_interfaces(self, tree: javalang.ast.Node) -> List[Dict]:
-        """Extract class and interface definitions from the AST."""
+        """Extract class and interface definitions (including enums and nested types) from the AST."""
         classes = []
+        interfaces = []
         
         if tree:
-            for path, node in tree.filter(javalang.tree.ClassDeclaration):
-                class_info = {
-                    'name': node.name,
-                    'methods': [],
-                    'fields': [],
-                    'extends': node.extends.name if node.extends else None,
-                    'implements': [imp.name for imp in node.implements] if node.implements else []
-                }
-                
-                # Extract methods
-                for item in node.body:
-                    if isinstance(item, javalang.tree.MethodDeclaration):
-                        method_info = {
-                            'name': item.name,
-                            'return_type': str(item.return_type) if item.return_type else 'void',
-                            'parameters': [(param.type.name, param.name) for param in item.parameters],
-                            'modifiers': list(item.modifiers)
+            for type_info in visit_java(tree).types:
+                info = {
+                    'name': type_info['name'],
+                    'kind': type_info['kind'],
+                    'methods': [
+                        {
+                            'name': method['name'],
+                            'return_type': method['return_type'],
+                            'parameters': [(param['type'], param['name']) for param in method['parameters']],
+                            'modifiers': method['modifiers']
                         }
-                        class_info['methods'].append(method_info)
-                    
-                    # Extract fields
-                    elif isinstance(item, javalang.tree.FieldDeclaration):
-                        for decl in item.declarators:
-                            field_info = {
-                                'name': decl.name,
-                                'type': str(item.type),
-                                'modifiers': list(item.modifiers)
-                            }
-                            class_info['fields'].append(field_info)
-                
-                classes.append(class_info)
-            
-            # Extract interfaces
-            for path, node in tree.filter(javalang.tree.InterfaceDeclaration):
-                interface_info = {
-                    'name': node.name,
-                    'methods': [],
-                    'extends': [ext.name for ext in node.extends] if node.extends else [],
-                    'fields': []
+                        for method in type_info['methods']
+                    ],
+                    'fields': [
+                        {'name': field['name'], 'type': field['type'], 'modifiers': field['modifiers']}
+                        for field in type_info['fields']
+                    ],
+                    'extends': type_info['extends']
                 }
-                
-                for item in node.body:
-                    if isinstance(item, javalang.tree.MethodDeclaration):
-                        method_info = {
-                            'name': item.name,
-                            'return_type': str(item.return_type) if item.return_type else 'void',
-                            'parameters': [(param.type.name, param.name) for param in item.parameters]
-                        }
-                        interface_info['methods'].append(method_info)
-                        
-                    elif isinstance(item, javalang.tree.FieldDeclaration):
-                        for decl in item.declarators:
-                            field_info = {
-                                'name': decl.name,
-                                'type': str(item.type),
-                                'modifiers': list(item.modifiers)
-                            }
-                            interface_info['fields'].append(field_info)
-                
-                classes.append(interface_info)
+                if type_info['kind'] in ('interface', 'annotation'):
+                    interfaces.append(info)
+                else:
+                    info['implements'] = type_info['implements']
+                    classes.append(info)
         
-        return classes
+        return classes + interfaces
     
     def extract_packages_and_imports(self, tree: javalang.ast.Node) -> Dict:
         """Extract package declaration and imports from the AST."""
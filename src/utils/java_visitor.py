@@ -0,0 +1,212 @@
+"""Single-pass extraction of types, members, annotations, entry points and references from a javalang AST."""
+from typing import Any, Dict, List, Optional
+
+import javalang
+
+
+# javalang has no record support yet; records are picked up as soon as the parser provides them
+_RecordDeclaration = getattr(javalang.tree, "RecordDeclaration", None)
+
+_TYPE_KINDS = [
+    (javalang.tree.ClassDeclaration, "class"),
+    (javalang.tree.InterfaceDeclaration, "interface"),
+    (javalang.tree.EnumDeclaration, "enum"),
+    (javalang.tree.AnnotationDeclaration, "annotation"),
+] + ([(_RecordDeclaration, "record")] if _RecordDeclaration else [])
+
+_TYPE_DECLARATIONS = tuple(node_type for node_type, _ in _TYPE_KINDS)
+
+
+def type_name(node: Any) -> str:
+    """Source-like rendering of a javalang type: 'java.util.List<String>[]', 'int', 'String...'."""
+    if node is None:
+        return "void"
+    if isinstance(node, str):
+        return node
+    parts = []
+    current = node
+    while current is not None:
+        part = current.name
+        arguments = getattr(current, "arguments", None)
+        if arguments:
+            part += f"<{', '.join(_type_argument(argument) for argument in arguments)}>"
+        parts.append(part)
+        current = getattr(current, "sub_type", None)
+    return ".".join(parts) + "[]" * len(getattr(node, "dimensions", None) or [])
+
+
+def _type_argument(argument: Any) -> str:
+    if argument.type is None:
+        return "?"
+    if argument.pattern_type in ("extends", "super"):
+        return f"? {argument.pattern_type} {type_name(argument.type)}"
+    return type_name(argument.type)
+
+
+def _reference_names(node: Any) -> List[str]:
+    """Qualified names of a reference type and of its generic arguments."""
+    names = []
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        parts = []
+        while current is not None:
+            parts.append(current.name)
+            for argument in getattr(current, "arguments", None) or []:
+                if getattr(argument, "type", None) is not None and isinstance(argument.type, javalang.tree.ReferenceType):
+                    stack.append(argument.type)
+            current = getattr(current, "sub_type", None)
+        names.append(".".join(parts))
+    return names
+
+
+class JavaFileVisitor:
+    """
+    Walks the AST of one compilation unit exactly once.
+
+    Every node is visited a single time with its enclosing type as context,
+    so nested, local and anonymous-class contents are attributed to the right
+    declaration without re-filtering the tree for each kind of information.
+    """
+
+    def __init__(self, file_path: Optional[str] = None):
+        self.file_path = file_path
+        self.package: str = ""
+        self.imports: List[str] = []
+        self.types: List[Dict[str, Any]] = []
+        self.entry_points: List[Dict[str, Any]] = []
+        self._import_map: Dict[str, str] = {}
+
+    def visit(self, tree: javalang.tree.CompilationUnit) -> "JavaFileVisitor":
+        """Extract everything from a parsed compilation unit; returns self."""
+        if tree.package:
+            self.package = tree.package.name
+        for imp in tree.imports:
+            self.imports.append(imp.path)
+            if not imp.wildcard and not imp.static:
+                self._import_map[imp.path.rsplit(".", 1)[-1]] = imp.path
+
+        # (node, enclosing type info); the stack replaces recursion so deep expressions are safe
+        stack = [(node, None) for node in reversed(tree.types or [])]
+        while stack:
+            node, owner = stack.pop()
+            if isinstance(node, _TYPE_DECLARATIONS):
+                owner = self._visit_type(node, owner)
+            elif isinstance(node, javalang.tree.ReferenceType) and owner is not None:
+                for name in _reference_names(node):
+                    owner["_references"].add(self._import_map.get(name, name))
+                continue
+            children = []
+            for child in node.children:
+                if isinstance(child, javalang.ast.Node):
+                    children.append(child)
+                elif isinstance(child, (list, tuple)):
+                    children.extend(self._flatten(child))
+            stack.extend((child, owner) for child in reversed(children))
+
+        for type_info in self.types:
+            ignored = type_info.pop("_type_parameters") | {type_info["name"]}
+            type_info["references"] = sorted(type_info.pop("_references") - ignored)
+        return self
+
+    @staticmethod
+    def _flatten(items) -> List[javalang.ast.Node]:
+        nodes = []
+        for item in items:
+            if isinstance(item, javalang.ast.Node):
+                nodes.append(item)
+            elif isinstance(item, (list, tuple)):
+                nodes.extend(JavaFileVisitor._flatten(item))
+        return nodes
+
+    def _visit_type(self, node: Any, outer: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        kind = next(kind for node_type, kind in _TYPE_KINDS if isinstance(node, node_type))
+        name = f"{outer['name']}.{node.name}" if outer else node.name
+        extends = getattr(node, "extends", None)
+        if kind == "interface":
+            extends = [type_name(parent) for parent in extends or []]
+        else:
+            extends = type_name(extends) if extends is not None else None
+
+        type_info = {
+            "name": name,
+            "qualified_name": f"{self.package}.{name}" if self.package else name,
+            "kind": kind,
+            "outer": outer["qualified_name"] if outer else None,
+            "file_path": self.file_path,
+            "line": node.position.line if getattr(node, "position", None) else None,
+            "modifiers": sorted(node.modifiers or []),
+            "extends": extends,
+            "implements": [type_name(parent) for parent in getattr(node, "implements", None) or []],
+            "annotations": [annotation.name for annotation in node.annotations or []],
+            "documentation": getattr(node, "documentation", None),
+            "methods": [],
+            "fields": [],
+            "constructors": [],
+            "_references": set(),
+            "_type_parameters": {parameter.name for parameter in getattr(node, "type_parameters", None) or []},
+        }
+
+        body = node.body
+        if isinstance(body, javalang.tree.EnumBody):
+            type_info["constants"] = [constant.name for constant in body.constants or []]
+            body = body.declarations
+        for item in body or []:
+            if isinstance(item, javalang.tree.MethodDeclaration):
+                method_info = self._method(item)
+                type_info["methods"].append(method_info)
+                if self._is_main(item):
+                    self.entry_points.append({
+                        "type": "main_method",
+                        "class": name,
+                        "qualified_name": type_info["qualified_name"],
+                        "file_path": self.file_path
+                    })
+            elif isinstance(item, javalang.tree.ConstructorDeclaration):
+                type_info["constructors"].append({
+                    "modifiers": sorted(item.modifiers or []),
+                    "annotations": [annotation.name for annotation in item.annotations or []],
+                    "parameters": self._parameters(item)
+                })
+            elif isinstance(item, (javalang.tree.FieldDeclaration, javalang.tree.ConstantDeclaration)):
+                for declarator in item.declarators:
+                    type_info["fields"].append({
+                        "name": declarator.name,
+                        "type": type_name(item.type),
+                        "modifiers": sorted(item.modifiers or []),
+                        "annotations": [annotation.name for annotation in item.annotations or []]
+                    })
+
+        self.types.append(type_info)
+        return type_info
+
+    def _method(self, node: javalang.tree.MethodDeclaration) -> Dict[str, Any]:
+        return {
+            "name": node.name,
+            "return_type": type_name(node.return_type),
+            "modifiers": sorted(node.modifiers or []),
+            "annotations": [annotation.name for annotation in node.annotations or []],
+            "parameters": self._parameters(node),
+            "line": node.position.line if getattr(node, "position", None) else None
+        }
+
+    @staticmethod
+    def _parameters(node: Any) -> List[Dict[str, str]]:
+        return [
+            {"name": parameter.name, "type": type_name(parameter.type) + ("..." if parameter.varargs else "")}
+            for parameter in node.parameters
+        ]
+
+    @staticmethod
+    def _is_main(node: javalang.tree.MethodDeclaration) -> bool:
+        if node.name != "main" or node.return_type is not None or len(node.parameters) != 1:
+            return False
+        if not {"public", "static"} <= set(node.modifiers or []):
+            return False
+        parameter = node.parameters[0]
+        return parameter.type.name == "String" and (bool(parameter.type.dimensions) or parameter.varargs)
+
+
+def visit_java(tree: javalang.tree.CompilationUnit, file_path: Optional[str] = None) -> JavaFileVisitor:
+    """Run the single-pass visitor over a parsed compilation unit."""
+    return JavaFileVisitor(file_path).visit(tree)
@@ -0,0 +1,266 @@
+"""Opt-in memory instrumentation per pipeline stage and enforcement of a memory budget."""
+import gc
+import os
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+
+# Settings read by MemoryMonitor.from_env():
+#   MEMORY_PROFILE - record tracemalloc peaks and top allocation sites per node and analyzer phase (slows the run down)
+#   MEMORY_BUDGET_MB - resident set size above which the analysis degrades instead of growing further; unset disables
+#   MEMORY_TOP_SITES - allocation sites reported per phase (10)
+#   MEMORY_CHECK_INTERVAL - files analyzed between two budget checks (50)
+#   MEMORY_STOP_FACTOR - multiple of the budget at which analyzers stop parsing further files,
+#       below it they only degrade (1.25)
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def current_rss() -> int:
+    """Resident set size of this process in bytes."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        # No procfs (macOS): fall back to the peak, the best figure available
+        return peak_rss()
+
+
+def peak_rss(who: int = resource.RUSAGE_SELF) -> int:
+    """Peak resident set size of this process (or, with RUSAGE_CHILDREN, of its largest reaped child) in bytes."""
+    peak = resource.getrusage(who).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def children_peak_rss() -> int:
+    """Peak resident set size of the largest terminated and waited-for child process (pool workers) in bytes."""
+    return peak_rss(resource.RUSAGE_CHILDREN)
+
+
+def _mb(size: int) -> float:
+    return round(size / (1024 * 1024), 1)
+
+
+class MemoryMonitor:
+    """
+    Records RSS and (with profiling) tracemalloc figures for nested phases.
+
+    Phases are LangGraph nodes and analyzer stages. Each phase reports RSS at
+    start and end, the process peak RSS after it, and with MEMORY_PROFILE the
+    Python heap peak during the phase and the allocation sites that grew the
+    most. The budget check is a cheap RSS read that analyzers call while
+    parsing to decide whether to degrade.
+    """
+
+    def __init__(self, profile: bool = False, budget_mb: Optional[float] = None, top_sites: int = 10,
+                 check_interval: int = 50, stop_factor: float = 1.25):
+        self._configure(profile, budget_mb, top_sites, check_interval, stop_factor)
+        # Settings still to be read from the environment on first use (see from_env(lazy=True))
+        self._pending_env = False
+        self.phases: List[Dict[str, Any]] = []
+        self.degradations: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._forget_parent)
+
+    @classmethod
+    def from_env(cls, lazy: bool = False) -> "MemoryMonitor":
+        """
+        Build a monitor from MEMORY_PROFILE / MEMORY_BUDGET_MB / MEMORY_TOP_SITES /
+        MEMORY_CHECK_INTERVAL / MEMORY_STOP_FACTOR.
+
+        With lazy=True the variables are read on first use instead, so that the
+        module-level monitor sees values loaded from .env.
+        """
+        monitor = cls()
+        if lazy:
+            monitor._pending_env = True
+        else:
+            monitor._configure_from_env()
+        return monitor
+
+    def _configure(self, profile: bool, budget_mb: Optional[float], top_sites: int,
+                   check_interval: int, stop_factor: float):
+        self._profile = profile
+        self._budget_bytes = int(budget_mb * 1024 * 1024) if budget_mb else None
+        self._top_site_count = top_sites
+        self._check_interval = check_interval
+        self._stop_factor = stop_factor
+
+    def _configure_from_env(self):
+        self._configure(
+            profile=os.getenv("MEMORY_PROFILE", "false").lower() in ("1", "true", "yes"),
+            budget_mb=float(os.getenv("MEMORY_BUDGET_MB", "0")) or None,
+            top_sites=int(os.getenv("MEMORY_TOP_SITES", "10")),
+            check_interval=int(os.getenv("MEMORY_CHECK_INTERVAL", "50")),
+            stop_factor=float(os.getenv("MEMORY_STOP_FACTOR", "1.25"))
+        )
+        self._pending_env = False
+
+    def _settings(self) -> "MemoryMonitor":
+        if self._pending_env:
+            with self._lock:
+                if self._pending_env:
+                    self._configure_from_env()
+        return self
+
+    @property
+    def profile(self) -> bool:
+        return self._settings()._profile
+
+    @property
+    def budget_bytes(self) -> Optional[int]:
+        return self._settings()._budget_bytes
+
+    @property
+    def enabled(self) -> bool:
+        return self.profile or self.budget_bytes is not None
+
+    @property
+    def top_sites(self) -> int:
+        return self._settings()._top_site_count
+
+    @property
+    def check_interval(self) -> int:
+        """Files analyzed between two budget checks."""
+        return self._settings()._check_interval
+
+    @property
+    def stop_factor(self) -> float:
+        """Multiple of the budget at which analyzers stop parsing further files."""
+        return self._settings()._stop_factor
+
+    def _forget_parent(self):
+        # A forked pool worker starts with a copy of the parent's records: drop them, or
+        # drain() would ship them back and the parent's report would list them twice
+        self._lock = threading.Lock()
+        self.phases = []
+        self.degradations = []
+
+    def _stack(self) -> List[Dict[str, Any]]:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    @contextmanager
+    def phase(self, name: str, category: str = "phase"):
+        """Measure the enclosed block."""
+        if not self.enabled:
+            yield
+            return
+        if self.profile and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+        stack = self._stack()
+        record: Dict[str, Any] = {"name": name, "category": category, "pid": os.getpid(),
+                                  "parent": stack[-1]["record"]["name"] if stack else None,
+                                  "rss_start_mb": _mb(current_rss())}
+        frame = {"record": record, "heap_peak": 0, "snapshot": None}
+        if self.profile:
+            # The peak counter is global: bank the parent's peak so far before resetting it
+            if stack:
+                stack[-1]["heap_peak"] = max(stack[-1]["heap_peak"], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            frame["snapshot"] = self._snapshot()
+        stack.append(frame)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            stack.pop()
+            record["seconds"] = round(time.perf_counter() - start, 3)
+            record["rss_end_mb"] = _mb(current_rss())
+            record["peak_rss_mb"] = _mb(peak_rss())
+            record["children_peak_rss_mb"] = _mb(children_peak_rss())
+            if self.profile:
+                heap_peak = max(frame["heap_peak"], tracemalloc.get_traced_memory()[1])
+                record["heap_peak_mb"] = _mb(heap_peak)
+                record["top_sites"] = self._top_sites(frame["snapshot"])
+                if stack:
+                    stack[-1]["heap_peak"] = max(stack[-1]["heap_peak"], heap_peak)
+            with self._lock:
+                self.phases.append(record)
+
+    @staticmethod
+    def _snapshot():
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        ))
+
+    def _top_sites(self, before) -> List[Dict[str, Any]]:
+        sites = []
+        for stat in self._snapshot().compare_to(before, "lineno")[:self.top_sites]:
+            frame = stat.traceback[0]
+            sites.append({"site": f"{frame.filename}:{frame.lineno}", "size_diff_kb": round(stat.size_diff / 1024, 1),
+                          "size_kb": round(stat.size / 1024, 1), "count": stat.count})
+        return sites
+
+    def limit(self, budget_bytes: Optional[int]):
+        """Set this process's share of the budget (e.g. the budget divided among pool workers)."""
+        self._settings()._budget_bytes = budget_bytes
+
+    def over_budget(self, factor: float = 1.0) -> bool:
+        """Whether the process is above factor times the memory budget (always False without one)."""
+        return self.budget_bytes is not None and current_rss() > self.budget_bytes * factor
+
+    def degrade(self, stage: str, action: str, **details) -> Dict[str, Any]:
+        """Record a degradation step taken because of the budget and release what can be released."""
+        gc.collect()
+        event = {"stage": stage, "action": action, "pid": os.getpid(), "rss_mb": _mb(current_rss()),
+                 "budget_mb": _mb(self.budget_bytes) if self.budget_bytes else None, **details}
+        with self._lock:
+            self.degradations.append(event)
+        print(f"Memory budget exceeded in {stage} ({event['rss_mb']} MB): {action}")
+        return event
+
+    def add_degradations(self, events: List[Dict[str, Any]]):
+        """Take over degradation events reported by worker processes."""
+        with self._lock:
+            self.degradations.extend(event for event in events if event not in self.degradations)
+
+    def drain(self) -> Dict[str, Any]:
+        """Hand over (and forget) the phases and degradations recorded so far, to ship them out of a worker process."""
+        with self._lock:
+            drained = {"phases": list(self.phases), "degradations": list(self.degradations)}
+            self.phases.clear()
+            self.degradations.clear()
+        return drained
+
+    def absorb(self, drained: Dict[str, Any]):
+        """Take over what a worker process drained, so its phases and top sites reach this process's report."""
+        with self._lock:
+            self.phases.extend(drained.get("phases", []))
+        self.add_degradations(drained.get("degradations", []))
+
+    def report(self) -> Dict[str, Any]:
+        """Figures for the run report."""
+        with self._lock:
+            phases = list(self.phases)
+            degradations = list(self.degradations)
+        return {
+            "peak_rss_mb": _mb(peak_rss()),
+            # Analysis runs in pool processes: their peaks count as much as this process's
+            "children_peak_rss_mb": _mb(children_peak_rss()),
+            "worker_peak_rss_mb": max((phase["peak_rss_mb"] for phase in phases if phase["pid"] != os.getpid()), default=None),
+            "budget_mb": _mb(self.budget_bytes) if self.budget_bytes else None,
+            "profile": self.profile,
+            "phases": phases,
+            "degradations": degradations,
+        }
+
+    def reset(self):
+        """Drop everything collected so far."""
+        with self._lock:
+            self.phases.clear()
+            self.degradations.clear()
+
+
+# Configured from the environment on first use, after the entry point has loaded .env
+memory = MemoryMonitor.from_env(lazy=True)
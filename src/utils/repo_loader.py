@@ -1,9 +1,12 @@
 """Repository loader utility for cloning and accessing remote repositories."""
+import asyncio
 import os
+import shutil
 import tempfile
 import git
-from typing import Optional
+from typing import Optional, Tuple
 from urllib.parse import urlparse
+from src.loader.workspace import get_workspace
 
 
 class RepoLoader:
@@ -13,17 +16,30 @@ class RepoLoader:
         self.username = username
         self.password = password
 
-    def clone_repo(self, repo_url: str) -> str:
-        """Clone a repository to a temporary directory and return the path."""
+    def _auth_url(self, repo_url: str) -> str:
+        """Return the repository URL with credentials embedded, if any were provided."""
         parsed_url = urlparse(repo_url)
 
         # Add credentials to URL if provided
         if self.username and self.password:
             scheme, netloc = parsed_url.scheme, parsed_url.netloc
             new_netloc = f"{self.username}:{self.password}@{netloc}"
-            repo_url_with_auth = repo_url.replace(f"{scheme}://{netloc}", f"{scheme}://{new_netloc}")
-        else:
-            repo_url_with_auth = repo_url
+            return repo_url.replace(f"{scheme}://{netloc}", f"{scheme}://{new_netloc}")
+        return repo_url
+
+    def clone_repo(self, repo_url: str, ref: Optional[str] = None) -> str:
+        """
+        Clone a repository to a temporary directory and return the path.
+
+        When WORKSPACE_DIR is set the repository is taken from the managed
+        workspace instead: its mirror is fetched and `ref` is checked out into
+        a leased worktree. Call release_repo() when done with the path.
+        """
+        workspace = get_workspace()
+        if workspace is not None:
+            return workspace.acquire(repo_url, ref, self.username, self.password).path
+
+        repo_url_with_auth = self._auth_url(repo_url)
 
         # Create a temporary directory
         temp_dir = tempfile.mkdtemp()
@@ -35,6 +51,72 @@ class RepoLoader:
         except Exception as e:
             raise Exception(f"Failed to clone repository: {e}")
 
+    def clone_bare(self, repo_url: str, ref: Optional[str] = None) -> Tuple[str, str]:
+        """
+        Fetch the repository objects without checking out a working tree.
+
+        Returns (bare repository path, commit SHA of `ref` or HEAD); the path
+        is the workspace mirror when WORKSPACE_DIR is set, otherwise a
+        temporary `git clone --bare`. Java files are then read with
+        src.loader.sources.GitBlobSource.
+        """
+        workspace = get_workspace()
+        if workspace is not None:
+            return workspace.mirror_path(repo_url, ref, self.username, self.password)
+
+        temp_dir = tempfile.mkdtemp()
+        try:
+            repo = git.Repo.clone_from(self._auth_url(repo_url), temp_dir, bare=True)
+            return temp_dir, repo.commit(ref or "HEAD").hexsha
+        except Exception as e:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            raise Exception(f"Failed to clone repository: {e}")
+
+    async def clone_repo_async(self, repo_url: str) -> str:
+        """
+        Clone a repository without blocking the event loop.
+
+        Runs `git clone` as an asyncio subprocess; if the awaiting task is
+        cancelled the git process is killed and the partial checkout removed.
+        With a managed workspace the fetch and checkout run in a worker thread.
+        """
+        if get_workspace() is not None:
+            return await asyncio.to_thread(self.clone_repo, repo_url)
+
+        temp_dir = tempfile.mkdtemp()
+        process = await asyncio.create_subprocess_exec(
+            "git", "clone", "--quiet", self._auth_url(repo_url), temp_dir,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            env={**os.environ, "GIT_TERMINAL_PROMPT": "0"}
+        )
+        try:
+            _, stderr = await process.communicate()
+        except asyncio.CancelledError:
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            raise
+
+        if process.returncode != 0:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            message = stderr.decode("utf-8", errors="replace").strip()
+            if self.password:
+                message = message.replace(self.password, "***")
+            raise Exception(f"Failed to clone repository: {message}")
+        return temp_dir
+
+    def release_repo(self, repo_path: str):
+        """Release a workspace worktree, or delete a temporary clone."""
+        workspace = get_workspace()
+        if workspace is not None and workspace.owns(repo_path):
+            workspace.release(repo_path)
+        elif workspace is not None and workspace.manages(repo_path):
+            return
+        elif os.path.realpath(repo_path).startswith(os.path.realpath(tempfile.gettempdir()) + os.sep):
+            shutil.rmtree(repo_path, ignore_errors=True)
+
     def get_java_files(self, repo_path: str) -> list:
         """Get all Java files in the repository."""
         java_files = []
@@ -52,8 +134,9 @@ class RepoLoader:
             # Get repository information
             info = {
                 'path': repo_path,
-                'is_dirty': repo.is_dirty(),
-                'active_branch': repo.active_branch.name if repo.active_branch else None,
+                'is_dirty': False if repo.bare else repo.is_dirty(),
+                # Worktrees from the managed workspace have a detached HEAD
+                'active_branch': None if repo.head.is_detached else repo.active_branch.name,
                 'remotes': [remote.name for remote in repo.remotes],
                 'commits_count': len(list(repo.iter_commits())),
                 'last_commit': {
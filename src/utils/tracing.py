@@ -0,0 +1,305 @@
+"""Lightweight tracing of pipeline stages, parsed files and LLM calls."""
+import asyncio
+import contextvars
+import functools
+import heapq
+import itertools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+from src.utils.memory import memory
+
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+
+class _NullSpan:
+    """Span stand-in used while tracing is disabled."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    """A single timed section of the pipeline."""
+
+    def __init__(self, tracer: "Tracer", name: str, category: str, attrs: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.attrs = attrs
+        self.span_id = next(tracer._ids)
+        self.parent_id = None
+        self.start = 0.0
+        self.duration = 0.0
+        self._token = None
+
+    def set(self, **attrs):
+        """Attach extra attributes to the span."""
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        parent = _current_span.get()
+        self.parent_id = parent.span_id if parent else None
+        self._token = _current_span.set(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self.start
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.attrs["error"] = f"{exc_type.__name__}: {exc}"
+        self.tracer._finish(self)
+        return False
+
+
+class Tracer:
+    """Collects spans and exports them as JSON lines or Chrome trace events."""
+
+    def __init__(self, enabled: bool = False, output_path: Optional[str] = None,
+                 output_format: str = "jsonl", slowest_files: int = 20):
+        self._enabled = enabled
+        self._output_path = output_path
+        self._output_format = output_format
+        self._slowest_files = slowest_files
+        # Settings still to be read from the environment on first use (see from_env(lazy=True))
+        self._pending_env = False
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        self._spans: List[Dict[str, Any]] = []
+        self._file_timings: List[tuple] = []
+        self._llm_calls: List[Dict[str, Any]] = []
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._forget_parent)
+
+    @classmethod
+    def from_env(cls, lazy: bool = False) -> "Tracer":
+        """
+        Build a tracer from TRACE_FILE / TRACE_FORMAT / TRACE_SLOWEST_FILES.
+
+        With lazy=True the variables are read on first use (first span, timing or
+        export) instead, so that a module-level tracer sees values loaded from .env.
+        """
+        tracer = cls()
+        if lazy:
+            tracer._pending_env = True
+        else:
+            tracer._configure_from_env()
+        return tracer
+
+    def _configure_from_env(self):
+        output_path = os.getenv("TRACE_FILE")
+        output_format = os.getenv("TRACE_FORMAT")
+        if not output_format:
+            output_format = "chrome" if output_path and output_path.endswith(".json") else "jsonl"
+        self._output_path = output_path
+        self._output_format = output_format
+        self._slowest_files = int(os.getenv("TRACE_SLOWEST_FILES", "20"))
+        self._enabled = bool(output_path)
+        self._pending_env = False
+
+    def _settings(self) -> "Tracer":
+        if self._pending_env:
+            with self._lock:
+                if self._pending_env:
+                    self._configure_from_env()
+        return self
+
+    @property
+    def enabled(self) -> bool:
+        return self._settings()._enabled
+
+    @enabled.setter
+    def enabled(self, value: bool):
+        self._pending_env = False
+        self._enabled = value
+
+    @property
+    def output_path(self) -> Optional[str]:
+        return self._settings()._output_path
+
+    @property
+    def output_format(self) -> str:
+        return self._settings()._output_format
+
+    @property
+    def slowest_files(self) -> int:
+        return self._settings()._slowest_files
+
+    def span(self, name: str, category: str = "stage", **attrs):
+        """Return a context manager timing the enclosed block."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return Span(self, name, category, attrs)
+
+    def record_file(self, file_path: str, seconds: float):
+        """Remember a per-file parse timing, keeping only the slowest N."""
+        if not self.enabled:
+            return
+        with self._lock:
+            item = (seconds, file_path)
+            if len(self._file_timings) < self.slowest_files:
+                heapq.heappush(self._file_timings, item)
+            elif item > self._file_timings[0]:
+                heapq.heapreplace(self._file_timings, item)
+
+    def _forget_parent(self):
+        # A forked pool worker starts with a copy of the parent's timings: drop them, or
+        # drain_files() would ship them back and the parent would count them twice
+        self._lock = threading.Lock()
+        self._file_timings = []
+
+    def drain_files(self) -> List[tuple]:
+        """Hand over (and forget) the per-file timings, to ship them out of a worker process."""
+        with self._lock:
+            timings = list(self._file_timings)
+            self._file_timings.clear()
+        return timings
+
+    def absorb_files(self, timings: List[tuple]):
+        """Take over per-file timings drained in a worker process."""
+        for seconds, file_path in timings:
+            self.record_file(file_path, seconds)
+
+    def record_llm_call(self, model: str, seconds: float, prompt_tokens: Optional[int],
+                        completion_tokens: Optional[int], **attrs):
+        """Remember latency and token usage of a single LLM call."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._llm_calls.append({
+                "model": model,
+                "seconds": seconds,
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                **attrs
+            })
+
+    @contextmanager
+    def timed_file(self, file_path: str):
+        """Time parsing of one source file."""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_file(file_path, time.perf_counter() - start)
+
+    def _finish(self, span: Span):
+        with self._lock:
+            self._spans.append({
+                "id": span.span_id,
+                "parent_id": span.parent_id,
+                "name": span.name,
+                "category": span.category,
+                "start": span.start - self._origin,
+                "duration": span.duration,
+                "thread": threading.get_ident(),
+                "attrs": span.attrs
+            })
+
+    def slowest_files_report(self) -> List[Dict[str, Any]]:
+        """Slowest parsed files, slowest first."""
+        with self._lock:
+            timings = sorted(self._file_timings, reverse=True)
+        return [{"file_path": path, "seconds": seconds} for seconds, path in timings]
+
+    def summary(self) -> Dict[str, Any]:
+        """Aggregate totals per span name plus LLM usage, slowest files and memory figures."""
+        with self._lock:
+            spans = list(self._spans)
+            llm_calls = list(self._llm_calls)
+        stages: Dict[str, Dict[str, float]] = {}
+        for span in spans:
+            stage = stages.setdefault(span["name"], {"count": 0, "total_seconds": 0.0})
+            stage["count"] += 1
+            stage["total_seconds"] += span["duration"]
+        return {
+            "stages": stages,
+            "llm": {
+                "calls": len(llm_calls),
+                "total_seconds": sum(c["seconds"] for c in llm_calls),
+                "prompt_tokens": sum(c["prompt_tokens"] or 0 for c in llm_calls),
+                "completion_tokens": sum(c["completion_tokens"] or 0 for c in llm_calls)
+            },
+            "slowest_files": self.slowest_files_report(),
+            **({"memory": memory.report()} if memory.enabled else {})
+        }
+
+    def export(self, path: Optional[str] = None, output_format: Optional[str] = None) -> Optional[str]:
+        """Write collected data to disk and return the path written."""
+        path = path or self.output_path
+        output_format = output_format or self.output_format
+        if not self.enabled or not path:
+            return None
+        with self._lock:
+            spans = list(self._spans)
+            llm_calls = list(self._llm_calls)
+
+        if output_format == "chrome":
+            events = [{
+                "name": s["name"],
+                "cat": s["category"],
+                "ph": "X",
+                "ts": s["start"] * 1e6,
+                "dur": s["duration"] * 1e6,
+                "pid": os.getpid(),
+                "tid": s["thread"],
+                "args": s["attrs"]
+            } for s in spans]
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"traceEvents": events, "otherData": self.summary()}, f, default=str)
+        else:
+            with open(path, "w", encoding="utf-8") as f:
+                for s in spans:
+                    f.write(json.dumps({"type": "span", **s}, default=str) + "\n")
+                for call in llm_calls:
+                    f.write(json.dumps({"type": "llm_call", **call}, default=str) + "\n")
+                f.write(json.dumps({"type": "summary", **self.summary()}, default=str) + "\n")
+        return path
+
+    def reset(self):
+        """Drop everything collected so far."""
+        with self._lock:
+            self._spans.clear()
+            self._file_timings.clear()
+            self._llm_calls.clear()
+            self._origin = time.perf_counter()
+        memory.reset()
+
+
+# Configured from the environment on first use, after the entry point has loaded .env
+tracer = Tracer.from_env(lazy=True)
+
+
+def traced_node(name: str, node: Callable) -> Callable:
+    """Wrap a LangGraph node (sync or async) so that each run is recorded as a span and a memory phase."""
+    if asyncio.iscoroutinefunction(node):
+        @functools.wraps(node)
+        async def async_wrapper(state, *args, **kwargs):
+            with tracer.span(name, category="node"), memory.phase(name, category="node"):
+                return await node(state, *args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(node)
+    def wrapper(state, *args, **kwargs):
+        with tracer.span(name, category="node"), memory.phase(name, category="node"):
+            return node(state, *args, **kwargs)
+    return wrapper